@@ -10,7 +10,15 @@ import datetime
 import sys
 import os
 import subprocess
+from startup_profiler import instrument
+from virtual_table import VirtualTable
+from search_index import SearchIndex, Debouncer
 
+SEARCH_DEBOUNCE_MS = 150  # wait for a pause in typing before searching
+GRADE_LEVEL_CHOICES = ["Unassigned"] + [str(g) for g in range(1, 13)]
+SEARCH_RETRY_MS = 50      # re-check while a search index is still being built
+
+@instrument
 class AdminDashboard:
     def __init__(self, user):
         self.user = user
@@ -29,11 +37,6 @@ class AdminDashboard:
         # Create main content area
         self.create_main_content()
         
-        # Load initial data
-        self.load_dashboard_data()
-        self.load_students()
-        self.load_teachers()
-        
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
@@ -83,6 +86,7 @@ class AdminDashboard:
             ("👥 Manage Students", self.show_students),
             ("👨‍🏫 Manage Teachers", self.show_teachers),
             ("🤖 Predictions", self.show_predictions),
+            ("⚠️ At-Risk", self.show_at_risk),
             ("⚙️ Settings", self.show_settings),
             ("🚪 Exit", self.logout)
         ]
@@ -114,14 +118,21 @@ class AdminDashboard:
         self.scrollable_frame.grid_columnconfigure(0, weight=1)
         self.scrollable_frame.grid_rowconfigure(0, weight=1)
         
-        # Create different content pages
-        self.create_dashboard_content()
-        self.create_students_content()
-        self.create_teachers_content()
-        self.create_predictions_content()
-        self.create_settings_content()
-        
-        # Show dashboard by default
+        # Pages are built on first visit and kept; `stale` pages reload when next shown.
+        # name -> (builder, loader, frame attribute, menu label)
+        self.pages = {
+            'dashboard': (self.create_dashboard_content, self.load_dashboard_data, 'dashboard_content', "📊 Dashboard"),
+            'students': (self.create_students_content, self.load_students, 'students_content', "👥 Manage Students"),
+            'teachers': (self.create_teachers_content, self.load_teachers, 'teachers_content', "👨‍🏫 Manage Teachers"),
+            'predictions': (self.create_predictions_content, self.load_prediction_students, 'predictions_content', "🤖 Predictions"),
+            'at_risk': (self.create_at_risk_content, lambda: self.load_at_risk_page(reset=True), 'at_risk_content', "⚠️ At-Risk"),
+            'settings': (self.create_settings_content, None, 'settings_content', "⚙️ Settings"),
+        }
+        self.built_pages = set()
+        self.stale_pages = set()
+        self.current_page = None
+        
+        # Only the landing page is built at startup
         self.show_dashboard()
     
     def create_header(self):
@@ -410,7 +421,9 @@ class AdminDashboard:
         search_entry = tk.Entry(actions_frame, textvariable=self.student_search_var, 
                                font=("Arial", 11), width=30)
         search_entry.grid(row=0, column=1, sticky="w", padx=(0, 20))
-        search_entry.bind('<KeyRelease>', self.filter_students)
+        # Search runs once typing pauses, against an in-memory index of the table rows
+        self.student_index = SearchIndex(fields=(1, 2))
+        search_entry.bind('<KeyRelease>', Debouncer(self.root, SEARCH_DEBOUNCE_MS, self.filter_students))
         
         # Action buttons frame
         buttons_frame = tk.Frame(actions_frame, bg="#f8f9fa")
@@ -439,21 +452,10 @@ class AdminDashboard:
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
         
-        # Create Treeview
+        # Virtualized table: only the visible rows are Treeview items
         columns = ('ID', 'Name', 'Email', 'Phone', 'Gender', 'Status', 'Enrollment Date')
-        self.students_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
-        
-        # Define headings
-        for col in columns:
-            self.students_tree.heading(col, text=col)
-            self.students_tree.column(col, width=120)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=scrollbar.set)
-        
+        self.students_tree = VirtualTable(table_frame, columns, height=15)
         self.students_tree.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-        scrollbar.grid(row=0, column=1, sticky="ns", pady=10)
     
     def create_teachers_content(self):
         """Create teachers management content using grid layout"""
@@ -483,7 +485,8 @@ class AdminDashboard:
         search_entry = tk.Entry(actions_frame, textvariable=self.teacher_search_var, 
                                font=("Arial", 11), width=30)
         search_entry.grid(row=0, column=1, sticky="w", padx=(0, 20))
-        search_entry.bind('<KeyRelease>', self.filter_teachers)
+        self.teacher_index = SearchIndex(fields=(1, 2, 4))
+        search_entry.bind('<KeyRelease>', Debouncer(self.root, SEARCH_DEBOUNCE_MS, self.filter_teachers))
         
         # Action buttons frame
         buttons_frame = tk.Frame(actions_frame, bg="#f8f9fa")
@@ -508,21 +511,10 @@ class AdminDashboard:
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
         
-        # Create Treeview
+        # Virtualized table: only the visible rows are Treeview items
         columns = ('ID', 'Name', 'Email', 'Phone', 'Department', 'Qualification', 'Status')
-        self.teachers_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
-        
-        # Define headings
-        for col in columns:
-            self.teachers_tree.heading(col, text=col)
-            self.teachers_tree.column(col, width=120)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.teachers_tree.yview)
-        self.teachers_tree.configure(yscrollcommand=scrollbar.set)
-        
+        self.teachers_tree = VirtualTable(table_frame, columns, height=15)
         self.teachers_tree.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-        scrollbar.grid(row=0, column=1, sticky="ns", pady=10)
     
     def create_settings_content(self):
         """Create settings content using grid layout"""
@@ -555,44 +547,61 @@ class AdminDashboard:
             else:
                 btn.config(bg="white", fg="#2c3e50")
     
+    def show_page(self, name):
+        """Show a page, building it on first visit and reloading it only if stale"""
+        builder, loader, frame_attr, menu_label = self.pages[name]
+        self.hide_all_content()
+        if name not in self.built_pages:
+            builder()
+            self.built_pages.add(name)
+            self.stale_pages.add(name)
+        if name in self.stale_pages and loader is not None:
+            loader()
+        self.stale_pages.discard(name)
+        getattr(self, frame_attr).grid(row=0, column=0, sticky="nsew")
+        self.current_page = name
+        self.highlight_menu(menu_label)
+    
+    def mark_stale(self, *names):
+        """Called after writes: reload the visible page now, the others when next shown"""
+        for name in names:
+            if name not in self.built_pages:
+                continue
+            if name == self.current_page:
+                loader = self.pages[name][1]
+                if loader is not None:
+                    loader()
+            else:
+                self.stale_pages.add(name)
+    
     def show_dashboard(self):
         """Show dashboard content"""
-        self.hide_all_content()
-        self.dashboard_content.grid(row=0, column=0, sticky="nsew")
-        self.highlight_menu("📊 Dashboard")
+        self.show_page('dashboard')
     
     def show_students(self):
         """Show students content"""
-        self.hide_all_content()
-        self.students_content.grid(row=0, column=0, sticky="nsew")
-        self.highlight_menu("👥 Manage Students")
+        self.show_page('students')
     
     def show_teachers(self):
         """Show teachers content"""
-        self.hide_all_content()
-        self.teachers_content.grid(row=0, column=0, sticky="nsew")
-        self.highlight_menu("👨‍🏫 Manage Teachers")
+        self.show_page('teachers')
     
     def show_predictions(self):
         """Show predictions content"""
-        self.hide_all_content()
-        self.predictions_content.grid(row=0, column=0, sticky="nsew")
-        self.highlight_menu("🤖 Predictions")
+        self.show_page('predictions')
+
+    def show_at_risk(self):
+        """Show at-risk students content"""
+        self.show_page('at_risk')
 
     def show_settings(self):
         """Show settings content"""
-        self.hide_all_content()
-        self.settings_content.grid(row=0, column=0, sticky="nsew")
-        self.highlight_menu("⚙️ Settings")
+        self.show_page('settings')
     
     def hide_all_content(self):
-        """Hide all content frames"""
-        self.dashboard_content.grid_forget()
-        self.students_content.grid_forget()
-        self.teachers_content.grid_forget()
-        if hasattr(self, 'predictions_content'):
-            self.predictions_content.grid_forget()
-        self.settings_content.grid_forget()
+        """Hide all built content frames"""
+        for name in self.built_pages:
+            getattr(self, self.pages[name][2]).grid_forget()
 
     def create_predictions_content(self):
         """Create predictions management page"""
@@ -615,6 +624,8 @@ class AdminDashboard:
                   relief="flat", cursor="hand2", command=self.predict_selected_student).grid(row=0, column=0, padx=5)
         tk.Button(actions, text="🧹 Clear", font=("Arial", 11), fg="#2c3e50", bg="#ecf0f1",
                   relief="flat", cursor="hand2", command=self.clear_predictions).grid(row=0, column=1, padx=5)
+        tk.Button(actions, text="📋 Predict All Students", font=("Arial", 11), fg="white", bg="#16a085",
+                  relief="flat", cursor="hand2", command=self.predict_all_students).grid(row=0, column=2, padx=5)
 
         # Students selector panel
         sel = tk.Frame(self.predictions_content, bg="#f8f9fa")
@@ -630,30 +641,10 @@ class AdminDashboard:
         table_frame.grid_rowconfigure(0, weight=1)
 
         cols = ("ID", "Name", "Email")
-        self.pred_students_tree = ttk.Treeview(table_frame, columns=cols, show='headings', height=8)
-        for c in cols:
-            self.pred_students_tree.heading(c, text=c)
-            self.pred_students_tree.column(c, width=160)
-        vs = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.pred_students_tree.yview)
-        self.pred_students_tree.configure(yscrollcommand=vs.set)
-        self.pred_students_tree.grid(row=0, column=0, sticky="nsew")
-        vs.grid(row=0, column=1, sticky="ns")
-
-        # Load students into selector
-        try:
-            for item in self.pred_students_tree.get_children():
-                self.pred_students_tree.delete(item)
-            _students = db.get_all_students() or []
-            for s in _students:
-                self.pred_students_tree.insert('', 'end', values=(s.get('student_id'), s.get('fullname'), s.get('email')))
-        except Exception:
-            pass
-
         # Auto-predict on selection
-        try:
-            self.pred_students_tree.bind('<<TreeviewSelect>>', lambda e: self.predict_selected_student())
-        except Exception:
-            pass
+        self.pred_students_tree = VirtualTable(table_frame, cols, height=8, widths=(160, 160, 160),
+                                               on_select=lambda row: row and self.predict_selected_student())
+        self.pred_students_tree.grid(row=0, column=0, sticky="nsew")
 
         # Results and chart area
         # Chart container (matplotlib embedded if available)
@@ -679,45 +670,139 @@ class AdminDashboard:
         self.pred_results = tk.Text(self.predictions_content, height=8, bg="white")
         self.pred_results.grid(row=4, column=0, sticky="nsew", padx=20, pady=(0, 10))
 
-    def clear_predictions(self):
+    def load_prediction_students(self):
+        """Load students into the predictions selector"""
         try:
-            self.pred_results.delete('1.0', 'end')
+            _students = db.get_all_students() or []
+            self.pred_students_tree.set_rows(
+                [(s.get('student_id'), s.get('fullname'), s.get('email')) for s in _students],
+                keys=[s.get('student_id') for s in _students])
         except Exception:
             pass
-        # Clear chart areas
+
+    def create_at_risk_content(self):
+        """Create the ranked at-risk students page (filled by at_risk.py)"""
+        self.at_risk_content = tk.Frame(self.content_frame, bg="#f8f9fa")
+        self.at_risk_content.grid_columnconfigure(0, weight=1)
+        self.at_risk_content.grid_rowconfigure(3, weight=1)
+        self.at_risk_page_size = 50
+        self.at_risk_page_starts = [0]
+
+        title_label = tk.Label(self.at_risk_content, text="At-Risk Students",
+                              font=("Arial", 24, "bold"), fg="#2c3e50", bg="#f8f9fa")
+        title_label.grid(row=0, column=0, sticky="w", padx=20, pady=(20, 10))
+
+        actions = tk.Frame(self.at_risk_content, bg="#f8f9fa")
+        actions.grid(row=1, column=0, sticky="ew", padx=20, pady=10)
+        actions.grid_columnconfigure(4, weight=1)
+        tk.Button(actions, text="◀ Previous", font=("Arial", 11), fg="#2c3e50", bg="#ecf0f1",
+                  relief="flat", cursor="hand2", command=self.prev_at_risk_page).grid(row=0, column=0, padx=5)
+        tk.Button(actions, text="Next ▶", font=("Arial", 11), fg="#2c3e50", bg="#ecf0f1",
+                  relief="flat", cursor="hand2", command=self.next_at_risk_page).grid(row=0, column=1, padx=5)
+        tk.Button(actions, text="🔄 Refresh", font=("Arial", 11), fg="white", bg="#3498db",
+                  relief="flat", cursor="hand2", command=lambda: self.load_at_risk_page(reset=True)).grid(row=0, column=2, padx=5)
+        tk.Button(actions, text="⚙️ Re-score School", font=("Arial", 11), fg="white", bg="#e67e22",
+                  relief="flat", cursor="hand2", command=self.rescore_at_risk).grid(row=0, column=3, padx=5)
+
+        self.at_risk_summary_label = tk.Label(self.at_risk_content, text="", font=("Arial", 11),
+                                              fg="#7f8c8d", bg="#f8f9fa")
+        self.at_risk_summary_label.grid(row=2, column=0, sticky="w", padx=20)
+
+        table_frame = tk.Frame(self.at_risk_content, bg="white", relief="solid", bd=1)
+        table_frame.grid(row=3, column=0, sticky="nsew", padx=20, pady=10)
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+        cols = ("Rank", "Student", "Subject", "Predicted", "Likely Range", "Grade", "Trend", "Reason", "Risk")
+        self.at_risk_tree = ttk.Treeview(table_frame, columns=cols, show='headings', height=18)
+        for c in cols:
+            self.at_risk_tree.heading(c, text=c)
+            self.at_risk_tree.column(c, width=90 if c not in ("Student", "Subject") else 160)
+        vs = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.at_risk_tree.yview)
+        self.at_risk_tree.configure(yscrollcommand=vs.set)
+        self.at_risk_tree.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        vs.grid(row=0, column=1, sticky="ns", pady=10)
+
+    def load_at_risk_page(self, reset=False):
+        """Show one page of the at_risk table; keyset paging keeps each page a single indexed read"""
+        if reset:
+            self.at_risk_page_starts = [0]
+        after_rank = self.at_risk_page_starts[-1]
+        rows = db.get_at_risk_page(after_rank, self.at_risk_page_size)
+        for item in self.at_risk_tree.get_children():
+            self.at_risk_tree.delete(item)
+        for r in rows:
+            trend = r.get('trend_slope')
+            self.at_risk_tree.insert('', 'end', values=(
+                r.get('rank_no'),
+                r.get('fullname') or r.get('student_id'),
+                r.get('subject_name') or '',
+                f"{float(r.get('predicted_pct') or 0):.1f}%",
+                f"{float(r.get('low_pct') or 0):.0f}-{float(r.get('high_pct') or 0):.0f}%",
+                r.get('predicted_grade') or '',
+                f"{float(trend):+.1f}/exam" if trend is not None else '',
+                r.get('reason') or '',
+                r.get('risk_score'),
+            ))
+        self.at_risk_last_rank = rows[-1]['rank_no'] if rows else after_rank
+        summary = db.get_at_risk_summary()
+        total = summary.get('total') or 0
+        if not total:
+            self.at_risk_summary_label.config(text="No at-risk data yet. Use 'Re-score School' or run at_risk.py.")
+        else:
+            page = len(self.at_risk_page_starts)
+            pages = max(1, -(-int(total) // self.at_risk_page_size))
+            self.at_risk_summary_label.config(
+                text=f"{total} at-risk student-subjects · scored {summary.get('scored_at')} with model "
+                     f"{summary.get('model_version')} · page {page} of {pages}")
+
+    def next_at_risk_page(self):
+        if len(self.at_risk_tree.get_children()) < self.at_risk_page_size:
+            return
+        self.at_risk_page_starts.append(self.at_risk_last_rank)
+        self.load_at_risk_page()
+
+    def prev_at_risk_page(self):
+        if len(self.at_risk_page_starts) > 1:
+            self.at_risk_page_starts.pop()
+            self.load_at_risk_page()
+
+    def rescore_at_risk(self):
+        """Run the at-risk job in a separate process so the UI stays responsive"""
         try:
-            for w in getattr(self, 'pred_bar_frame', []).winfo_children():
-                w.destroy()
-        except Exception:
-            pass
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "at_risk.py")
+            subprocess.Popen([sys.executable, script])
+            messagebox.showinfo("At-Risk", "Scoring started in the background. Press Refresh when it finishes.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not start scoring: {e}")
+
+    def clear_predictions(self):
         try:
-            for w in getattr(self, 'pred_pie_frame', []).winfo_children():
-                w.destroy()
+            self.pred_results.delete('1.0', 'end')
         except Exception:
             pass
+        # Blank the charts; their figures are kept for the next prediction
+        if getattr(self, 'pred_bar_chart', None) is not None:
+            self.pred_bar_chart.show_message("")
+            self.pred_pie_chart.show_message("")
 
     def predict_selected_student(self):
         student_id = None
         # Prefer selection from Predictions page student list
         if hasattr(self, 'pred_students_tree'):
-            sel = self.pred_students_tree.selection()
-            if sel:
-                try:
-                    student_id = self.pred_students_tree.item(sel[0])['values'][0]
-                except Exception:
-                    student_id = None
+            row = self.pred_students_tree.selected_row()
+            if row:
+                student_id = row[0]
         # Fallback to Students tab selection
         if student_id is None:
-            selection = self.students_tree.selection() if hasattr(self, 'students_tree') else []
-            if selection:
-                item = self.students_tree.item(selection[0])
-                student_id = item['values'][0]
+            row = self.students_tree.selected_row() if hasattr(self, 'students_tree') else None
+            if row:
+                student_id = row[0]
         if student_id is None:
             messagebox.showwarning("Warning", "Please select a student (in Predictions or Students tab).")
             return
         try:
-            from ml_model import load_model, predict_next_percentage, percentage_to_grade
-            model = load_model()
+            from ml_model import load_predictor, predict_intervals_cached, percentage_to_grade
+            model = load_predictor()
             if not model:
                 messagebox.showwarning("Warning", "Model not available. Please train it once from terminal.")
                 return
@@ -734,102 +819,105 @@ class AdminDashboard:
                 name = m.get('subject_name')
                 if sid is not None and name:
                     subj_seen[int(sid)] = str(name)
-            preds = []
+            # Mean and 10-90% band of the forest's trees per subject; reselecting a
+            # student whose marks have not changed is served from the prediction cache
+            try:
+                by_key = predict_intervals_cached(model, [(int(student_id), sid) for sid in subj_seen])
+            except Exception:
+                by_key = {}
+            rows = []
             for sid, name in subj_seen.items():
-                try:
-                    p = predict_next_percentage(model, int(student_id), int(sid))
-                    if p is not None:
-                        preds.append((name, float(p)))
-                except Exception:
-                    continue
-            preds.sort(key=lambda x: x[0])
+                r = by_key.get((int(student_id), sid))
+                if r is not None:
+                    rows.append((name, r['mean'], r['low'], r['high']))
+            rows.sort(key=lambda x: x[0])
+            preds = [(name, mean) for name, mean, _, _ in rows]
+            bands = [(low, high) for _, _, low, high in rows]
             # Update text results
             self.pred_results.delete('1.0', 'end')
             if not preds:
                 self.pred_results.insert('end', "Not enough data to predict for this student.\n")
             else:
                 self.pred_results.insert('end', f"Predictions for student {student_id}:\n")
-                for name, p in preds:
-                    self.pred_results.insert('end', f" - {name}: {p:.1f}% ({percentage_to_grade(p)})\n")
+                for name, p, low, high in rows:
+                    self.pred_results.insert('end', f" - {name}: {p:.1f}% ({percentage_to_grade(p)}), "
+                                                    f"likely {low:.0f}-{high:.0f}%\n")
                 self.pred_results.see('end')
             # Render chart
-            self.render_pred_charts(preds)
+            self.render_pred_charts(preds, bands)
         except Exception as e:
             messagebox.showerror("Error", f"Prediction failed: {e}")
 
-    def render_pred_charts(self, preds):
-        # Clear previous charts
+    def predict_all_students(self):
+        """Predict every listed student at once and summarise each with a range."""
         try:
-            for w in self.pred_bar_frame.winfo_children():
-                w.destroy()
-        except Exception:
-            pass
-        try:
-            for w in self.pred_pie_frame.winfo_children():
-                w.destroy()
-        except Exception:
-            pass
-        # Empty state
-        if not preds:
+            import time
+            from ml_model import load_predictor, predict_intervals_cached, student_subject_keys
+            model = load_predictor()
+            if not model:
+                messagebox.showwarning("Warning", "Model not available. Please train it once from terminal.")
+                return
+            names = {}
+            for values in self.pred_students_tree.rows:
+                names[int(values[0])] = values[1]
+            started = time.perf_counter()
+            keys = student_subject_keys(list(names))
+            by_key = predict_intervals_cached(model, keys)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            per_student = {}
+            for (student_id, _), r in by_key.items():
+                if r is not None:
+                    per_student.setdefault(student_id, []).append(r)
+            self.pred_results.delete('1.0', 'end')
+            self.pred_results.insert('end', f"Class predictions ({len(keys)} student-subjects in {elapsed_ms:.0f} ms):\n")
+            for student_id in sorted(per_student, key=lambda s: str(names.get(s, ''))):
+                rs = per_student[student_id]
+                mean = sum(r['mean'] for r in rs) / len(rs)
+                low = sum(r['low'] for r in rs) / len(rs)
+                high = sum(r['high'] for r in rs) / len(rs)
+                self.pred_results.insert('end', f" - {names.get(student_id, student_id)}: {mean:.1f}% "
+                                                f"(likely {low:.0f}-{high:.0f}%) over {len(rs)} subjects\n")
+        except Exception as e:
+            messagebox.showerror("Error", f"Prediction failed: {e}")
+
+    def render_pred_charts(self, preds, bands=None):
+        """Update the prediction charts in place (built on first use, then reused)"""
+        from charts import BarChart, DonutChart, matplotlib_available, unavailable_label
+        if not matplotlib_available():
             for frame in (self.pred_bar_frame, self.pred_pie_frame):
-                try:
-                    tk.Label(frame, text="No predictions to display", bg="white", fg="#7f8c8d", font=("Arial", 12)).grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-                except Exception:
-                    pass
+                if not frame.winfo_children():
+                    unavailable_label(frame, "Matplotlib not available").grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
             return
-        # Try to render charts
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-        except ImportError:
-            for frame in (self.pred_bar_frame, self.pred_pie_frame):
-                tk.Label(frame, text="Matplotlib not available", bg="white", fg="#7f8c8d", font=("Arial", 12)).grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        if getattr(self, 'pred_bar_chart', None) is None:
+            self.pred_bar_chart = BarChart(self.pred_bar_frame, figsize=(6.5, 3.2),
+                                           title='Predicted Next Performance by Subject', ylabel='Predicted %',
+                                           colors=['#3498db'], value_format='{:.1f}%', rotation=20)
+            self.pred_bar_chart.widget.grid(row=0, column=0, sticky="nsew")
+            self.pred_pie_chart = DonutChart(self.pred_pie_frame, figsize=(6.5, 3.2),
+                                             title='Predicted Grade Distribution')
+            self.pred_pie_chart.widget.grid(row=0, column=0, sticky="nsew")
+        # Empty state
+        if not preds:
+            self.pred_bar_chart.show_message("No predictions to display")
+            self.pred_pie_chart.show_message("No predictions to display")
             return
 
-        # Bar chart (left)
+        # Bar chart (left), with the prediction band as whiskers
         try:
-            fig_bar, ax = plt.subplots(figsize=(6.5, 3.2))
-            fig_bar.patch.set_facecolor('white')
-            names = [n for n, _ in preds]
-            values = [v for _, v in preds]
-            xs = range(len(names))
-            bars = ax.bar(xs, values, color='#3498db')
-            ax.set_ylim(0, 100)
-            ax.set_ylabel('Predicted %')
-            ax.set_title('Predicted Next Performance by Subject')
-            ax.set_xticks(list(xs))
-            ax.set_xticklabels(names, rotation=20, ha='right')
-            for b, v in zip(bars, values):
-                ax.text(b.get_x() + b.get_width()/2, b.get_height()+1, f"{v:.1f}%", ha='center', va='bottom', fontsize=9)
-            plt.tight_layout()
-            canvas_bar = FigureCanvasTkAgg(fig_bar, master=self.pred_bar_frame)
-            canvas_bar.draw()
-            canvas_bar.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-        except Exception:
-            tk.Label(self.pred_bar_frame, text="Failed to render bar chart", bg="white", fg="#e74c3c", font=("Arial", 12)).grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+            self.pred_bar_chart.update([n for n, _ in preds], [v for _, v in preds], errors=bands)
+        except Exception as e:
+            print(f"[WARN] Failed to render bar chart: {e}")
+            self.pred_bar_chart.show_message("Failed to render bar chart")
 
         # Pie chart (right): grade distribution
         try:
             from ml_model import percentage_to_grade
             grades = [percentage_to_grade(v) for _, v in preds]
             order = ['A+', 'A', 'B', 'C', 'D', 'F']
-            counts = [grades.count(g) for g in order]
-            if sum(counts) == 0:
-                tk.Label(self.pred_pie_frame, text="No data for grade distribution", bg="white", fg="#7f8c8d", font=("Arial", 12)).grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-            else:
-                fig_pie, axp = plt.subplots(figsize=(6.5, 3.2))
-                fig_pie.patch.set_facecolor('white')
-                colors = ['#2ecc71', '#27ae60', '#3498db', '#f1c40f', '#e67e22', '#e74c3c']
-                wedges, texts, autotexts = axp.pie(counts, labels=order, autopct='%1.0f%%', startangle=90, colors=colors, pctdistance=0.8)
-                centre_circle = plt.Circle((0,0), 0.55, fc='white')
-                axp.add_artist(centre_circle)
-                axp.set_title('Predicted Grade Distribution')
-                plt.tight_layout()
-                canvas_pie = FigureCanvasTkAgg(fig_pie, master=self.pred_pie_frame)
-                canvas_pie.draw()
-                canvas_pie.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-        except Exception:
-            tk.Label(self.pred_pie_frame, text="Failed to render pie chart", bg="white", fg="#e74c3c", font=("Arial", 12)).grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+            self.pred_pie_chart.update(order, [grades.count(g) for g in order])
+        except Exception as e:
+            print(f"[WARN] Failed to render pie chart: {e}")
+            self.pred_pie_chart.show_message("Failed to render pie chart")
 
     def predict_student_subject_dialog(self):
         # Deprecated in simplified UI; keep no-op for compatibility
@@ -1033,89 +1121,11 @@ class AdminDashboard:
         # Recreate the top students section
         self.create_top_students_section()
     
-    def load_students(self):
-        """Load students data"""
-        # Clear existing items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        students = db.get_all_students()
-        for student in students:
-            self.students_tree.insert('', 'end', values=(
-                student['student_id'],
-                student['fullname'],
-                student['email'],
-                student['phone'],
-                student['gender'],
-                student['status']
-            ))
-    
-    def load_teachers(self):
-        """Load teachers data"""
-        # Clear existing items
-        for item in self.teachers_tree.get_children():
-            self.teachers_tree.delete(item)
-        
-        teachers = db.get_all_teachers()
-        for teacher in teachers:
-            self.teachers_tree.insert('', 'end', values=(
-                teacher['teacher_id'],
-                teacher['fullname'],
-                teacher['email'],
-                teacher['phone'],
-                teacher['department'],
-                teacher['status']
-            ))
-    
-    def filter_students(self, *args):
-        """Filter students based on search"""
-        search_term = self.student_search_var.get().lower()
-        
-        # Clear existing items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        students = db.get_all_students()
-        for student in students:
-            if (search_term in student['fullname'].lower() or 
-                search_term in student['email'].lower() or
-                search_term in str(student['student_id'])):
-                self.students_tree.insert('', 'end', values=(
-                    student['student_id'],
-                    student['fullname'],
-                    student['email'],
-                    student['phone'],
-                    student['gender'],
-                    student['status']
-                ))
-    
-    def filter_teachers(self, *args):
-        """Filter teachers based on search"""
-        search_term = self.teacher_search_var.get().lower()
-        
-        # Clear existing items
-        for item in self.teachers_tree.get_children():
-            self.teachers_tree.delete(item)
-        
-        teachers = db.get_all_teachers()
-        for teacher in teachers:
-            if (search_term in teacher['fullname'].lower() or 
-                search_term in teacher['email'].lower() or
-                search_term in str(teacher['teacher_id'])):
-                self.teachers_tree.insert('', 'end', values=(
-                    teacher['teacher_id'],
-                    teacher['fullname'],
-                    teacher['email'],
-                    teacher['phone'],
-                    teacher['department'],
-                    teacher['status']
-                ))
-    
     def add_student(self):
         """Add new student - persists to DB and refreshes table"""
         form = tk.Toplevel(self.root)
         form.title("Add New Student")
-        form.geometry("480x560")
+        form.geometry("480x600")
         form.resizable(False, False)
 
         # Form variables
@@ -1128,6 +1138,7 @@ class AdminDashboard:
         gender_var = tk.StringVar(value="Male")
         address_var = tk.StringVar()
         status_var = tk.StringVar(value="Active")
+        grade_var = tk.StringVar(value="Unassigned")
 
         row = 0
         def add_row(label_text, widget):
@@ -1166,6 +1177,12 @@ class AdminDashboard:
         status_combo.grid(row=row, column=1, padx=20, pady=8, sticky="w")
         row += 1
 
+        # Grade level (the performance dashboard filters on it)
+        tk.Label(form, text="Grade Level", font=("Arial", 11)).grid(row=row, column=0, padx=20, pady=8, sticky="w")
+        grade_combo = ttk.Combobox(form, textvariable=grade_var, values=GRADE_LEVEL_CHOICES, state="readonly", width=18)
+        grade_combo.grid(row=row, column=1, padx=20, pady=8, sticky="w")
+        row += 1
+
         def submit():
             username = username_entry.get().strip()
             password = password_entry.get().strip()
@@ -1176,6 +1193,7 @@ class AdminDashboard:
             gender = gender_var.get().strip() or "Male"
             address = address_entry.get().strip()
             status = status_var.get().strip()
+            grade_level = int(grade_var.get()) if grade_var.get().isdigit() else None
 
             # Core required fields only
             required_map = {
@@ -1229,12 +1247,11 @@ class AdminDashboard:
                     return
 
             # Persist to DB
-            ok = db.add_student(username, password, fullname, email, phone, dob, gender, address, status)
+            ok = db.add_student(username, password, fullname, email, phone, dob, gender, address, status, grade_level)
             if ok:
                 messagebox.showinfo("Success", "Student added successfully.", parent=form)
-                # refresh table and dashboard
-                self.load_students()
-                self.load_dashboard_data()
+                # refresh table now; dependent pages reload when next shown
+                self.mark_stale('students', 'predictions', 'dashboard', 'at_risk')
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to add student. Username or email may already exist.", parent=form)
@@ -1247,21 +1264,19 @@ class AdminDashboard:
     
     def edit_student(self):
         """Edit selected student"""
-        selection = self.students_tree.selection()
-        if not selection:
+        values = self.students_tree.selected_row()
+        if not values:
             messagebox.showwarning("Warning", "Please select a student to edit")
             return
-        item = self.students_tree.item(selection[0])
-        values = item['values']
         form = tk.Toplevel(self.root)
         form.title("Edit Student")
-        form.geometry("520x520")
+        form.geometry("520x560")
         form.resizable(False, False)
 
         # Fetch additional fields not in the table
         student_id = values[0]
         current = db.execute_query(
-            "SELECT fullname, email, phone, date_of_birth, gender, address, status FROM students WHERE student_id = %s",
+            "SELECT fullname, email, phone, date_of_birth, gender, address, status, grade_level FROM students WHERE student_id = %s",
             (student_id,)
         )
         cur = current[0] if current else {}
@@ -1277,6 +1292,7 @@ class AdminDashboard:
         gender_var = tk.StringVar(value=cur.get('gender', values[4]))
         address_value = cur.get('address', '') or ''
         status_var = tk.StringVar(value=cur.get('status', values[5]))
+        grade_var = tk.StringVar(value=str(cur['grade_level']) if cur.get('grade_level') is not None else "Unassigned")
 
         row = 0
         def add_row(label_text, widget):
@@ -1316,6 +1332,12 @@ class AdminDashboard:
         status_combo.grid(row=row, column=1, padx=20, pady=8, sticky="w")
         row += 1
 
+        # Grade level (the performance dashboard filters on it)
+        tk.Label(form, text="Grade Level", font=("Arial", 11)).grid(row=row, column=0, padx=20, pady=8, sticky="w")
+        grade_combo = ttk.Combobox(form, textvariable=grade_var, values=GRADE_LEVEL_CHOICES, state="readonly", width=18)
+        grade_combo.grid(row=row, column=1, padx=20, pady=8, sticky="w")
+        row += 1
+
         def submit():
             full_name = fullname_entry.get().strip()
             email = email_entry.get().strip()
@@ -1324,6 +1346,7 @@ class AdminDashboard:
             gender = gender_var.get().strip() or "Male"
             address = address_entry.get().strip() or None
             status = status_var.get().strip()
+            grade_level = int(grade_var.get()) if grade_var.get().isdigit() else None
 
             if not full_name or not email:
                 messagebox.showerror("Error", "Full name and email are required.", parent=form)
@@ -1347,9 +1370,10 @@ class AdminDashboard:
             else:
                 dob = None
 
-            if db.update_student(student_id, full_name, email, phone or None, dob, gender, address, status):
+            if db.update_student(student_id, full_name, email, phone or None, dob, gender, address, status,
+                                 grade_level):
                 messagebox.showinfo("Success", "Student updated successfully.", parent=form)
-                self.load_students()
+                self.mark_stale('students', 'predictions', 'dashboard', 'at_risk')
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to update student.", parent=form)
@@ -1362,30 +1386,26 @@ class AdminDashboard:
     
     def delete_student(self):
         """Delete selected student"""
-        selection = self.students_tree.selection()
-        if not selection:
+        row = self.students_tree.selected_row()
+        if not row:
             messagebox.showwarning("Warning", "Please select a student to delete")
             return
         
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this student?"):
-            item = self.students_tree.item(selection[0])
-            student_id = item['values'][0]
+            student_id = row[0]
             
             if db.delete_student(student_id):
                 messagebox.showinfo("Success", "Student deleted successfully")
-                self.load_students()
-                self.load_dashboard_data()
+                self.mark_stale('students', 'predictions', 'dashboard', 'at_risk')
             else:
                 messagebox.showerror("Error", "Failed to delete student")
     
     def view_student_marks(self):
         """View marks for selected student in a modal table"""
-        selection = self.students_tree.selection()
-        if not selection:
+        values = self.students_tree.selected_row()
+        if not values:
             messagebox.showwarning("Warning", "Please select a student to view marks")
             return
-        item = self.students_tree.item(selection[0])
-        values = item['values']
         student_id = values[0]
         student_name = values[1]
 
@@ -1532,8 +1552,7 @@ class AdminDashboard:
             ok = db.add_teacher(username, password, fullname, email, phone, department, qualification, status)
             if ok:
                 messagebox.showinfo("Success", "Teacher added successfully.", parent=form)
-                self.load_teachers()
-                self.load_dashboard_data()
+                self.mark_stale('teachers', 'dashboard')
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to add teacher. Username or email may already exist.", parent=form)
@@ -1546,12 +1565,10 @@ class AdminDashboard:
     
     def edit_teacher(self):
         """Edit selected teacher"""
-        selection = self.teachers_tree.selection()
-        if not selection:
+        values = self.teachers_tree.selected_row()
+        if not values:
             messagebox.showwarning("Warning", "Please select a teacher to edit")
             return
-        item = self.teachers_tree.item(selection[0])
-        values = item['values']
         form = tk.Toplevel(self.root)
         form.title("Edit Teacher")
         form.geometry("520x460")
@@ -1616,7 +1633,7 @@ class AdminDashboard:
                 return
             if db.update_teacher(teacher_id, full_name, email, phone, department, qualification, status):
                 messagebox.showinfo("Success", "Teacher updated successfully.", parent=form)
-                self.load_teachers()
+                self.mark_stale('teachers', 'dashboard')
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to update teacher.", parent=form)
@@ -1629,19 +1646,17 @@ class AdminDashboard:
     
     def delete_teacher(self):
         """Delete selected teacher"""
-        selection = self.teachers_tree.selection()
-        if not selection:
+        row = self.teachers_tree.selected_row()
+        if not row:
             messagebox.showwarning("Warning", "Please select a teacher to delete")
             return
         
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this teacher?"):
-            item = self.teachers_tree.item(selection[0])
-            teacher_id = item['values'][0]
+            teacher_id = row[0]
             
             if db.delete_teacher(teacher_id):
                 messagebox.showinfo("Success", "Teacher deleted successfully")
-                self.load_teachers()
-                self.load_dashboard_data()
+                self.mark_stale('teachers', 'dashboard')
             else:
                 messagebox.showerror("Error", "Failed to delete teacher")
     
@@ -1668,85 +1683,60 @@ class AdminDashboard:
     
     def load_students(self):
         """Load students data"""
-        # Clear existing items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        students = db.get_all_students()
-        for student in students:
-            self.students_tree.insert('', 'end', values=(
-                student['student_id'],
-                student['fullname'],
-                student['email'],
-                student['phone'],
-                student['gender'],
-                student['status'],
-                student['enrollment_date']
-            ))
+        students = db.get_all_students() or []
+        self.students_tree.set_rows([(
+            student['student_id'],
+            student['fullname'],
+            student['email'],
+            student['phone'],
+            student['gender'],
+            student['status'],
+            student['enrollment_date']
+        ) for student in students], keys=[student['student_id'] for student in students])
+        # Indexed in the background now; rows unchanged since the last build are reused
+        self.student_index.set_rows(self.students_tree.rows, keys=self.students_tree.keys)
+        self.filter_students()
     
     def load_teachers(self):
         """Load teachers data"""
-        # Clear existing items
-        for item in self.teachers_tree.get_children():
-            self.teachers_tree.delete(item)
-        
-        teachers = db.get_all_teachers()
-        for teacher in teachers:
-            self.teachers_tree.insert('', 'end', values=(
-                teacher['teacher_id'],
-                teacher['fullname'],
-                teacher['email'],
-                teacher['phone'],
-                teacher['department'],
-                teacher['qualification'],
-                teacher['status']
-            ))
+        teachers = db.get_all_teachers() or []
+        self.teachers_tree.set_rows([(
+            teacher['teacher_id'],
+            teacher['fullname'],
+            teacher['email'],
+            teacher['phone'],
+            teacher['department'],
+            teacher['qualification'],
+            teacher['status']
+        ) for teacher in teachers], keys=[teacher['teacher_id'] for teacher in teachers])
+        self.teacher_index.set_rows(self.teachers_tree.rows, keys=self.teachers_tree.keys)
+        self.filter_teachers()
+    
+    def _search_pending(self, index, query_var, retry):
+        """While the index is still building, try the search again shortly instead of waiting"""
+        if not query_var.get().strip() or index.ready:
+            return False
+        self.root.after(SEARCH_RETRY_MS, retry)
+        return True
     
     def filter_students(self, *args):
-        """Filter students based on search"""
-        search_term = self.student_search_var.get().lower()
-        students = db.get_all_students()
-        
-        # Clear existing items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        # Filter and insert
-        for student in students:
-            if (search_term in student['fullname'].lower() or 
-                search_term in student['email'].lower()):
-                self.students_tree.insert('', 'end', values=(
-                    student['student_id'],
-                    student['fullname'],
-                    student['email'],
-                    student['phone'],
-                    student['gender'],
-                    student['status'],
-                    student['enrollment_date']
-                ))
+        """Filter students by name or email, best matches first"""
+        if self._search_pending(self.student_index, self.student_search_var, self.filter_students):
+            return
+        hits = self.student_index.search(self.student_search_var.get())
+        if hits is None:
+            self.students_tree.set_filter(None)
+        else:
+            self.students_tree.set_view(hits)
     
     def filter_teachers(self, *args):
-        """Filter teachers based on search"""
-        search_term = self.teacher_search_var.get().lower()
-        teachers = db.get_all_teachers()
-        
-        # Clear existing items
-        for item in self.teachers_tree.get_children():
-            self.teachers_tree.delete(item)
-        
-        # Filter and insert
-        for teacher in teachers:
-            if (search_term in teacher['fullname'].lower() or 
-                search_term in teacher['email'].lower() or
-                search_term in teacher['department'].lower()):
-                self.teachers_tree.insert('', 'end', values=(
-                    teacher['teacher_id'],
-                    teacher['fullname'],
-                    teacher['email'],
-                    teacher['phone'],
-                    teacher['department'],
-                    teacher['qualification'],
-                    teacher['status']
-                ))
+        """Filter teachers by name, email or department, best matches first"""
+        if self._search_pending(self.teacher_index, self.teacher_search_var, self.filter_teachers):
+            return
+        hits = self.teacher_index.search(self.teacher_search_var.get())
+        if hits is None:
+            self.teachers_tree.set_filter(None)
+        else:
+            self.teachers_tree.set_view(hits)
     
     
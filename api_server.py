@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Optional local read-only HTTP/JSON API over the Database read methods.
+
+One process serves every client from a shared MySQL connection pool and a
+shared result cache, so N dashboards asking for the same aggregates cost
+one query per TTL instead of N. Responses carry an ETag (hash of the JSON
+body); a client that sends it back in If-None-Match gets 304 Not Modified
+with no body. Concurrent misses for the same URL wait for one query
+rather than each running it. A response whose queries failed is answered
+with 503 (no-store) and never cached.
+
+Endpoints (GET):
+    /api/system_stats
+    /api/top_students?limit=3
+    /api/subject_averages?limit=8
+    /api/monthly_trends?months=6
+    /api/gender_distribution
+    /api/students/<id>/marks
+    /api/students/<id>/predictions     mean and 10-90% band per subject
+    /api/at_risk?after=0&limit=50
+    /api/health                        pool and cache counters (never cached)
+
+ApiClient mirrors the Database method names, so code that only reads can
+take an ApiClient in place of `db`.
+
+Usage:
+    python api_server.py serve --port 8765 --pool-size 8 --ttl 5
+    python api_server.py swarm --clients 50 --requests 200      # load test a running server
+"""
+
+import argparse
+import datetime as dt
+import decimal
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TTL = 5.0            # seconds a cached response is served before re-querying
+MAX_CACHE_ENTRIES = 4096
+MAX_LIMIT = 500
+
+
+class QueryFailed(Exception):
+    """A query behind a response failed (the Database method masked it or returned None)"""
+
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if isinstance(value, dt.timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _make_pooled_database(pool_size=DEFAULT_POOL_SIZE, database=None):
+    """A Database whose queries borrow connections from one shared pool.
+
+    Built lazily so the module imports without MySQL (e.g. for ApiClient).
+    Writes are refused: the API is read-only.
+    """
+    from mysql.connector import Error, pooling
+    from database import DB_NAME, Database
+
+    class PooledDatabase(Database):
+        def __init__(self, size):
+            self.database = database or DB_NAME
+            self.connection = None
+            self._mark_listeners = []
+            self.pool_size = size
+            # get_connection() fails at once when the pool is empty; the
+            # semaphore makes request threads wait for a free connection instead
+            self._slots = threading.BoundedSemaphore(size)
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name="spms_api", pool_size=size, pool_reset_session=False,
+                host='localhost', user='root', password='',
+                database=self.database, charset='utf8mb4', autocommit=True)
+            self.queries = 0
+            # Per request thread: set when a query fails, so masked failures still surface
+            self._failed = threading.local()
+
+        def take_failure(self):
+            """True if a query on this thread failed since the last call"""
+            failed = getattr(self._failed, "value", False)
+            self._failed.value = False
+            return failed
+
+        def connect(self):
+            return True
+
+        def execute_query(self, query, params=None):
+            with self._slots:
+                try:
+                    conn = self._pool.get_connection()
+                except Error as e:
+                    print(f"[ERROR] No pooled connection: {e}")
+                    self._failed.value = True
+                    return None
+                try:
+                    cursor = conn.cursor(dictionary=True)
+                    cursor.execute(query, params or ())
+                    result = cursor.fetchall()
+                    cursor.close()
+                    self.queries += 1
+                    return result
+                except Error as e:
+                    print(f"[ERROR] Query error: {e}")
+                    self._failed.value = True
+                    return None
+                finally:
+                    conn.close()  # back to the pool
+
+        def execute_update(self, query, params=None):
+            print("[ERROR] The API database is read-only")
+            return False
+
+        def execute_many(self, query, rows):
+            return self.execute_update(query)
+
+    return PooledDatabase(pool_size)
+
+
+class ResultCache:
+    """TTL cache of encoded responses: key -> (etag, body, expires).
+
+    A per-key lock lets one thread compute a missing entry while others
+    asking for the same key wait for it (no stampede on expiry).
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=MAX_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _fresh(self, key, now):
+        entry = self._entries.get(key)
+        return entry if entry is not None and entry[2] > now else None
+
+    def get(self, key, compute):
+        """(etag, body) for key, calling compute() -> bytes only on a miss"""
+        entry = self._fresh(key, time.monotonic())
+        if entry is not None:
+            self.hits += 1
+            return entry[0], entry[1]
+        with self._key_lock(key):
+            entry = self._fresh(key, time.monotonic())
+            if entry is not None:
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+            body = compute()
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._evict(time.monotonic())
+                self._entries[key] = (etag, body, time.monotonic() + self.ttl)
+            return etag, body
+
+    def _evict(self, now):
+        expired = [k for k, e in self._entries.items() if e[2] <= now]
+        for k in expired or list(self._entries)[:len(self._entries) // 2]:
+            self._entries.pop(k, None)
+            self._key_locks.pop(k, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _int_arg(query, name, default, lo=0, hi=MAX_LIMIT):
+    try:
+        value = int(query.get(name, [default])[0])
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+    return max(lo, min(value, hi))
+
+
+class ApiService:
+    """Routes a path + query string to a Database read method."""
+
+    _STUDENT_ROUTE = re.compile(r"^/api/students/(\d+)/(marks|predictions)$")
+
+    def __init__(self, db, ttl=DEFAULT_TTL):
+        self.db = db
+        self.cache = ResultCache(ttl)
+        self.started = time.time()
+        self.requests = 0
+        self.not_modified = 0
+
+    def resolve(self, path, query):
+        """(cache key, compute) for a request; compute() returns the JSON-able result"""
+        db = self.db
+        if path == "/api/system_stats":
+            return path, db.get_system_stats
+        if path == "/api/top_students":
+            limit = _int_arg(query, "limit", 3, lo=1)
+            return f"{path}?limit={limit}", lambda: db.get_top_students(limit)
+        if path == "/api/subject_averages":
+            limit = _int_arg(query, "limit", 8, lo=1)
+            return f"{path}?limit={limit}", lambda: db.get_subject_average_percentages(limit)
+        if path == "/api/monthly_trends":
+            months = _int_arg(query, "months", 6, lo=1, hi=120)
+            return f"{path}?months={months}", lambda: db.get_monthly_trends_average(months)
+        if path == "/api/gender_distribution":
+            return path, db.get_gender_distribution
+        if path == "/api/at_risk":
+            after = _int_arg(query, "after", 0, hi=2 ** 31)
+            limit = _int_arg(query, "limit", 50, lo=1)
+            return f"{path}?after={after}&limit={limit}", lambda: db.get_at_risk_page(after, limit)
+        match = self._STUDENT_ROUTE.match(path)
+        if match:
+            student_id = int(match.group(1))
+            if match.group(2) == "marks":
+                return path, lambda: db.get_student_marks(student_id)
+            return path, lambda: self._predictions(student_id)
+        return None, None
+
+    def _predictions(self, student_id):
+        from ml_model import load_predictor, predict_with_interval, percentage_to_grade
+        model = load_predictor()
+        if not model:
+            return {"model_version": None, "subjects": []}
+        marks = self.db.get_student_marks(student_id)
+        if marks is None:
+            raise QueryFailed(f"marks of student {student_id}")
+        names = {int(m['subject_id']): m['subject_name'] for m in marks if m.get('subject_id') is not None}
+        by_key = predict_with_interval(model, [(student_id, sid) for sid in names], db=self.db)
+        subjects = []
+        for sid, name in sorted(names.items(), key=lambda kv: str(kv[1])):
+            r = by_key.get((student_id, sid))
+            if r is not None:
+                subjects.append({"subject_id": sid, "subject_name": name, "predicted_pct": round(r["mean"], 2),
+                                 "low_pct": round(r["low"], 2), "high_pct": round(r["high"], 2),
+                                 "predicted_grade": percentage_to_grade(r["mean"])})
+        return {"model_version": model.get("version"), "subjects": subjects}
+
+    def run(self, compute):
+        """compute() for a response; raises QueryFailed if it returned None or any of its queries failed"""
+        take_failure = getattr(self.db, "take_failure", None)
+        if take_failure is not None:
+            take_failure()
+        result = compute()
+        if result is None or (take_failure is not None and take_failure()):
+            raise QueryFailed("query failed")
+        return result
+
+    def health(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "db_queries": getattr(self.db, "queries", None),
+            "pool_size": getattr(self.db, "pool_size", None),
+        }
+
+
+def encode(result):
+    return json.dumps(result, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "SPMSApi/1.0"
+    protocol_version = "HTTP/1.1"   # keep-alive, so swarm clients reuse sockets
+
+    def do_GET(self):
+        api = self.server.api
+        api.requests += 1
+        url = urlsplit(self.path)
+        if url.path == "/api/health":
+            self._send(200, encode(api.health()), cache=False)
+            return
+        try:
+            key, compute = api.resolve(url.path, parse_qs(url.query))
+        except ValueError as e:
+            self._send(400, encode({"error": str(e)}), cache=False)
+            return
+        if key is None:
+            self._send(404, encode({"error": f"no such endpoint: {url.path}"}), cache=False)
+            return
+        try:
+            # Raising inside the cache leaves no entry behind, so the next request re-queries
+            etag, body = api.cache.get(key, lambda: encode(api.run(compute)))
+        except QueryFailed as e:
+            print(f"[ERROR] {url.path}: {e}")
+            self._send(503, encode({"error": "database unavailable"}), cache=False)
+            return
+        except Exception as e:
+            print(f"[ERROR] {url.path} failed: {e}")
+            self._send(500, encode({"error": "query failed"}), cache=False)
+            return
+        if etag in [t.strip() for t in (self.headers.get("If-None-Match") or "").split(",")]:
+            api.not_modified += 1
+            self._send(304, b"", etag=etag)
+            return
+        self._send(200, body, etag=etag)
+
+    def _send(self, status, body, etag=None, cache=True):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        ttl = int(self.server.api.cache.ttl)
+        self.send_header("Cache-Control", f"max-age={ttl}" if cache else "no-store")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass  # one line per request would dominate a load test
+
+
+def make_server(db, host=DEFAULT_HOST, port=DEFAULT_PORT, ttl=DEFAULT_TTL):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.api = ApiService(db, ttl)
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=DEFAULT_POOL_SIZE, ttl=DEFAULT_TTL):
+    db = _make_pooled_database(pool_size)
+    server = make_server(db, host, port, ttl)
+    print(f"[OK] API listening on http://{host}:{port} (pool {pool_size}, ttl {ttl:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class ApiClient:
+    """Read-only stand-in for `db` backed by the API.
+
+    Keeps the last ETag and body per URL and revalidates with
+    If-None-Match, so unchanged results cost a 304 and no JSON parsing.
+    One client per thread (it holds one keep-alive connection).
+    """
+
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=10):
+        from http.client import HTTPConnection
+        url = urlsplit(base_url)
+        self._conn = HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        self._etags = {}
+        self.not_modified = 0
+
+    def get(self, path):
+        headers = {}
+        cached = self._etags.get(path)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        try:
+            self._conn.request("GET", path, headers=headers)
+            response = self._conn.getresponse()
+        except (ConnectionError, OSError):
+            self._conn.close()  # reconnect once on a dropped keep-alive socket
+            self._conn.request("GET", path, headers=headers)
+            response = self._conn.getresponse()
+        body = response.read()
+        if response.status == 304 and cached:
+            self.not_modified += 1
+            return cached[1]
+        if response.status != 200:
+            raise RuntimeError(f"GET {path} -> {response.status}: {body[:200]!r}")
+        result = json.loads(body)
+        etag = response.getheader("ETag")
+        if etag:
+            self._etags[path] = (etag, result)
+        return result
+
+    def close(self):
+        self._conn.close()
+
+    def get_system_stats(self):
+        return self.get("/api/system_stats")
+
+    def get_top_students(self, limit=3):
+        return self.get(f"/api/top_students?limit={int(limit)}")
+
+    def get_subject_average_percentages(self, limit=8):
+        return self.get(f"/api/subject_averages?limit={int(limit)}")
+
+    def get_monthly_trends_average(self, months=6):
+        return self.get(f"/api/monthly_trends?months={int(months)}")
+
+    def get_gender_distribution(self):
+        return self.get("/api/gender_distribution")
+
+    def get_student_marks(self, student_id):
+        return self.get(f"/api/students/{int(student_id)}/marks")
+
+    def get_student_predictions(self, student_id):
+        return self.get(f"/api/students/{int(student_id)}/predictions")
+
+    def get_at_risk_page(self, after_rank=0, limit=50):
+        return self.get(f"/api/at_risk?after={int(after_rank)}&limit={int(limit)}")
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))]
+
+
+def swarm(base_url, clients=20, requests_per_client=100, student_ids=(1, 2, 3, 4, 5)):
+    """Load test: `clients` threads, each a dashboard-like mix of reads. Returns the summary."""
+    mix = ["/api/system_stats", "/api/top_students?limit=3", "/api/subject_averages?limit=8",
+           "/api/monthly_trends?months=6", "/api/gender_distribution"]
+    mix += [f"/api/students/{s}/marks" for s in student_ids]
+    latencies, errors = [], []
+    results_lock = threading.Lock()
+    not_modified = [0]
+
+    def run_client(n):
+        client = ApiClient(base_url)
+        mine = []
+        try:
+            for i in range(requests_per_client):
+                path = mix[(n + i) % len(mix)]
+                t0 = time.perf_counter()
+                try:
+                    client.get(path)
+                    mine.append(time.perf_counter() - t0)
+                except Exception as e:
+                    with results_lock:
+                        errors.append(str(e))
+        finally:
+            client.close()
+        with results_lock:
+            latencies.extend(mine)
+            not_modified[0] += client.not_modified
+
+    threads = [threading.Thread(target=run_client, args=(n,), daemon=True) for n in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    summary = {
+        "clients": clients,
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "not_modified": not_modified[0],
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+    print(f"[OK] {summary['requests']} requests from {clients} clients in {summary['elapsed_s']}s: "
+          f"{summary['req_per_s']} req/s, p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+          f"p99 {summary['p99_ms']} ms, {summary['not_modified']} not modified")
+    if errors:
+        print(f"[WARN] {len(errors)} failed requests, e.g. {errors[0]}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API for the dashboards")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_serve = sub.add_parser("serve", help="run the API server")
+    p_serve.add_argument("--host", default=DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="MySQL connections")
+    p_serve.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="seconds results are cached")
+    p_swarm = sub.add_parser("swarm", help="load test a running server with many clients")
+    p_swarm.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    p_swarm.add_argument("--clients", type=int, default=20)
+    p_swarm.add_argument("--requests", type=int, default=100, help="requests per client")
+    p_swarm.add_argument("--students", type=int, nargs="+", default=[1, 2, 3, 4, 5],
+                         help="student ids whose marks the clients read")
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.host, args.port, args.pool_size, args.ttl)
+    else:
+        swarm(args.url, args.clients, args.requests, args.students)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+At-risk student detection job.
+
+Scores every active student and subject with the current grade predictor
+and flags anyone predicted a D or F, or whose recent marks in a subject
+are trending down. Students are processed in chunks: the main thread
+fetches each chunk's marks while a thread pool scores earlier chunks
+(feature building and the compiled forest are NumPy, which releases the
+GIL). Results are written to a fresh table and swapped in as `at_risk`
+with one RENAME, so the admin page always reads a complete, ranked run.
+
+Usage:
+    python at_risk.py                      # e.g. nightly from cron
+    python at_risk.py --workers 8 --chunk-size 1000
+"""
+
+import argparse
+import datetime as dt
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from database import AT_RISK_DDL
+
+# Predicted below this (a D or F from percentage_to_grade) flags a student. Not the
+# pass mark: the dashboard's pass / fail split uses marks_cube.PASS_PCT
+AT_RISK_BELOW_PCT = 60.0
+TREND_WINDOW = 4           # latest marks per subject used for the trend
+TREND_MIN_MARKS = 3
+TREND_SLOPE = -3.0         # pct points per exam at or below this counts as trending down
+TREND_WEIGHT = 2.0         # risk points per pct point of decline per exam
+
+
+def trend_slopes(marks, student_ids, subject_ids):
+    """Least-squares slope (pct per exam) of each key's latest TREND_WINDOW marks.
+
+    NaN where a subject has fewer than TREND_MIN_MARKS marks. One sort and a
+    few bincounts cover every key.
+    """
+    from features import pair_codes
+    slopes = np.full(len(student_ids), np.nan)
+    if not len(marks["pct"]):
+        return slopes
+    pairs = pair_codes(marks["student_id"], marks["subject_id"])
+    order = np.lexsort((marks["mark_id"], marks["day"], pairs))
+    g = pairs[order]
+    y = marks["pct"][order]
+    ends = np.flatnonzero(np.append(g[1:] != g[:-1], True))
+    group = np.cumsum(np.concatenate(([0], (g[1:] != g[:-1]).astype(np.int64))))
+    from_end = ends[group] - np.arange(len(g))
+    keep = from_end < TREND_WINDOW
+    x = -from_end[keep].astype(np.float64)  # latest mark at x = 0
+    y, group = y[keep], group[keep]
+    n_groups = len(ends)
+    n = np.bincount(group, minlength=n_groups).astype(np.float64)
+    sx = np.bincount(group, x, n_groups)
+    sy = np.bincount(group, y, n_groups)
+    sxy = np.bincount(group, x * y, n_groups)
+    sxx = np.bincount(group, x * x, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    slope[n < TREND_MIN_MARKS] = np.nan
+
+    want = pair_codes(np.asarray(student_ids), np.asarray(subject_ids))
+    uniq = g[ends]
+    pos = np.minimum(np.searchsorted(uniq, want), len(uniq) - 1)
+    found = uniq[pos] == want
+    slopes[found] = slope[pos[found]]
+    return slopes
+
+
+def score_chunk(model_bundle, marks):
+    """Score every (student, subject) pair in a marks chunk; returns flagged rows."""
+    from features import features_for_keys
+    from ml_model import predict_band, percentage_to_grade
+    if not len(marks["pct"]):
+        return []
+    pairs = np.unique(np.column_stack([marks["student_id"], marks["subject_id"]]), axis=0)
+    student_ids, subject_ids = pairs[:, 0], pairs[:, 1]
+    fill_mean = (model_bundle.get("manifest") or {}).get("fill_mean")
+    X, attempts = features_for_keys(marks, student_ids, subject_ids, fill_mean=fill_mean)
+    mean, low, high = predict_band(model_bundle, X)
+    slopes = trend_slopes(marks, student_ids, subject_ids)
+
+    low_grade = mean < AT_RISK_BELOW_PCT
+    falling = ~np.isnan(slopes) & (slopes <= TREND_SLOPE)
+    flagged = np.flatnonzero((low_grade | falling) & (attempts > 0))
+    decline = np.where(np.isnan(slopes), 0.0, np.maximum(-slopes, 0.0))
+    risk = np.maximum(AT_RISK_BELOW_PCT - mean, 0.0) + TREND_WEIGHT * decline
+    rows = []
+    for i in flagged:
+        reason = "+".join(r for r, hit in (("grade", low_grade[i]), ("trend", falling[i])) if hit)
+        rows.append({
+            "student_id": int(student_ids[i]),
+            "subject_id": int(subject_ids[i]),
+            "predicted_pct": round(float(mean[i]), 2),
+            "low_pct": round(float(low[i]), 2),
+            "high_pct": round(float(high[i]), 2),
+            "predicted_grade": percentage_to_grade(float(mean[i])),
+            "trend_slope": None if np.isnan(slopes[i]) else round(float(slopes[i]), 2),
+            "reason": reason,
+            "risk_score": round(float(risk[i]), 2),
+        })
+    return rows
+
+
+def _active_student_ids(db):
+    rows = db.execute_query("SELECT student_id FROM students WHERE status = 'Active' ORDER BY student_id") or []
+    return [int(r["student_id"]) for r in rows]
+
+
+def _write_table(db, rows, model_version):
+    """Write ranked rows to at_risk_new and atomically swap it in as at_risk."""
+    scored_at = dt.datetime.now().replace(microsecond=0)
+    db.execute_update("DROP TABLE IF EXISTS at_risk_new")
+    if not db.execute_update(AT_RISK_DDL.format(table="at_risk_new")):
+        return False
+    ok = db.execute_many(
+        "INSERT INTO at_risk_new (rank_no, student_id, subject_id, predicted_pct, low_pct, high_pct, "
+        "predicted_grade, trend_slope, reason, risk_score, model_version, scored_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        [(rank, r["student_id"], r["subject_id"], r["predicted_pct"], r["low_pct"], r["high_pct"],
+          r["predicted_grade"], r["trend_slope"], r["reason"], r["risk_score"], model_version, scored_at)
+         for rank, r in enumerate(rows, start=1)]
+    )
+    if not ok:
+        return False
+    db.execute_update(AT_RISK_DDL.format(table="at_risk"))
+    # RENAME swaps both names in one step; readers never see a partial table
+    if not db.execute_update("RENAME TABLE at_risk TO at_risk_old, at_risk_new TO at_risk"):
+        return False
+    db.execute_update("DROP TABLE IF EXISTS at_risk_old")
+    return True
+
+
+def run(chunk_size=500, workers=4):
+    """Score the whole school and replace the at_risk table. Returns the flagged count."""
+    from database import db
+    from features import fetch_marks
+    from ml_model import load_predictor
+    model_bundle = load_predictor()
+    if not model_bundle:
+        print("[WARN] No grade predictor available; train one first")
+        return None
+    student_ids = _active_student_ids(db)
+    started = time.perf_counter()
+    rows = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start in range(0, len(student_ids), chunk_size):
+            # DB reads stay on this thread; scoring overlaps with the next fetch
+            marks = fetch_marks(db, student_ids=student_ids[start:start + chunk_size])
+            pending.append(pool.submit(score_chunk, model_bundle, marks))
+            if len(pending) >= 2 * workers:  # bound the chunks held in memory
+                rows.extend(pending.pop(0).result())
+        for future in pending:
+            rows.extend(future.result())
+    rows.sort(key=lambda r: (-r["risk_score"], r["predicted_pct"], r["student_id"], r["subject_id"]))
+    elapsed = time.perf_counter() - started
+    if not _write_table(db, rows, model_bundle.get("version") or "unversioned"):
+        print("[ERROR] Failed to write the at_risk table")
+        return None
+    print(f"[OK] Scored {len(student_ids)} students in {elapsed:.1f}s; {len(rows)} at-risk student-subjects")
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag at-risk students across the school")
+    parser.add_argument("--chunk-size", type=int, default=500, help="students per scoring batch")
+    parser.add_argument("--workers", type=int, default=4, help="scoring threads")
+    args = parser.parse_args()
+    run(chunk_size=args.chunk_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmark every public Database read method against synthetic datasets.
+
+For each size, the dataset is loaded once into its own schema
+(spms_bench_<size>, via synthetic_data.ensure_dataset) and each read
+method is called --runs times with arguments sampled from that dataset
+(the same ones every run, from --seed). Per method and size it records
+p50/p95/p99/mean latency, rows returned and bytes the server sent
+(the session's Bytes_sent delta, minus the cost of reading it).
+
+Results go to JSON. With --baseline, each method's p95 is compared to the
+stored run and anything slower by more than --threshold (and by more than
+--min-ms, so sub-millisecond noise is ignored) is flagged as a
+regression; the exit status is then 1.
+
+Usage:
+    python bench_database.py --sizes 10k 100k --json bench.json
+    python bench_database.py --sizes 100k --json bench.json --baseline baseline.json
+    python bench_database.py --sizes 10k 100k 1m --save-baseline baseline.json
+"""
+
+import argparse
+import datetime as dt
+import inspect
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_SIZES = ("10k", "100k")
+DEFAULT_RUNS = 30
+DEFAULT_THRESHOLD = 0.20      # 20% slower p95 is a regression
+DEFAULT_MIN_MS = 0.5
+SAMPLE_IDS = 50               # distinct students / teachers / users the calls rotate through
+
+# Database methods that look like reads but are not benchmarked as such
+NOT_READS = {"connect", "open_connection", "stream_query", "execute_query", "execute_update",
+             "execute_many", "hash_password", "close", "add_mark_listener", "remove_mark_listener"}
+
+
+def _cases(sample):
+    """(method name, args factory) per read method; factories take the call number"""
+    def pick(key):
+        values = sample[key]
+        return lambda i: values[i % len(values)]
+    student, teacher = pick("student_ids"), pick("teacher_ids")
+    user, username = pick("student_user_ids"), pick("usernames")
+    teacher_user = pick("teacher_user_ids")
+    years, grades = sample["years"] or [None], sample["grade_levels"] or [None]
+    return [
+        ("verify_login", lambda i: (username(i), "password123")),
+        ("get_user_by_id", lambda i: (user(i),)),
+        ("get_student_by_user_id", lambda i: (user(i),)),
+        ("get_teacher_by_user_id", lambda i: (teacher_user(i),)),
+        ("get_student_marks", lambda i: (student(i),)),
+        ("get_marks_for_students", lambda i: ([student(i + k) for k in range(20)],)),
+        ("get_student_marks_fingerprint", lambda i: (student(i),)),
+        ("get_student_marks_fingerprints", lambda i: ([student(i + k) for k in range(20)],)),
+        ("get_teacher_subjects", lambda i: (teacher(i),)),
+        ("get_marks_for_teacher", lambda i: (teacher(i),)),
+        ("get_teacher_students", lambda i: (teacher(i),)),
+        ("get_teacher_students_gender_counts", lambda i: (teacher(i),)),
+        ("get_teacher_subject_average_percentages", lambda i: (teacher(i),)),
+        ("get_teacher_monthly_trends_average", lambda i: (teacher(i),)),
+        ("get_all_students", lambda i: ()),
+        ("get_all_teachers", lambda i: ()),
+        ("get_all_subjects", lambda i: ()),
+        ("get_at_risk_page", lambda i: (0, 50)),
+        ("get_at_risk_summary", lambda i: ()),
+        ("get_system_stats", lambda i: ()),
+        ("get_gender_distribution", lambda i: ()),
+        ("get_subject_average_percentages", lambda i: ()),
+        ("get_monthly_trends_average", lambda i: ()),
+        ("get_performance_filter_options", lambda i: ()),
+        ("get_performance_summary", lambda i: (years[i % len(years)], grades[i % len(grades)])),
+        ("get_top_students", lambda i: (10,)),
+        ("check_username_exists", lambda i: (username(i),)),
+        ("get_user_email", lambda i: (username(i),)),
+    ]
+
+
+def case_names():
+    dummy = dict.fromkeys(("student_ids", "teacher_ids", "student_user_ids", "usernames",
+                           "teacher_user_ids", "years", "grade_levels"), [0])
+    return {name for name, _ in _cases(dummy)}
+
+
+def uncovered_methods():
+    """Public read-looking Database methods with no benchmark case (so new ones get noticed)"""
+    from database import Database
+    covered = case_names()
+    public = [name for name, fn in inspect.getmembers(Database, inspect.isfunction)
+              if not name.startswith("_") and name not in NOT_READS]
+    writes = ("add_", "update_", "delete_")
+    return sorted(n for n in public if n not in covered and not n.startswith(writes))
+
+
+def _sample(db, seed):
+    """Ids and names the calls use, drawn deterministically from the dataset"""
+    rng = np.random.default_rng(seed)
+
+    def draw(query, column):
+        rows = db.execute_query(query) or []
+        values = [r[column] for r in rows]
+        if len(values) > SAMPLE_IDS:
+            values = [values[i] for i in sorted(rng.choice(len(values), SAMPLE_IDS, replace=False))]
+        return values or [0]
+
+    students = db.execute_query(
+        "SELECT s.student_id, s.user_id, u.username FROM students s JOIN users u ON s.user_id = u.user_id "
+        "ORDER BY s.student_id") or []
+    if len(students) > SAMPLE_IDS:
+        students = [students[i] for i in sorted(rng.choice(len(students), SAMPLE_IDS, replace=False))]
+    years, grades = db.get_performance_filter_options()
+    return {
+        "student_ids": [r["student_id"] for r in students] or [0],
+        "student_user_ids": [r["user_id"] for r in students] or [0],
+        "usernames": [r["username"] for r in students] or ["nobody"],
+        "teacher_ids": draw("SELECT teacher_id FROM teachers ORDER BY teacher_id", "teacher_id"),
+        "teacher_user_ids": draw("SELECT user_id FROM teachers ORDER BY teacher_id", "user_id"),
+        "years": list(years),
+        "grade_levels": list(grades),
+    }
+
+
+def _bytes_sent(db):
+    """Server-side Bytes_sent for this Database's connection"""
+    cursor = db.connection.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+    row = cursor.fetchone()
+    cursor.close()
+    return int(row[1]) if row else 0
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        # get_marks_for_students: {student_id: rows}; summaries: one row
+        nested = [v for v in result.values() if isinstance(v, list)]
+        return sum(len(v) for v in nested) if nested else 1
+    if isinstance(result, (list, tuple)):
+        if len(result) == 2 and all(isinstance(v, list) for v in result):
+            return sum(len(v) for v in result)  # (years, grade_levels)
+        return len(result)
+    return 1
+
+
+def _percentiles(samples):
+    a = np.array(samples) * 1000.0
+    return {"p50_ms": round(float(np.percentile(a, 50)), 3), "p95_ms": round(float(np.percentile(a, 95)), 3),
+            "p99_ms": round(float(np.percentile(a, 99)), 3), "mean_ms": round(float(a.mean()), 3)}
+
+
+def bench_method(db, name, args_for, runs):
+    fn = getattr(db, name)
+    fn(*args_for(0))  # warm-up (buffer pool, plan cache)
+    first = _bytes_sent(db)
+    before = _bytes_sent(db)
+    overhead = before - first  # what one Bytes_sent read itself costs
+    samples, rows = [], 0
+    for i in range(runs):
+        args = args_for(i)
+        t0 = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - t0)
+        rows += _row_count(result)
+    sent = _bytes_sent(db) - before - overhead
+    return {**_percentiles(samples), "runs": runs, "rows": round(rows / runs, 1),
+            "bytes": int(max(sent, 0) / runs)}
+
+
+def run_size(size, runs, seed, methods=None, method="insert"):
+    from at_risk import AT_RISK_DDL
+    from database import Database
+    from synthetic_data import ensure_dataset, parse_scale
+    n_marks = parse_scale(size)
+    database = f"spms_bench_{size.lower()}"
+    dataset = ensure_dataset(n_marks, database=database, seed=seed, method=method)
+    db = Database(database=database, interactive=False)
+    if not db.connection or not db.connection.is_connected():
+        print(f"[ERROR] Cannot benchmark {size}: no connection to '{database}'")
+        return {"marks": n_marks, "database": database, "dataset": dataset, "error": "no database connection",
+                "methods": {}}
+    db.execute_update(AT_RISK_DDL.format(table="at_risk"))  # the page reads it; empty is fine
+    sample = _sample(db, seed)
+    version = (db.execute_query("SELECT VERSION() AS v") or [{}])[0].get("v")
+    results = {}
+    for name, args_for in _cases(sample):
+        if methods and name not in methods:
+            continue
+        try:
+            results[name] = bench_method(db, name, args_for, runs)
+        except Exception as e:
+            print(f"[ERROR] {name} failed at {size}: {e}")
+            results[name] = {"error": str(e)}
+            continue
+        r = results[name]
+        print(f"  {name:<42}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['rows']:>10.1f}{r['bytes']:>11}")
+    db.close()
+    return {"marks": n_marks, "database": database, "mysql": version, "dataset": dataset, "methods": results}
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_ms=DEFAULT_MIN_MS):
+    """Regressions as (size, method, baseline p95, current p95, ratio)"""
+    regressions = []
+    for size, run in current["sizes"].items():
+        base_methods = baseline.get("sizes", {}).get(size, {}).get("methods", {})
+        for name, r in run["methods"].items():
+            b = base_methods.get(name)
+            if not b or "p95_ms" not in b or "p95_ms" not in r:
+                continue
+            if r["p95_ms"] > b["p95_ms"] * (1 + threshold) and r["p95_ms"] - b["p95_ms"] > min_ms:
+                regressions.append((size, name, b["p95_ms"], r["p95_ms"], r["p95_ms"] / max(b["p95_ms"], 1e-9)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, rows and bytes for every Database read method")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="dataset sizes in marks (1k, 100k, 1m, ...)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="calls per method and size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--methods", nargs="+", help="only these methods")
+    parser.add_argument("--load-method", choices=("insert", "load-data"), default="insert")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed p95 slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS, help="ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    missing = uncovered_methods()
+    if missing:
+        print(f"[WARN] No benchmark case for: {', '.join(missing)}")
+
+    results = {
+        "created": dt.datetime.now().replace(microsecond=0).isoformat(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "runs": args.runs,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"[OK] Benchmarking {size} marks")
+        print(f"  {'method':<42}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rows':>10}{'bytes':>11}")
+        results["sizes"][size] = run_size(size, args.runs, args.seed, args.methods, args.load_method)
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"[OK] Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        for size, name, before, after, ratio in regressions:
+            print(f"[ERROR] Regression at {size}: {name} p95 {before:.2f} -> {after:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"[OK] No p95 regressions above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the NumPy-only compiled forest against the scikit-learn pipeline.
+
+Checks that both produce the same predictions (within --tol) and reports
+cold import time and single-row / batch latency for each path.
+
+Usage:
+    python bench_inference.py --synthetic 20000
+    python bench_inference.py                    # current registry model + marks table
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def cold_import_seconds(statement, repeats=3):
+    """Best-of-N wall time of an import in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    best = None
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=HERE,
+                             capture_output=True, text=True, check=True)
+        elapsed = float(out.stdout.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _latency(fn, rows, runs):
+    fn(rows[0])  # warm-up
+    samples = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        fn(rows[i % len(rows)])
+        samples.append(time.perf_counter() - t0)
+    return np.percentile(samples, 50) * 1000.0, np.percentile(samples, 99) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled forest vs scikit-learn inference")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="train a fresh forest on N synthetic rows instead of using the registry")
+    parser.add_argument("--runs", type=int, default=300)
+    parser.add_argument("--tol", type=float, default=1e-6)
+    args = parser.parse_args()
+
+    import ml_model
+    from fast_predictor import CompiledForest
+
+    if args.synthetic:
+        from bench_models import synthetic_dataset
+        X, y = synthetic_dataset(args.synthetic)
+        bundle = {"model": ml_model._build_pipeline("rf").fit(X, y), "features": list(X.columns)}
+    else:
+        bundle = ml_model.load_model()
+        X, _, _ = ml_model.build_dataset()
+        if not bundle or X is None:
+            print("[WARN] No model or marks available; try --synthetic 20000")
+            return
+    model = bundle["model"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.npz")
+        ml_model.export_compiled(bundle, path)
+        npz_kb = os.path.getsize(path) / 1024.0
+        compiled = CompiledForest.load(path)
+
+    X = X[compiled.features]
+    X_np = X.to_numpy(dtype=np.float64)
+    sk_pred = model.predict(X)
+    fast_pred = compiled.predict(X_np)
+    max_diff = float(np.max(np.abs(sk_pred - fast_pred)))
+    status = "OK" if max_diff <= args.tol else "MISMATCH"
+    print(f"[{status}] max |sklearn - compiled| = {max_diff:.2e} over {len(X)} rows (tol {args.tol})")
+
+    sk_rows = [X.iloc[[i]] for i in range(min(len(X), args.runs))]
+    fast_rows = [X_np[i:i + 1] for i in range(min(len(X), args.runs))]
+    sk_p50, sk_p99 = _latency(model.predict, sk_rows, args.runs)
+    fast_p50, fast_p99 = _latency(compiled.predict, fast_rows, args.runs)
+
+    t0 = time.perf_counter()
+    model.predict(X)
+    sk_batch = len(X) / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    compiled.predict(X_np)
+    fast_batch = len(X) / (time.perf_counter() - t0)
+
+    sk_import = cold_import_seconds("import pandas, joblib, sklearn.ensemble, sklearn.compose, sklearn.pipeline")
+    fast_import = cold_import_seconds("import fast_predictor")
+
+    print(f"{'path':<10}{'import s':>10}{'p50 ms':>10}{'p99 ms':>10}{'rows/s':>12}")
+    print(f"{'sklearn':<10}{sk_import:>10.3f}{sk_p50:>10.3f}{sk_p99:>10.3f}{sk_batch:>12.0f}")
+    print(f"{'compiled':<10}{fast_import:>10.3f}{fast_p50:>10.3f}{fast_p99:>10.3f}{fast_batch:>12.0f}")
+    print(f"compiled model size: {npz_kb:.1f} KB")
+    if status != "OK":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Latency/accuracy benchmark for the pluggable grade-predictor estimators.
+
+Reports, per estimator: training time, p50/p99 single-row predict latency,
+batch throughput, model size on disk and holdout MAE.
+
+Usage:
+    python bench_models.py                       # train on the marks table
+    python bench_models.py --synthetic 50000     # no database needed
+    python bench_models.py --estimators rf hgb --json results.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+import ml_model
+
+
+def synthetic_dataset(n_rows, seed=42):
+    """Feature rows shaped like build_dataset() output, with a learnable target."""
+    rng = np.random.default_rng(seed)
+    subject_id = rng.integers(1, 12, n_rows)
+    teacher_id = rng.integers(1, 25, n_rows)
+    overall = np.clip(rng.normal(68, 12, n_rows), 0, 100)
+    subj_avg = np.clip(overall + rng.normal(0, 6, n_rows), 0, 100)
+    attempts = rng.integers(0, 12, n_rows)
+    days_since = rng.integers(1, 120, n_rows).astype(float)
+    subject_effect = (subject_id % 5 - 2) * 2.5
+    y = np.clip(0.35 * overall + 0.6 * subj_avg + subject_effect
+                + 0.3 * attempts - 0.02 * days_since + rng.normal(0, 6, n_rows), 0, 100)
+    X = pd.DataFrame({
+        "student_overall_avg": overall,
+        "subj_avg": subj_avg,
+        "attempts_subj": attempts,
+        "days_since": days_since,
+        "subject_id": subject_id,
+        "teacher_id": teacher_id,
+    })
+    return X, pd.Series(y)
+
+
+def _percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000.0)
+
+
+def bench_estimator(name, X_tr, X_te, y_tr, y_te, single_row_runs=300):
+    model = ml_model._build_pipeline(name)
+
+    t0 = time.perf_counter()
+    model.fit(X_tr, y_tr)
+    train_s = time.perf_counter() - t0
+
+    # Single-row latency, the shape used by the admin Predictions page
+    rows = [X_te.iloc[[i % len(X_te)]] for i in range(single_row_runs)]
+    model.predict(rows[0])  # warm-up
+    samples = []
+    for row in rows:
+        t0 = time.perf_counter()
+        model.predict(row)
+        samples.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    pred = model.predict(X_te)
+    batch_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        joblib.dump({"model": model}, path)
+        size_bytes = os.path.getsize(path)
+
+    return {
+        "estimator": name,
+        "train_s": round(train_s, 3),
+        "p50_ms": round(_percentile_ms(samples, 50), 3),
+        "p99_ms": round(_percentile_ms(samples, 99), 3),
+        "batch_rows_per_s": round(len(X_te) / batch_s, 1) if batch_s > 0 else None,
+        "size_kb": round(size_bytes / 1024.0, 1),
+        "mae": round(float(mean_absolute_error(y_te, pred)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark grade-predictor estimators")
+    parser.add_argument("--estimators", nargs="+", default=list(ml_model.ESTIMATORS),
+                        choices=list(ml_model.ESTIMATORS))
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="use N synthetic rows instead of the marks table")
+    parser.add_argument("--runs", type=int, default=300, help="single-row predict repetitions")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        X, y = synthetic_dataset(args.synthetic)
+    else:
+        X, y, _ = ml_model.build_dataset()
+        if X is None or len(X) < 20:
+            print("[WARN] Not enough marks to benchmark; try --synthetic 20000")
+            return
+    X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f"Benchmarking on {len(X_tr)} train / {len(X_te)} holdout rows")
+
+    results = []
+    header = f"{'estimator':<12}{'train s':>9}{'p50 ms':>9}{'p99 ms':>9}{'rows/s':>12}{'size KB':>10}{'MAE':>8}"
+    print(header)
+    print("-" * len(header))
+    for name in args.estimators:
+        r = bench_estimator(name, X_tr, X_te, y_tr, y_te, single_row_runs=args.runs)
+        results.append(r)
+        print(f"{r['estimator']:<12}{r['train_s']:>9.2f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['batch_rows_per_s']:>12.0f}{r['size_kb']:>10.1f}{r['mae']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rows": len(X), "results": results}, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Reusable matplotlib chart components for the Tk dashboards.
+
+Each component builds one matplotlib Figure and one FigureCanvasTkAgg and
+keeps them for its lifetime. update() changes the existing artists in
+place (bar heights, wedge angles, line data, texts) and asks for a redraw
+with draw_idle(), so repeated refreshes coalesce into one paint. Artists
+are only recreated when the number of categories changes.
+
+Figures are created with matplotlib.figure.Figure, not pyplot, so no global
+figure manager keeps them alive. destroy() (or destroying the Tk parent)
+drops the canvas widget and clears the figure.
+
+matplotlib is imported when the first component is built, not with this
+module.
+"""
+
+import math
+
+import tkinter as tk
+
+GRADE_COLORS = ['#2ecc71', '#27ae60', '#3498db', '#f1c40f', '#e67e22', '#e74c3c']
+SERIES_COLORS = ['#2E86AB', '#27ae60', '#f39c12', '#e74c3c', '#9b59b6']
+
+_MATPLOTLIB_READY = None
+
+
+def matplotlib_available():
+    """True when matplotlib and its Tk canvas can be imported (checked once)"""
+    global _MATPLOTLIB_READY
+    if _MATPLOTLIB_READY is None:
+        try:
+            import matplotlib.figure  # noqa: F401
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # noqa: F401
+            _MATPLOTLIB_READY = True
+        except ImportError:
+            _MATPLOTLIB_READY = False
+            print("⚠️ Matplotlib not available. Charts will be disabled.")
+    return _MATPLOTLIB_READY
+
+
+def unavailable_label(parent, text="Matplotlib not available for charts"):
+    """Placeholder shown where a chart would go"""
+    return tk.Label(parent, text=text, bg="white", fg="#7f8c8d", font=("Arial", 12))
+
+
+class ChartPanel:
+    """One figure with one axes embedded in a Tk parent; place it via .widget"""
+
+    def __init__(self, parent, figsize=(6.5, 3.8), title=None, title_kw=None):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.figure = Figure(figsize=figsize, layout="constrained")
+        self.figure.patch.set_facecolor('white')
+        self.ax = self.figure.add_subplot()
+        if title:
+            self.ax.set_title(title, **(title_kw or {}))
+        self._message = self.ax.text(0.5, 0.5, "", ha='center', va='center',
+                                     transform=self.ax.transAxes, fontsize=12, visible=False)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.widget = self.canvas.get_tk_widget()
+        # Tearing down the Tk parent releases the figure too
+        self.widget.bind('<Destroy>', lambda e: self._release() if e.widget is self.widget else None)
+
+    def redraw(self):
+        if self.canvas is not None:
+            self.canvas.draw_idle()
+
+    def show_message(self, text):
+        """Empty state: hide the data artists and show a centred message"""
+        self._set_data_visible(False)
+        self._message.set_text(text)
+        self._message.set_visible(True)
+        self.redraw()
+
+    def _show_data(self):
+        self._message.set_visible(False)
+        self._set_data_visible(True)
+
+    def _set_data_visible(self, visible):
+        pass
+
+    def _release(self):
+        if self.canvas is not None:
+            self.figure.clear()
+            self.canvas = None
+
+    def destroy(self):
+        """Remove the widget and free the figure"""
+        widget, self.widget = self.widget, None
+        self._release()
+        if widget is not None:
+            try:
+                widget.destroy()
+            except tk.TclError:
+                pass
+
+
+class BarChart(ChartPanel):
+    """Vertical or horizontal bars, optionally grouped into several series.
+
+    update(labels, values) takes one list of values, or one list per
+    series when `series` names were given. `errors` is an optional
+    (low, high) pair per bar, drawn as capped whiskers.
+    """
+
+    def __init__(self, parent, figsize=(6.5, 3.8), title=None, xlabel=None, ylabel=None,
+                 limits=(0, 100), horizontal=False, series=None, colors=None,
+                 value_format=None, rotation=0, title_kw=None):
+        super().__init__(parent, figsize, title, title_kw)
+        self.horizontal = horizontal
+        self.series = list(series or [None])
+        self.colors = colors or SERIES_COLORS
+        self.value_format = value_format
+        self.rotation = rotation
+        self._labels = None
+        self._bars = []     # one list of Rectangles per series
+        self._texts = []    # value labels, series-major
+        self._whiskers = None
+        if xlabel:
+            self.ax.set_xlabel(xlabel)
+        if ylabel:
+            self.ax.set_ylabel(ylabel)
+        if limits:
+            (self.ax.set_xlim if horizontal else self.ax.set_ylim)(*limits)
+        self._limits = limits
+
+    def _set_data_visible(self, visible):
+        for artist in [b for bars in self._bars for b in bars] + self._texts:
+            artist.set_visible(visible)
+        if self._whiskers is not None:
+            self._whiskers.set_visible(visible)
+        (self.ax.yaxis if self.horizontal else self.ax.xaxis).set_visible(visible)
+
+    def _bar_colors(self, s, n):
+        if len(self.series) > 1:
+            return [self.colors[s % len(self.colors)]] * n
+        return [self.colors[i % len(self.colors)] for i in range(n)]
+
+    def _rebuild(self, labels):
+        for bars in self._bars:
+            for b in bars:
+                b.remove()
+        for t in self._texts:
+            t.remove()
+        self._bars, self._texts = [], []
+        n, k = len(labels), len(self.series)
+        width = 0.8 / k
+        for s, name in enumerate(self.series):
+            offsets = [i + (s - (k - 1) / 2) * width for i in range(n)]
+            draw = self.ax.barh if self.horizontal else self.ax.bar
+            container = draw(offsets, [0] * n, width, color=self._bar_colors(s, n), label=name)
+            self._bars.append(list(container))
+            if self.value_format:
+                self._texts.extend(self.ax.text(0, 0, "", fontsize=9,
+                                                ha='left' if self.horizontal else 'center',
+                                                va='center' if self.horizontal else 'bottom')
+                                   for _ in range(n))
+        if len(self.series) > 1:
+            self.ax.legend()
+        self._set_ticks(labels)
+
+    def _set_ticks(self, labels):
+        ticks = list(range(len(labels)))
+        if self.horizontal:
+            self.ax.set_yticks(ticks, labels)
+            self.ax.set_ylim(-0.5, len(labels) - 0.5)
+        else:
+            self.ax.set_xlim(-0.5, len(labels) - 0.5)
+            self.ax.set_xticks(ticks, labels, rotation=self.rotation,
+                               ha='right' if self.rotation else 'center')
+        self._labels = list(labels)
+
+    def update(self, labels, values, errors=None):
+        labels = [str(l) for l in labels]
+        if not labels:
+            self.show_message("No data available")
+            return
+        values = [list(values)] if len(self.series) == 1 else [list(v) for v in values]
+        if self._labels is None or len(labels) != len(self._labels):
+            self._rebuild(labels)
+        elif labels != self._labels:
+            self._set_ticks(labels)
+        self._show_data()
+        top = 0.0
+        for s, bars in enumerate(self._bars):
+            for i, (bar, v) in enumerate(zip(bars, values[s])):
+                v = float(v or 0)
+                top = max(top, v)
+                if self.horizontal:
+                    bar.set_width(v)
+                else:
+                    bar.set_height(v)
+                if self.value_format:
+                    text = self._texts[s * len(bars) + i]
+                    text.set_text(self.value_format.format(v))
+                    if self.horizontal:
+                        limit = self._limits[1] if self._limits else v + 1
+                        text.set_position((min(v + 1, limit * 0.98), bar.get_y() + bar.get_height() / 2))
+                    else:
+                        text.set_position((bar.get_x() + bar.get_width() / 2, v + 1))
+        self._update_whiskers(errors)
+        if not self._limits:
+            (self.ax.set_xlim if self.horizontal else self.ax.set_ylim)(0, max(top * 1.1, 1.0))
+        self.redraw()
+
+    def _update_whiskers(self, errors):
+        from matplotlib.collections import LineCollection
+        if self._whiskers is None:
+            self._whiskers = LineCollection([], colors='#7f8c8d', linewidths=1.2)
+            self.ax.add_collection(self._whiskers, autolim=False)
+        segments = []
+        for bar, (low, high) in zip(self._bars[0], errors or []):
+            centre = bar.get_x() + bar.get_width() / 2
+            cap = bar.get_width() / 5
+            segments += [[(centre, low), (centre, high)],
+                         [(centre - cap, low), (centre + cap, low)],
+                         [(centre - cap, high), (centre + cap, high)]]
+        self._whiskers.set_segments(segments)
+
+
+class DonutChart(ChartPanel):
+    """Pie with a hole; wedge angles and labels are updated in place"""
+
+    def __init__(self, parent, figsize=(6.5, 3.8), title=None, colors=None, hole=0.55,
+                 pct_format='{:.0f}%', show_counts=False, title_kw=None):
+        super().__init__(parent, figsize, title, title_kw)
+        self.colors = colors or GRADE_COLORS
+        self.hole = hole
+        self.pct_format = pct_format
+        self.show_counts = show_counts
+        self._wedges, self._labels, self._pcts = [], [], []
+        self.ax.set_aspect('equal')
+        self.ax.set_xlim(-1.4, 1.4)
+        self.ax.set_ylim(-1.25, 1.25)
+        self.ax.axis('off')
+
+    def _set_data_visible(self, visible):
+        for artist in self._wedges + self._labels + self._pcts:
+            artist.set_visible(visible)
+
+    def _rebuild(self, n):
+        from matplotlib.patches import Wedge
+        for artist in self._wedges + self._labels + self._pcts:
+            artist.remove()
+        self._wedges = [self.ax.add_patch(Wedge((0, 0), 1.0, 90, 90, width=1.0 - self.hole,
+                                                facecolor=self.colors[i % len(self.colors)],
+                                                edgecolor='white'))
+                        for i in range(n)]
+        self._labels = [self.ax.text(0, 0, "", ha='center', va='center', fontsize=9) for _ in range(n)]
+        self._pcts = [self.ax.text(0, 0, "", ha='center', va='center', fontsize=8) for _ in range(n)]
+
+    def update(self, labels, counts):
+        counts = [float(c or 0) for c in counts]
+        total = sum(counts)
+        if total <= 0:
+            self.show_message("No data")
+            return
+        if len(counts) != len(self._wedges):
+            self._rebuild(len(counts))
+        self._show_data()
+        # Counter-clockwise from 12 o'clock, like pie(startangle=90)
+        angle = 90.0
+        ring = (1.0 + self.hole) / 2
+        for wedge, label_text, pct_text, label, count in zip(self._wedges, self._labels, self._pcts,
+                                                             labels, counts):
+            sweep = 360.0 * count / total
+            wedge.set_theta1(angle)
+            wedge.set_theta2(angle + sweep)
+            mid = math.radians(angle + sweep / 2)
+            shown = count > 0
+            label_text.set_text(f"{label} ({int(count)})" if self.show_counts else str(label))
+            label_text.set_position((1.15 * math.cos(mid), 1.15 * math.sin(mid)))
+            label_text.set_visible(shown)
+            pct_text.set_text(self.pct_format.format(100.0 * count / total))
+            pct_text.set_position((ring * math.cos(mid), ring * math.sin(mid)))
+            pct_text.set_visible(shown)
+            angle += sweep
+        self.redraw()
+
+
+class LineChart(ChartPanel):
+    """A single line with an optional dashed reference (e.g. the average)"""
+
+    def __init__(self, parent, figsize=(7.0, 3.8), title=None, xlabel=None, ylabel=None,
+                 limits=(0, 100), color='#2E86AB', reference_label='Average: {:.1f}%', title_kw=None):
+        super().__init__(parent, figsize, title, title_kw)
+        (self._line,) = self.ax.plot([], [], marker='o', linewidth=3, markersize=8, color=color)
+        self._reference = self.ax.axhline(0, color='red', linestyle='--', alpha=0.7, visible=False)
+        self.reference_label = reference_label
+        self.ax.grid(True, alpha=0.3)
+        if xlabel:
+            self.ax.set_xlabel(xlabel)
+        if ylabel:
+            self.ax.set_ylabel(ylabel)
+        if limits:
+            self.ax.set_ylim(*limits)
+
+    def _set_data_visible(self, visible):
+        self._line.set_visible(visible)
+        self._reference.set_visible(visible and self._reference.get_label() != '_nolegend_')
+        self.ax.xaxis.set_visible(visible)
+
+    def update(self, values, tick_labels=None, reference=None):
+        values = [float(v) for v in values]
+        if not values:
+            self.show_message("No performance data available")
+            return
+        self._show_data()
+        xs = list(range(len(values)))
+        self._line.set_data(xs, values)
+        self.ax.set_xlim(-0.5, max(len(values) - 0.5, 0.5))
+        self.ax.set_xticks(xs, tick_labels or [str(x + 1) for x in xs], rotation=25, ha='right', fontsize=9)
+        if reference is None:
+            self._reference.set_visible(False)
+            self._reference.set_label('_nolegend_')
+            legend = self.ax.get_legend()
+            if legend:
+                legend.remove()
+        else:
+            self._reference.set_ydata([reference, reference])
+            self._reference.set_label(self.reference_label.format(reference))
+            self._reference.set_visible(True)
+            self.ax.legend(handles=[self._reference])
+        self.redraw()
+
+
+class GaugeGrid(ChartPanel):
+    """Half-circle gauges in a grid, one per value; fills and texts update in place"""
+
+    def __init__(self, parent, figsize=(8, 6), rows=2, cols=3, colors=None, max_value=100,
+                 value_format='{:.1f}', title=None, title_kw=None):
+        from matplotlib.patches import Polygon
+        import numpy as np
+        super().__init__(parent, figsize, title, title_kw)
+        self.ax.set_visible(False)  # the gauges get their own axes
+        self._message = self.figure.text(0.5, 0.5, "", ha='center', va='center', fontsize=12, visible=False)
+        self.colors = colors or SERIES_COLORS
+        self.max_value = max_value
+        self.value_format = value_format
+        self._theta = np.linspace(0, np.pi, 100)
+        self._gauges = []
+        for i in range(rows * cols):
+            ax = self.figure.add_subplot(rows, cols, i + 1)
+            ax.plot(np.cos(self._theta), np.sin(self._theta), 'k-', linewidth=2)
+            fill = ax.add_patch(Polygon([[0, 0]], closed=True, alpha=0.7,
+                                        facecolor=self.colors[i % len(self.colors)]))
+            value_text = ax.text(0, 0, "", ha='center', va='center', fontsize=10, fontweight='bold')
+            title_text = ax.text(0, -1.3, "", ha='center', va='center', fontsize=8)
+            ax.set_aspect('equal')
+            ax.set_xlim(-1.5, 1.5)
+            ax.set_ylim(-1.5, 1.5)
+            ax.axis('off')
+            ax.set_visible(False)
+            self._gauges.append((ax, fill, value_text, title_text))
+
+    def _set_data_visible(self, visible):
+        if not visible:
+            for ax, *_ in self._gauges:
+                ax.set_visible(False)
+
+    def update(self, titles, values):
+        import numpy as np
+        titles, values = list(titles), [float(v or 0) for v in values]
+        if not values:
+            self.show_message("No data available")
+            return
+        self._show_data()
+        for i, (ax, fill, value_text, title_text) in enumerate(self._gauges):
+            if i >= len(values):
+                ax.set_visible(False)
+                continue
+            share = min(max(values[i] / self.max_value, 0.0), 1.0)
+            theta = self._theta * share
+            # Area under the arc from angle 0 to pi * share, down to the baseline
+            arc = np.column_stack([np.cos(theta), np.sin(theta)])
+            fill.set_xy(np.vstack([arc, [[arc[-1, 0], 0.0]]]))
+            value_text.set_text(self.value_format.format(values[i]))
+            title_text.set_text(str(titles[i]))
+            ax.set_visible(True)
+        self.redraw()
@@ -7,13 +7,53 @@ import mysql.connector
 from mysql.connector import Error
 import os
 import hashlib
-from tkinter import messagebox
+import threading
+from startup_profiler import traced
+import marks_cube
+
+# Schema name; point the app (or a benchmark) at another copy, e.g. a synthetic dataset
+DB_NAME = os.environ.get("SPMS_DATABASE", "student_performance_db")
+
+# InnoDB rolls back the statement (deadlock: the transaction) but keeps the
+# connection, so these are retried once in place instead of reconnecting
+ER_LOCK_DEADLOCK = 1213
+ER_LOCK_WAIT_TIMEOUT = 1205
+
+# Ranked output of at_risk.py; created empty on connect so the admin page can read it before the first run
+AT_RISK_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    rank_no INT NOT NULL PRIMARY KEY,
+    student_id INT NOT NULL,
+    subject_id INT NOT NULL,
+    predicted_pct DECIMAL(5,2),
+    low_pct DECIMAL(5,2),
+    high_pct DECIMAL(5,2),
+    predicted_grade VARCHAR(2),
+    trend_slope DECIMAL(6,2),
+    reason VARCHAR(16),
+    risk_score DECIMAL(7,2),
+    model_version VARCHAR(32),
+    scored_at DATETIME,
+    INDEX idx_at_risk_student (student_id)
+)
+"""
+
 
 class Database:
-    def __init__(self):
+    def __init__(self, database=None, interactive=True):
+        self.database = database or DB_NAME
+        # Background users (the write journal) log connection failures instead of showing a dialog
+        self.interactive = interactive
         self.connection = None
+        # Callbacks run with the affected student_id after a mark is added/updated/deleted
+        self._mark_listeners = []
+        # Recoveries since construction (read by load_simulator)
+        self.stats = {'reconnects': 0, 'deadlocks': 0, 'lock_timeouts': 0}
+        # MySQL errno of the last failed run_in_transaction (e.g. a mark write), None if it succeeded
+        self.last_errno = None
         self.connect()
     
+    @traced("Database.connect", cat="db")
     def connect(self):
         """Establish connection to MySQL database"""
         try:
@@ -30,8 +70,8 @@ class Database:
 
             cursor = self.connection.cursor()
             # Ensure database exists (utf8mb4)
-            cursor.execute("CREATE DATABASE IF NOT EXISTS student_performance_db DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-            cursor.execute("USE student_performance_db")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.database}` DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            cursor.execute(f"USE `{self.database}`")
             # Session settings
             try:
                 cursor.execute("SET NAMES utf8mb4")
@@ -53,15 +93,43 @@ class Database:
             except Exception:
                 pass
 
+            # Columns the performance dashboard filters on
+            try:
+                self._ensure_filter_columns()
+            except Exception as e:
+                print(f"[WARN] Filter columns not added: {e}")
+
+            # Client-generated keys that make journal replays of new marks idempotent
+            try:
+                self._ensure_idempotency_column()
+            except Exception as e:
+                print(f"[WARN] Idempotency column not added: {e}")
+
+            try:
+                cursor = self.connection.cursor()
+                cursor.execute(AT_RISK_DDL.format(table="at_risk"))
+                cursor.close()
+            except Exception as e:
+                print(f"[WARN] at_risk table not created: {e}")
+
+            # Pre-aggregated cube the chart queries roll up from
+            try:
+                marks_cube.ensure(self)
+            except Exception as e:
+                print(f"[WARN] Marks cube unavailable: {e}")
+
             print("[OK] Connected to MySQL database")
             return True
         except Error as e:
             print(f"[ERROR] Error connecting to MySQL: {e}")
+            if not self.interactive:
+                return False
+            from tkinter import messagebox
             messagebox.showerror("Database Error", 
                               f"Failed to connect to database:\n{e}\n\nPlease ensure:\n"
                               "1. XAMPP is running\n"
                               "2. MySQL service is started\n"
-                              "3. Database 'student_performance_db' exists")
+                              f"3. Database '{self.database}' exists")
             return False
         return False
 
@@ -104,7 +172,7 @@ class Database:
         ]
         cursor = self.connection.cursor()
         # Use INSERT IGNORE to avoid duplicate subject_code errors
-        cursor.execute("USE student_performance_db")
+        cursor.execute(f"USE `{self.database}`")
         for name, code, credits, desc in subjects:
             try:
                 cursor.execute(
@@ -115,20 +183,79 @@ class Database:
                 print(f"[WARN] Subject seed failed for {code}: {e}")
         cursor.close()
     
+    def _ensure_filter_columns(self):
+        """Add marks.academic_year and students.grade_level (with indexes) if missing.
+
+        academic_year is a stored generated column (YEAR(exam_date)), so the
+        existing mark writes need no change and the year filter can use an index.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND "
+            "((TABLE_NAME = 'marks' AND COLUMN_NAME = 'academic_year') OR "
+            "(TABLE_NAME = 'students' AND COLUMN_NAME = 'grade_level'))",
+            (self.database,)
+        )
+        present = {(t, c) for t, c in cursor.fetchall()}
+        if ('marks', 'academic_year') not in present:
+            cursor.execute(
+                "ALTER TABLE marks ADD COLUMN academic_year SMALLINT AS (YEAR(exam_date)) STORED, "
+                "ADD INDEX idx_marks_year_subject (academic_year, subject_id)"
+            )
+            print("[OK] Added marks.academic_year")
+        if ('students', 'grade_level') not in present:
+            cursor.execute(
+                "ALTER TABLE students ADD COLUMN grade_level TINYINT NULL, "
+                "ADD INDEX idx_students_grade_gender (grade_level, gender)"
+            )
+            print("[OK] Added students.grade_level")
+        cursor.close()
+
+    def _ensure_idempotency_column(self):
+        """Add marks.idempotency_key (unique, NULL for marks entered directly) if missing"""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT 1 FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'marks' AND COLUMN_NAME = 'idempotency_key'",
+            (self.database,)
+        )
+        if not cursor.fetchall():
+            cursor.execute(
+                "ALTER TABLE marks ADD COLUMN idempotency_key CHAR(36) NULL, "
+                "ADD UNIQUE INDEX uq_marks_idempotency_key (idempotency_key)"
+            )
+            print("[OK] Added marks.idempotency_key")
+        cursor.close()
+
+    def _ensure_connected(self):
+        if not self.connection or not self.connection.is_connected():
+            self.stats['reconnects'] += 1
+            self.connect()
+
+    def _recover(self, e):
+        """Before the one retry: keep the connection after a lock conflict, else reconnect"""
+        if e.errno == ER_LOCK_DEADLOCK:
+            self.stats['deadlocks'] += 1
+        elif e.errno == ER_LOCK_WAIT_TIMEOUT:
+            self.stats['lock_timeouts'] += 1
+        else:
+            self.stats['reconnects'] += 1
+            self.connect()
+
     def execute_query(self, query, params=None):
         """Execute SELECT query and return results"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connected()
             cursor = self.connection.cursor(dictionary=True)
             cursor.execute(query, params or ())
             result = cursor.fetchall()
             cursor.close()
             return result
         except Error as e:
-            print(f"[ERROR] Query error: {e} — attempting reconnect")
+            print(f"[ERROR] Query error: {e} — retrying")
             try:
-                self.connect()
+                self._recover(e)
                 cursor = self.connection.cursor(dictionary=True)
                 cursor.execute(query, params or ())
                 result = cursor.fetchall()
@@ -138,20 +265,53 @@ class Database:
                 print(f"[ERROR] Query retry failed: {e2}")
                 return None
     
+    def open_connection(self):
+        """Open a separate connection to the application database (caller closes it).
+
+        Autocommit like the shared connection: a long-lived worker connection
+        would otherwise keep reading the snapshot of its first SELECT.
+        """
+        return mysql.connector.connect(
+            host='localhost',
+            user='root',
+            password='',
+            database=self.database,
+            autocommit=True,
+            charset='utf8mb4'
+        )
+
+    def stream_query(self, query, params=None, chunk_size=10000):
+        """Yield SELECT results as lists of row tuples, chunk_size rows at a time.
+
+        Uses an unbuffered cursor on its own connection, so memory stays at one
+        chunk and the shared connection remains free while the stream is read.
+        """
+        conn = self.open_connection()
+        try:
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+        finally:
+            conn.close()
+
     def execute_update(self, query, params=None):
         """Execute INSERT, UPDATE, DELETE query"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connected()
             cursor = self.connection.cursor()
             cursor.execute(query, params or ())
             self.connection.commit()
             cursor.close()
             return True
         except Error as e:
-            print(f"[ERROR] Update error: {e} — attempting reconnect")
+            print(f"[ERROR] Update error: {e} — retrying")
             try:
-                self.connect()
+                self._recover(e)
                 cursor = self.connection.cursor()
                 cursor.execute(query, params or ())
                 self.connection.commit()
@@ -161,6 +321,67 @@ class Database:
                 print(f"[ERROR] Update retry failed: {e2}")
                 return False
     
+    def execute_many(self, query, rows):
+        """Execute one INSERT/UPDATE for many parameter tuples in a single transaction"""
+        if not rows:
+            return True
+        for attempt in (1, 2):
+            try:
+                self._ensure_connected()
+                cursor = self.connection.cursor()
+                self.connection.start_transaction()
+                cursor.executemany(query, rows)
+                self.connection.commit()
+                cursor.close()
+                return True
+            except Error as e:
+                print(f"[ERROR] Batch update error: {e}")
+                try:
+                    self.connection.rollback()
+                except Error:
+                    pass
+                # The whole batch was rolled back, so a lock conflict can be replayed
+                if attempt == 1 and e.errno in (ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT):
+                    self._recover(e)
+                    continue
+                return False
+    
+    def run_in_transaction(self, work):
+        """Run work(cursor) in one transaction on the shared connection and commit.
+
+        work gets a dictionary cursor and returns a result other than None.
+        A deadlock or lock wait timeout rolls the whole transaction back and
+        it is replayed once; returns None if it failed, with the MySQL errno
+        (None if there was no server error) in last_errno.
+        """
+        self.last_errno = None
+        for attempt in (1, 2):
+            cursor = None
+            try:
+                self._ensure_connected()
+                self.connection.start_transaction()
+                cursor = self.connection.cursor(dictionary=True)
+                result = work(cursor)
+                self.connection.commit()
+                return result
+            except Exception as e:
+                print(f"[ERROR] Transaction error: {e}")
+                try:
+                    self.connection.rollback()
+                except Exception:
+                    pass
+                self.last_errno = getattr(e, 'errno', None)
+                if attempt == 1 and self.last_errno in (ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT):
+                    self._recover(e)
+                    continue
+                return None
+            finally:
+                if cursor is not None:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+
     def hash_password(self, password):
         """Hash password using SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -212,13 +433,31 @@ class Database:
         """
         return self.execute_query(query, (student_id,))
 
-    def get_teacher_subjects(self, teacher_id):
+    def get_marks_for_students(self, student_ids):
+        """get_student_marks for many students in one query, grouped as {student_id: rows}"""
+        student_ids = [int(s) for s in student_ids]
+        marks = {s: [] for s in student_ids}
+        if not student_ids:
+            return marks
+        query = f"""
+        SELECT m.*, s.subject_name, s.subject_code, s.credits, t.fullname as teacher_name
+        FROM marks m
+        JOIN subjects s ON m.subject_id = s.subject_id
+        JOIN teachers t ON m.teacher_id = t.teacher_id
+        WHERE m.student_id IN ({', '.join(['%s'] * len(student_ids))})
+        ORDER BY m.student_id, m.exam_date DESC
+        """
+        for row in self.execute_query(query, tuple(student_ids)) or []:
+            marks[row['student_id']].append(row)
+        return marks
+
+    def get_teacher_subjects(self, teacher_id, conn=None):
         """Get subjects taught by a teacher"""
         query = "SELECT subject_id, subject_name FROM subjects WHERE teacher_id = %s ORDER BY subject_name"
-        return self.execute_query(query, (teacher_id,)) or []
+        return self._select(conn, query, (teacher_id,))
 
     def get_marks_for_teacher(self, teacher_id):
-        """Get all marks entered by a teacher with student and subject names"""
+        """Get all marks entered by a teacher with student and subject names (None if the query failed)"""
         query = """
         SELECT 
             m.mark_id,
@@ -235,7 +474,8 @@ class Database:
         WHERE m.teacher_id = %s
         ORDER BY m.exam_date DESC, m.mark_id DESC
         """
-        return self.execute_query(query, (teacher_id,)) or []
+        # No `or []`: the teacher dashboard keeps its last good list when this fails
+        return self.execute_query(query, (teacher_id,))
 
     def get_teacher_students(self, teacher_id):
         """Get distinct students who have marks with this teacher"""
@@ -251,11 +491,11 @@ class Database:
     def get_teacher_students_gender_counts(self, teacher_id):
         """Return gender counts for students taught by teacher (distinct students)"""
         query = """
-        SELECT st.gender, COUNT(DISTINCT st.student_id) as count
-        FROM marks m
-        JOIN students st ON m.student_id = st.student_id
-        WHERE m.teacher_id = %s
-        GROUP BY st.gender
+        SELECT c.gender, COUNT(DISTINCT cm.student_id) as count
+        FROM marks_cube c
+        JOIN cube_members cm ON cm.cell_id = c.cell_id
+        WHERE c.teacher_id = %s
+        GROUP BY c.gender
         """
         rows = self.execute_query(query, (teacher_id,)) or []
         data = { (r['gender'] or 'Other'): r['count'] for r in rows }
@@ -268,10 +508,10 @@ class Database:
     def get_teacher_subject_average_percentages(self, teacher_id, limit=10):
         """Average percentage per subject for a teacher"""
         query = """
-        SELECT s.subject_name, AVG((m.marks_obtained / NULLIF(m.total_marks,0)) * 100) as avg_pct
-        FROM marks m
-        JOIN subjects s ON m.subject_id = s.subject_id
-        WHERE m.teacher_id = %s
+        SELECT s.subject_name, SUM(c.sum_pct) / NULLIF(SUM(c.n_scored), 0) as avg_pct
+        FROM marks_cube c
+        JOIN subjects s ON c.subject_id = s.subject_id
+        WHERE c.teacher_id = %s
         GROUP BY s.subject_id, s.subject_name
         ORDER BY s.subject_name ASC
         LIMIT %s
@@ -281,10 +521,9 @@ class Database:
     def get_teacher_monthly_trends_average(self, teacher_id, months=6):
         """Monthly average percentage for a teacher"""
         query = """
-        SELECT DATE_FORMAT(m.exam_date, '%Y-%m') as ym,
-               AVG((m.marks_obtained / NULLIF(m.total_marks,0)) * 100) as avg_pct
-        FROM marks m
-        WHERE m.teacher_id = %s AND m.exam_date IS NOT NULL
+        SELECT ym, SUM(sum_pct) / NULLIF(SUM(n_scored), 0) as avg_pct
+        FROM marks_cube
+        WHERE teacher_id = %s AND ym <> ''
         GROUP BY ym
         ORDER BY ym DESC
         LIMIT %s
@@ -292,34 +531,154 @@ class Database:
         rows = self.execute_query(query, (teacher_id, months)) or []
         return list(reversed(rows))
 
+    def get_student_marks_fingerprint(self, student_id):
+        """Cheap summary of a student's marks; changes whenever one is added, edited or removed"""
+        fingerprints = self.get_student_marks_fingerprints([student_id])
+        return None if fingerprints is None else fingerprints.get(int(student_id))
+
+    def get_student_marks_fingerprints(self, student_ids):
+        """{student_id: fingerprint} for many students in one grouped query (None on error)"""
+        student_ids = [int(s) for s in student_ids]
+        if not student_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(student_ids))
+        query = f"""
+        SELECT student_id, COUNT(*) as n, MAX(mark_id) as last_mark_id, MAX(exam_date) as last_exam_date,
+               SUM(marks_obtained) as sum_obtained, SUM(total_marks) as sum_total
+        FROM marks
+        WHERE student_id IN ({placeholders})
+        GROUP BY student_id
+        """
+        rows = self.execute_query(query, tuple(student_ids))
+        if rows is None:
+            return None
+        # Students without marks get the same summary the ungrouped query gave them
+        fingerprints = {s: "0:None:None:None:None" for s in student_ids}
+        for r in rows:
+            fingerprints[int(r['student_id'])] = (
+                f"{r['n']}:{r['last_mark_id']}:{r['last_exam_date']}:{r['sum_obtained']}:{r['sum_total']}")
+        return fingerprints
+
+    def add_mark_listener(self, callback):
+        """Register callback(student_id), called after a mark write succeeds"""
+        if callback not in self._mark_listeners:
+            self._mark_listeners.append(callback)
+
+    def remove_mark_listener(self, callback):
+        if callback in self._mark_listeners:
+            self._mark_listeners.remove(callback)
+
+    def _notify_mark_change(self, student_id):
+        for callback in list(self._mark_listeners):
+            try:
+                callback(student_id)
+            except Exception as e:
+                print(f"[WARN] Mark listener failed: {e}")
+
+    def _cube_tracked(self, where, params, query, query_params, after=None):
+        """Run one write and move the affected marks between cube cells, in one transaction.
+
+        The marks matching `where` are read FOR UPDATE before the write, so a
+        concurrent write to them waits and the cube sees each change once.
+        after(rows) gives them as they are after the write (default: read
+        again by id); their old cells get -1 and their new cells +1 before
+        the commit. Returns the rows as they were, or None if it failed.
+        """
+        def work(cursor):
+            before = marks_cube.mark_facts(cursor, where, params, lock=True)
+            cursor.execute(query, query_params)
+            rows = after(before) if after else marks_cube.facts_for_marks(cursor, [r['mark_id'] for r in before])
+            marks_cube.move(cursor, before, rows)
+            return before
+        return self.run_in_transaction(work)
+
+    def _notify_marks_of(self, rows):
+        for student_id in dict.fromkeys(r['student_id'] for r in rows):
+            self._notify_mark_change(student_id)
+
     def add_mark(self, student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date):
-        """Insert a new mark record"""
+        """Insert a new mark record (and its cube cell) in one transaction"""
         query = (
             "INSERT INTO marks (student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date) "
             "VALUES (%s, %s, %s, %s, %s, %s)"
         )
-        return self.execute_update(query, (student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date))
+
+        def work(cursor):
+            cursor.execute(query, (student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date))
+            # Locks the student row too, so a concurrent student edit cannot move the mark's cell under us
+            facts = marks_cube.facts_for_marks(cursor, [cursor.lastrowid], lock=True)
+            marks_cube.move(cursor, [], facts)
+            return facts
+        if self.run_in_transaction(work) is None:
+            return False
+        self._notify_mark_change(student_id)
+        return True
+
+    def add_marks(self, rows):
+        """Insert journaled marks in one transaction, skipping keys already applied.
+
+        rows are (idempotency_key, student_id, subject_id, teacher_id,
+        marks_obtained, total_marks, exam_date). A replay of a batch that was
+        committed before its acknowledgement was lost inserts nothing.
+        """
+        if not rows:
+            return True
+        keys = tuple(r[0] for r in rows)
+        placeholders = ", ".join(["%s"] * len(keys))
+        query = (
+            "INSERT INTO marks (idempotency_key, student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        )
+
+        def work(cursor):
+            cursor.execute(f"SELECT idempotency_key FROM marks WHERE idempotency_key IN ({placeholders})", keys)
+            done = {r['idempotency_key'] for r in cursor.fetchall()}
+            new = [r for r in rows if r[0] not in done]
+            if new:
+                cursor.executemany(query, new)
+                new_keys = tuple(r[0] for r in new)
+                facts = marks_cube.mark_facts(
+                    cursor, f"m.idempotency_key IN ({', '.join(['%s'] * len(new_keys))})", new_keys, lock=True)
+                marks_cube.move(cursor, [], facts)
+            return new
+        new = self.run_in_transaction(work)
+        if new is None:
+            return False
+        for student_id in dict.fromkeys(r[1] for r in new):
+            self._notify_mark_change(student_id)
+        return True
 
     def update_mark(self, mark_id, marks_obtained, total_marks, exam_date):
         """Update an existing mark record"""
         query = (
             "UPDATE marks SET marks_obtained = %s, total_marks = %s, exam_date = %s WHERE mark_id = %s"
         )
-        return self.execute_update(query, (marks_obtained, total_marks, exam_date, mark_id))
+        before = self._cube_tracked("m.mark_id = %s", (mark_id,),
+                                    query, (marks_obtained, total_marks, exam_date, mark_id))
+        if before is None:
+            return False
+        self._notify_marks_of(before)
+        return True
 
     def delete_mark(self, mark_id):
         """Delete a mark record"""
         query = "DELETE FROM marks WHERE mark_id = %s"
-        return self.execute_update(query, (mark_id,))
+        before = self._cube_tracked("m.mark_id = %s", (mark_id,), query, (mark_id,), after=lambda rows: [])
+        if before is None:
+            return False
+        self._notify_marks_of(before)
+        return True
     
-    def get_all_students(self):
-        """Get all students"""
+    def get_all_students(self, conn=None):
+        """Get all students (on `conn` when given, see _select)"""
         query = """
         SELECT s.*, u.username, u.role 
         FROM students s 
         JOIN users u ON s.user_id = u.user_id
         ORDER BY s.fullname
         """
+        if conn is not None:
+            return self._select(conn, query)
         return self.execute_query(query)
     
     def get_all_teachers(self):
@@ -342,7 +701,8 @@ class Database:
         """
         return self.execute_query(query)
     
-    def add_student(self, username, password, fullname, email, phone, date_of_birth, gender, address, status):
+    def add_student(self, username, password, fullname, email, phone, date_of_birth, gender, address, status,
+                    grade_level=None):
         """Add new student transactionally and return True on success."""
         try:
             if not self.connection or not self.connection.is_connected():
@@ -372,10 +732,10 @@ class Database:
             # Insert student profile
             cursor.execute(
                 """
-                INSERT INTO students (user_id, fullname, email, phone, date_of_birth, gender, address, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO students (user_id, fullname, email, phone, date_of_birth, gender, address, status, grade_level)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """,
-                (user_id, fullname, email, phone, date_of_birth, gender, address, status)
+                (user_id, fullname, email, phone, date_of_birth, gender, address, status, grade_level)
             )
 
             # Commit both inserts
@@ -454,14 +814,20 @@ class Database:
             except Exception:
                 pass
     
-    def update_student(self, student_id, fullname, email, phone, date_of_birth, gender, address, status):
+    def update_student(self, student_id, fullname, email, phone, date_of_birth, gender, address, status,
+                       grade_level=None):
         """Update student information"""
         query = """
         UPDATE students 
-        SET fullname = %s, email = %s, phone = %s, date_of_birth = %s, gender = %s, address = %s, status = %s
+        SET fullname = %s, email = %s, phone = %s, date_of_birth = %s, gender = %s, address = %s, status = %s,
+            grade_level = %s
         WHERE student_id = %s
         """
-        return self.execute_update(query, (fullname, email, phone, date_of_birth, gender, address, status, student_id))
+        # Gender, grade level and status are cube dimensions: move this student's marks to their new cells
+        return self._cube_tracked(
+            "m.student_id = %s", (student_id,),
+            query, (fullname, email, phone, date_of_birth, gender, address, status, grade_level, student_id)
+        ) is not None
     
     def update_teacher(self, teacher_id, fullname, email, phone, department, qualification, status):
         """Update teacher information"""
@@ -475,13 +841,38 @@ class Database:
     def delete_student(self, student_id):
         """Delete student (cascades to user and marks)"""
         query = "DELETE FROM students WHERE student_id = %s"
-        return self.execute_update(query, (student_id,))
+        ok = self._cube_tracked("m.student_id = %s", (student_id,), query, (student_id,),
+                                after=lambda rows: []) is not None
+        if ok:
+            self._notify_mark_change(student_id)
+        return ok
     
     def delete_teacher(self, teacher_id):
         """Delete teacher (cascades to user)"""
         query = "DELETE FROM teachers WHERE teacher_id = %s"
-        return self.execute_update(query, (teacher_id,))
+        return self._cube_tracked("m.teacher_id = %s", (teacher_id,), query, (teacher_id,)) is not None
     
+    def get_at_risk_page(self, after_rank=0, limit=50):
+        """One page of the ranked at_risk table (keyset paging on rank_no)"""
+        query = """
+        SELECT r.rank_no, r.student_id, s.fullname, sub.subject_name, r.predicted_pct,
+               r.low_pct, r.high_pct, r.predicted_grade, r.trend_slope, r.reason, r.risk_score
+        FROM at_risk r
+        LEFT JOIN students s ON r.student_id = s.student_id
+        LEFT JOIN subjects sub ON r.subject_id = sub.subject_id
+        WHERE r.rank_no > %s
+        ORDER BY r.rank_no
+        LIMIT %s
+        """
+        return self.execute_query(query, (after_rank, limit)) or []
+
+    def get_at_risk_summary(self):
+        """Row count, last scoring time and model version of the at_risk table"""
+        result = self.execute_query(
+            "SELECT COUNT(*) as total, MAX(scored_at) as scored_at, MAX(model_version) as model_version FROM at_risk"
+        )
+        return result[0] if result else {'total': 0, 'scored_at': None, 'model_version': None}
+
     def get_system_stats(self):
         """Get system statistics for admin dashboard"""
         stats = {}
@@ -499,7 +890,7 @@ class Database:
         stats['total_subjects'] = result[0]['count'] if result else 0
         
         # Average percentage across all marks (marks_obtained / total_marks * 100)
-        result = self.execute_query("SELECT AVG((marks_obtained / NULLIF(total_marks,0)) * 100) as avg_pct FROM marks")
+        result = self.execute_query("SELECT SUM(sum_pct) / NULLIF(SUM(n_scored), 0) as avg_pct FROM marks_cube")
         stats['average_marks'] = round(result[0]['avg_pct'], 2) if result and result[0]['avg_pct'] else 0
         
         return stats
@@ -519,9 +910,9 @@ class Database:
         """Average percentage per subject, top N subjects by name"""
         query = (
             """
-            SELECT s.subject_name, AVG((m.marks_obtained / NULLIF(m.total_marks,0)) * 100) as avg_pct
-            FROM marks m
-            JOIN subjects s ON m.subject_id = s.subject_id
+            SELECT s.subject_name, SUM(c.sum_pct) / NULLIF(SUM(c.n_scored), 0) as avg_pct
+            FROM marks_cube c
+            JOIN subjects s ON c.subject_id = s.subject_id
             GROUP BY s.subject_id, s.subject_name
             ORDER BY s.subject_name ASC
             LIMIT %s
@@ -533,10 +924,9 @@ class Database:
         """Average percentage per recent month (YYYY-MM)"""
         query = (
             """
-            SELECT DATE_FORMAT(exam_date, '%Y-%m') as ym,
-                   AVG((marks_obtained / NULLIF(total_marks,0)) * 100) as avg_pct
-            FROM marks
-            WHERE exam_date IS NOT NULL
+            SELECT ym, SUM(sum_pct) / NULLIF(SUM(n_scored), 0) as avg_pct
+            FROM marks_cube
+            WHERE ym <> ''
             GROUP BY ym
             ORDER BY ym DESC
             LIMIT %s
@@ -545,31 +935,124 @@ class Database:
         rows = self.execute_query(query, (months,)) or []
         return list(reversed(rows))
     
+    def _select(self, conn, query, params=()):
+        """SELECT on `conn` when given (e.g. a worker thread's own connection), else the shared one"""
+        if conn is None:
+            return self.execute_query(query, params) or []
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def get_performance_filter_options(self, conn=None):
+        """Exam years (newest first) and grade levels present, for the dashboard filters"""
+        years = self._select(conn, "SELECT DISTINCT academic_year FROM marks "
+                                   "WHERE academic_year IS NOT NULL ORDER BY academic_year DESC")
+        grades = self._select(conn, "SELECT DISTINCT grade_level FROM students "
+                                    "WHERE grade_level IS NOT NULL ORDER BY grade_level")
+        return ([int(r['academic_year']) for r in years], [int(r['grade_level']) for r in grades])
+
+    def get_performance_summary(self, year=None, grade_level=None, conn=None):
+        """Aggregates for the performance dashboard, filtered in SQL by exam year and grade level.
+
+        Returns {'students', 'by_group', 'subjects'}: active student count
+        (those with marks in the year, once a year is chosen), student
+        counts per grade level (per gender once a grade is chosen),
+        and per subject pass/fail/not-attended counts, participating
+        students and average percentage. Subject figures roll up from
+        marks_cube (pass mark: marks_cube.PASS_PCT).
+        """
+        student_where, student_params = ["st.status = 'Active'"], []
+        if grade_level is not None:
+            student_where.append("st.grade_level = %s")
+            student_params.append(grade_level)
+        if year is not None:
+            student_where.append("EXISTS (SELECT 1 FROM marks m WHERE m.student_id = st.student_id "
+                                 "AND m.academic_year = %s)")
+            student_params.append(year)
+        cell_where, cell_params = ["c.active = 1"], []
+        if grade_level is not None:
+            cell_where.append("c.grade_level = %s")
+            cell_params.append(grade_level)
+        if year is not None:
+            cell_where.append("c.academic_year = %s")
+            cell_params.append(year)
+        cell_where = " AND ".join(cell_where)
+
+        group_col = "st.gender" if grade_level is not None else "st.grade_level"
+        by_group = self._select(conn, f"""
+            SELECT {group_col} AS grp, COUNT(*) AS count
+            FROM students st
+            WHERE {' AND '.join(student_where)}
+            GROUP BY {group_col}
+            ORDER BY {group_col}
+            """, tuple(student_params))
+
+        subjects = self._select(conn, f"""
+            SELECT s.subject_id, s.subject_name,
+                   SUM(c.n_passed) AS passed, SUM(c.n_failed) AS failed,
+                   SUM(c.n_not_attended) AS not_attended,
+                   SUM(c.sum_pct) / NULLIF(SUM(c.n_scored), 0) AS avg_pct
+            FROM marks_cube c
+            JOIN subjects s ON c.subject_id = s.subject_id
+            WHERE {cell_where}
+            GROUP BY s.subject_id, s.subject_name
+            ORDER BY s.subject_name
+            """, tuple(cell_params))
+        # Distinct students are not additive across cells; count them from the members
+        participants = {r['subject_id']: int(r['participants']) for r in self._select(conn, f"""
+            SELECT c.subject_id, COUNT(DISTINCT cm.student_id) AS participants
+            FROM marks_cube c
+            JOIN cube_members cm ON cm.cell_id = c.cell_id
+            WHERE {cell_where}
+            GROUP BY c.subject_id
+            """, tuple(cell_params))}
+
+        return {
+            'students': sum(int(r['count']) for r in by_group),
+            'by_group': [(r['grp'], int(r['count'])) for r in by_group],
+            'subjects': [{
+                'subject_name': r['subject_name'],
+                'passed': int(r['passed'] or 0),
+                'failed': int(r['failed'] or 0),
+                'not_attended': int(r['not_attended'] or 0),
+                'participants': participants.get(r['subject_id'], 0),
+                'avg_pct': float(r['avg_pct']) if r['avg_pct'] is not None else None,
+            } for r in subjects],
+        }
+
     def get_top_students(self, limit=3):
-        """Get top performing students with their CGPA"""
+        """Get top performing students with their CGPA (rolled up from cube_members)"""
         query = """
         SELECT 
             s.student_id,
             s.fullname,
             s.email,
             s.gender,
-            COUNT(m.mark_id) as total_exams,
-            AVG((m.marks_obtained / m.total_marks) * 100) as avg_percentage,
+            t.total_exams,
+            t.avg_percentage,
             CASE 
-                WHEN AVG((m.marks_obtained / m.total_marks) * 100) >= 90 THEN 4.0
-                WHEN AVG((m.marks_obtained / m.total_marks) * 100) >= 80 THEN 3.5
-                WHEN AVG((m.marks_obtained / m.total_marks) * 100) >= 70 THEN 3.0
-                WHEN AVG((m.marks_obtained / m.total_marks) * 100) >= 60 THEN 2.5
-                WHEN AVG((m.marks_obtained / m.total_marks) * 100) >= 50 THEN 2.0
+                WHEN t.avg_percentage >= 90 THEN 4.0
+                WHEN t.avg_percentage >= 80 THEN 3.5
+                WHEN t.avg_percentage >= 70 THEN 3.0
+                WHEN t.avg_percentage >= 60 THEN 2.5
+                WHEN t.avg_percentage >= 50 THEN 2.0
                 ELSE 1.0
             END as cgpa
-        FROM students s
-        JOIN marks m ON s.student_id = m.student_id
-        WHERE s.status = 'Active'
-        GROUP BY s.student_id, s.fullname, s.email, s.gender
-        HAVING COUNT(m.mark_id) > 0
-        ORDER BY avg_percentage DESC
-        LIMIT %s
+        FROM (
+            SELECT cm.student_id,
+                   SUM(cm.n_marks) as total_exams,
+                   SUM(cm.sum_pct) / NULLIF(SUM(cm.n_scored), 0) as avg_percentage
+            FROM cube_members cm
+            JOIN marks_cube c ON c.cell_id = cm.cell_id
+            WHERE c.active = 1
+            GROUP BY cm.student_id
+            ORDER BY avg_percentage DESC
+            LIMIT %s
+        ) t
+        JOIN students s ON s.student_id = t.student_id
+        ORDER BY t.avg_percentage DESC
         """
         return self.execute_query(query, (limit,))
     
@@ -605,5 +1088,32 @@ class Database:
             self.connection.close()
             print("[OK] Database connection closed")
 
-# Global database instance
-db = Database()
+class _SharedDatabase:
+    """The app's Database, connected on first use.
+
+    Importing this module does not connect, so tools that open their own
+    (non-interactive) Database never build the interactive one.
+    """
+
+    def __init__(self):
+        self._db = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = Database()
+        return self._db
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def get_db():
+    """The shared app Database (connects the first time)"""
+    return db.get()
+
+
+# Global database instance (lazy)
+db = _SharedDatabase()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training dataset builder for the grade predictor.
+
+Streams marks ordered by student_id in chunks and featurizes each
+student's marks with features.training_features once all of them have
+arrived; the rows of a student that straddles a chunk boundary are carried
+into the next chunk. Features are appended to a .npy file that training
+memory-maps. Memory use is one chunk plus one student's marks, whatever
+the size of the marks table.
+
+Usage:
+    python dataset_builder.py models/dataset.npy --chunk-size 100000
+    python ml_model.py --dataset models/dataset.npy
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+
+import numpy as np
+
+from features import FEATURES, marks_from_rows, training_features
+
+COLUMNS = FEATURES + ["pct"]
+
+# Grouped by student only: a student's rows are featurized together once complete
+_MARKS_SQL = """
+    SELECT m.mark_id, m.student_id, m.subject_id, m.teacher_id, m.exam_date,
+           m.marks_obtained, m.total_marks, m.created_at
+    FROM marks m
+    WHERE m.total_marks IS NOT NULL AND m.marks_obtained IS NOT NULL
+    ORDER BY m.student_id
+"""
+
+
+def _split_complete_students(rows):
+    """Split rows (ordered by student) before the last student's first row."""
+    last_student = rows[-1][1]
+    i = len(rows)
+    while i > 0 and rows[i - 1][1] == last_student:
+        i -= 1
+    return rows[:i], rows[i:]
+
+
+def _fill_mean(db):
+    # Same fill training uses for a student's first mark: the mean over all marks
+    rows = db.execute_query(
+        "SELECT AVG((marks_obtained / NULLIF(total_marks, 0)) * 100) AS avg_pct FROM marks "
+        "WHERE total_marks IS NOT NULL AND marks_obtained IS NOT NULL"
+    ) or []
+    return float(rows[0]["avg_pct"]) if rows and rows[0]["avg_pct"] is not None else 0.0
+
+
+def build_dataset_file(path, chunk_size=50000):
+    """Stream the marks table into a (rows, 7) float64 .npy plus a JSON sidecar.
+
+    Returns the sidecar metadata, or None when there are no marks.
+    """
+    from database import db
+    fill_mean = _fill_mean(db)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    n_rows, max_mark_id, max_created = 0, None, None
+
+    def header(rows):
+        return {"descr": "<f8", "fortran_order": False, "shape": (rows, len(COLUMNS))}
+
+    with open(tmp_path, "wb") as f:
+        # numpy pads the header so it can be rewritten in place with the final shape
+        np.lib.format.write_array_header_1_0(f, header(0))
+        data_offset = f.tell()
+
+        def write(rows):
+            nonlocal n_rows, max_mark_id, max_created
+            marks = marks_from_rows(rows)
+            if not len(marks["pct"]):
+                return
+            np.column_stack([training_features(marks, fill_mean), marks["pct"]]).tofile(f)
+            n_rows += len(marks["pct"])
+            max_mark_id = max(int(marks["mark_id"].max()), max_mark_id or 0)
+            created = [c for c in marks["created_at"] if c is not None]
+            if created and (max_created is None or max(created) > max_created):
+                max_created = max(created)
+
+        pending = []
+        for chunk in db.stream_query(_MARKS_SQL, chunk_size=chunk_size):
+            # The last student may continue in the next chunk, so hold their rows back
+            complete, pending = _split_complete_students(pending + chunk)
+            if complete:
+                write(complete)
+        if pending:
+            write(pending)
+        f.seek(0)
+        np.lib.format.write_array_header_1_0(f, header(n_rows))
+        if f.tell() != data_offset:
+            raise RuntimeError("NPY header grew while rewriting the row count")
+
+    if n_rows == 0:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+    meta = {
+        "columns": COLUMNS,
+        "features": FEATURES,
+        "n_rows": n_rows,
+        "fill_mean": fill_mean,
+        "watermark": {
+            "mark_id": max_mark_id,
+            "created_at": max_created.isoformat() if hasattr(max_created, "isoformat") else max_created,
+        },
+        "chunk_size": chunk_size,
+        "built_at": dt.datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=str)
+    return meta
+
+
+def load_dataset_file(path):
+    """Memory-map a built dataset: returns (features array view, target view, meta)."""
+    with open(path + ".json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    data = np.load(path, mmap_mode="r")
+    return data[:, :len(FEATURES)], data[:, len(FEATURES)], meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the grade-predictor training set out of core")
+    parser.add_argument("path", help="output .npy file (a .json sidecar is written next to it)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+    meta = build_dataset_file(args.path, chunk_size=args.chunk_size)
+    if meta is None:
+        print("[WARN] No marks to export")
+    else:
+        print(f"[OK] Wrote {meta['n_rows']} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Drift and data-quality monitor for the grade predictor.
+
+At training time ml_model stores a profile of each feature (mean, variance
+and decile bin edges with their proportions) in the manifest entry. After
+that, every mark past the monitor's mark_id watermark (from this client or
+any other) is featurized from its student's earlier marks only, scored
+with the compiled model, and folded into streaming summaries kept in a
+small JSON file that every client shares:
+
+  - running mean and variance per feature (Welford)
+  - fixed-bin histograms on the training bin edges, compared by PSI
+  - per-subject residuals (actual minus predicted percentage)
+
+Mark writes only wake a background thread, which reads the new marks on a
+connection of its own, so the UI thread never waits on the monitor.
+Nothing rescans the marks table. Each pass reloads, folds and saves the
+state under a file lock, so clients never overwrite each other's marks.
+The watermark only moves past ids it has seen (or given up on, GAP_WINDOW
+ids back), since a mark can commit after one with a higher id. When the
+PSI of a score-level feature or the live MAE passes its threshold, a full
+retrain is started in a background process, once per model version.
+
+Usage:
+    python drift_monitor.py            # print the current drift report
+"""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from file_lock import file_lock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(HERE, "models", "drift_state.json")
+LOCK_TIMEOUT_S = 120       # a pass is a few marks queries; longer means a crashed holder
+GAP_WINDOW = 1000          # ids a late-committing mark may trail the highest seen one
+
+PSI_THRESHOLD = 0.2        # population stability index above this is a real shift
+MAE_RATIO_THRESHOLD = 1.5  # live MAE this much worse than the holdout MAE
+MIN_OBSERVATIONS = 200     # marks before PSI is trusted
+MIN_RESIDUALS = 50         # scored marks before the MAE check is trusted
+# attempts_subj and days_since grow with time for any new mark, and ids shift
+# with staffing, so only the score-level features can trigger a retrain
+TRIGGER_FEATURES = ("student_overall_avg", "subj_avg")
+_EPS = 1e-4
+
+
+def profile_features(X, feature_names, bins=10):
+    """Training-time profile: mean, variance and quantile-bin proportions per feature."""
+    X = np.asarray(X, dtype=np.float64)
+    profile = {}
+    for j, name in enumerate(feature_names):
+        col = X[:, j][~np.isnan(X[:, j])]
+        if not len(col):
+            continue
+        edges = np.unique(np.quantile(col, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1)
+        profile[name] = {
+            "mean": float(col.mean()),
+            "var": float(col.var()),
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+        }
+    return profile
+
+
+def psi(expected, actual_counts):
+    """Population stability index of observed counts against expected proportions."""
+    actual = np.asarray(actual_counts, dtype=np.float64)
+    if actual.sum() == 0:
+        return 0.0
+    p = np.maximum(actual / actual.sum(), _EPS)
+    q = np.maximum(np.asarray(expected, dtype=np.float64), _EPS)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+class _Running:
+    """Welford running mean/variance; state is a plain dict for JSON."""
+
+    @staticmethod
+    def new():
+        return {"n": 0, "mean": 0.0, "m2": 0.0}
+
+    @staticmethod
+    def push(s, x):
+        s["n"] += 1
+        delta = x - s["mean"]
+        s["mean"] += delta / s["n"]
+        s["m2"] += delta * (x - s["mean"])
+
+    @staticmethod
+    def var(s):
+        return s["m2"] / s["n"] if s["n"] else 0.0
+
+
+class DriftMonitor:
+    def __init__(self, state_path=STATE_PATH, database=None):
+        self.state_path = state_path
+        self.lock_path = state_path + ".lock"
+        self.database = database
+        self._lock = threading.Lock()
+        self.state = self._load()
+        self._db = None
+        self._wake = threading.Event()
+        self._thread = None
+
+    # ---- state ----
+
+    def _fresh_state(self, entry):
+        profile = entry.get("feature_profile") or {}
+        return {
+            "model_version": entry.get("version"),
+            "last_mark_id": (entry.get("watermark") or {}).get("mark_id", 0),
+            "seen_ids": [],
+            "holdout_mae": (entry.get("metrics") or {}).get("mae"),
+            "features": {name: dict(_Running.new(), hist=[0] * len(p["proportions"]))
+                         for name, p in profile.items()},
+            "residuals": {},
+            "retrain_requested": False,
+        }
+
+    def _load(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Drift state unreadable, starting over: {e}")
+        return {"model_version": None}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _current_entry(self):
+        from fast_predictor import current_entry
+        return current_entry()
+
+    # ---- updates ----
+
+    def on_mark_change(self, student_id):
+        """Database mark listener: wake the monitor thread (returns at once)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Writes made while a pass runs wake the next one
+            self._wake.clear()
+            try:
+                self.update()
+            except Exception as e:
+                print(f"[WARN] Drift monitor update failed: {e}")
+
+    def _connection(self):
+        if self._db is None:
+            from database import Database
+            self._db = Database(database=self.database, interactive=False)
+        return self._db
+
+    def update(self, db=None):
+        """Fold every mark past the watermark into the summaries; returns the report."""
+        # Other clients fold into the same file: reload it under their lock
+        with self._lock, file_lock(self.lock_path, LOCK_TIMEOUT_S):
+            self.state = self._load()
+            entry = self._current_entry()
+            if entry is None or not entry.get("feature_profile"):
+                return None
+            if self.state.get("model_version") != entry["version"]:
+                self.state = self._fresh_state(entry)
+            if not self._observe_new(db or self._connection(), entry):
+                return None
+            self._save()
+            report = self.report(entry)
+        if report["drift"] and not self.state.get("retrain_requested"):
+            self.request_retrain(report)
+        return report
+
+    def _observe_new(self, db, entry):
+        from features import FEATURES, fetch_marks, training_features
+        watermark = self.state["last_mark_id"]
+        seen = set(self.state.get("seen_ids") or [])
+        new = fetch_marks(db, since_mark_id=watermark)
+        new_ids = np.setdiff1d(new["mark_id"], np.fromiter(seen, dtype=np.int64, count=len(seen)))
+        if not len(new_ids):
+            return False
+        students = np.unique(new["student_id"][np.isin(new["mark_id"], new_ids)])
+        marks = fetch_marks(db, student_ids=students.tolist())
+        fresh = np.isin(marks["mark_id"], new_ids)
+        # Each new mark is featurized from its student's earlier marks only
+        X = training_features(marks, fill_mean=entry.get("fill_mean"))[fresh]
+        actual = marks["pct"][fresh]
+        profile = entry["feature_profile"]
+        for j, name in enumerate(FEATURES):
+            s = self.state["features"].get(name)
+            if s is None:
+                continue
+            edges = np.asarray(profile[name]["edges"])
+            for x in X[:, j]:
+                if not math.isnan(x):
+                    _Running.push(s, float(x))
+                    s["hist"][int(np.searchsorted(edges, x, side="right"))] += 1
+        predicted = self._predict(X)
+        if predicted is not None:
+            for subject_id, a, p in zip(marks["subject_id"][fresh], actual, predicted):
+                r = self.state["residuals"].setdefault(str(int(subject_id)), dict(_Running.new(), abs_sum=0.0))
+                _Running.push(r, float(a - p))
+                r["abs_sum"] += abs(float(a - p))
+        self._advance(watermark, seen.union(int(i) for i in new_ids))
+        return True
+
+    def _advance(self, watermark, seen):
+        """Move the watermark over the unbroken run of seen ids.
+
+        A hole is an id still uncommitted, rolled back or deleted; it is given
+        up once the highest seen id is GAP_WINDOW past it.
+        """
+        watermark = max(watermark, max(seen) - GAP_WINDOW)
+        while watermark + 1 in seen:
+            watermark += 1
+        self.state["last_mark_id"] = watermark
+        self.state["seen_ids"] = sorted(i for i in seen if i > watermark)
+
+    def _predict(self, X):
+        from fast_predictor import load_current
+        try:
+            compiled = load_current()
+        except Exception as e:
+            print(f"[WARN] Drift monitor cannot load the compiled model: {e}")
+            return None
+        if compiled is None or compiled.version != self.state.get("model_version"):
+            return None
+        return np.clip(compiled.predict(X), 0.0, 100.0)
+
+    # ---- reporting ----
+
+    def report(self, entry=None):
+        """Drift summary for the current model; 'drift' is True past a threshold."""
+        entry = entry or self._current_entry() or {}
+        profile = entry.get("feature_profile") or {}
+        features, reasons = {}, []
+        for name, s in (self.state.get("features") or {}).items():
+            if name not in profile:
+                continue
+            value = psi(profile[name]["proportions"], s["hist"])
+            features[name] = {
+                "n": s["n"],
+                "mean": round(s["mean"], 3),
+                "baseline_mean": round(profile[name]["mean"], 3),
+                "std": round(math.sqrt(_Running.var(s)), 3),
+                "psi": round(value, 4),
+            }
+            if name in TRIGGER_FEATURES and s["n"] >= MIN_OBSERVATIONS and value > PSI_THRESHOLD:
+                reasons.append(f"{name} PSI {value:.2f}")
+        residuals = self.state.get("residuals") or {}
+        n = sum(r["n"] for r in residuals.values())
+        live_mae = sum(r["abs_sum"] for r in residuals.values()) / n if n else None
+        holdout_mae = self.state.get("holdout_mae")
+        if live_mae is not None and holdout_mae and n >= MIN_RESIDUALS \
+                and live_mae > MAE_RATIO_THRESHOLD * holdout_mae:
+            reasons.append(f"live MAE {live_mae:.1f} vs holdout {holdout_mae:.1f}")
+        return {
+            "model_version": self.state.get("model_version"),
+            "features": features,
+            "subjects": {k: {"n": r["n"], "bias": round(r["mean"], 2), "mae": round(r["abs_sum"] / r["n"], 2)}
+                         for k, r in residuals.items() if r["n"]},
+            "live_mae": None if live_mae is None else round(live_mae, 3),
+            "holdout_mae": holdout_mae,
+            "drift": bool(reasons),
+            "reasons": reasons,
+        }
+
+    def request_retrain(self, report):
+        """Start a full retrain in a separate process, once per model version across clients."""
+        with self._lock, file_lock(self.lock_path, LOCK_TIMEOUT_S):
+            self.state = self._load()
+            if self.state.get("model_version") != report["model_version"] or self.state.get("retrain_requested"):
+                return
+            print(f"[WARN] Model drift detected ({'; '.join(report['reasons'])}); starting a full retrain")
+            try:
+                subprocess.Popen([sys.executable, os.path.join(HERE, "ml_model.py"), "--refresh", "--full"], cwd=HERE)
+            except OSError as e:
+                print(f"[ERROR] Could not start retraining: {e}")
+                return
+            self.state["retrain_requested"] = True
+            self._save()
+
+
+_MONITOR = None
+
+def attach_drift_monitor(db):
+    """Register the shared monitor as a mark listener on a Database."""
+    global _MONITOR
+    if _MONITOR is None:
+        _MONITOR = DriftMonitor(database=db.database)
+    db.add_mark_listener(_MONITOR.on_mark_change)
+    return _MONITOR
+
+
+if __name__ == "__main__":
+    print(json.dumps(DriftMonitor().report(), indent=2))
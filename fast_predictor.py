@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Dependency-free inference for the forest grade predictor.
+
+ml_model.export_compiled() flattens a trained scaler + one-hot + random forest
+pipeline into a single .npz (scaler parameters, one-hot vocabularies and padded
+tree node arrays). This module only needs NumPy to load it and evaluates every
+tree for every row in one vectorized walk, so the admin UI can show
+predictions without importing pandas, scikit-learn or joblib.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from registry_paths import REGISTRY_DIR
+
+
+class CompiledForest:
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.features = meta["features"]
+        self.num_cols = meta["num_cols"]
+        self.cat_cols = meta["cat_cols"]
+        self.version = meta.get("version")
+        self.num_mean = arrays["num_mean"]
+        self.num_scale = arrays["num_scale"]
+        self.vocabs = [arrays[f"vocab_{i}"] for i in range(len(self.cat_cols))]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_trees, n_nodes = self.left.shape
+        # Flattened copies with tree offsets baked in, so a walk step is a 1-D take()
+        base = (np.arange(self.n_trees, dtype=np.int64) * n_nodes)[:, None]
+        self._left = (self.left + base).ravel()
+        self._right = (self.right + base).ravel()
+        self._feature = self.feature.ravel().astype(np.int64)
+        self._threshold = self.threshold.ravel()
+        self._value = self.value.ravel()
+        self._roots = base.ravel()
+        self.n_inputs = len(self.num_cols) + sum(len(v) for v in self.vocabs)
+        self._num_idx = [self.features.index(c) for c in self.num_cols]
+        self._cat_idx = [self.features.index(c) for c in self.cat_cols]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files if k != "meta"}
+            meta = json.loads(str(data["meta"]))
+        return cls(arrays, meta)
+
+    def transform(self, X):
+        """Raw feature matrix (columns in self.features order) -> model inputs."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.zeros((X.shape[0], self.n_inputs), dtype=np.float64)
+        n_num = len(self.num_cols)
+        out[:, :n_num] = (X[:, self._num_idx] - self.num_mean) / self.num_scale
+        offset = n_num
+        rows = np.arange(X.shape[0])
+        for col, vocab in zip(self._cat_idx, self.vocabs):
+            values = X[:, col]
+            pos = np.searchsorted(vocab, values)
+            pos_clipped = np.minimum(pos, len(vocab) - 1)
+            # Unknown categories encode as all zeros (handle_unknown="ignore")
+            known = vocab[pos_clipped] == values
+            out[rows[known], offset + pos_clipped[known]] = 1.0
+            offset += len(vocab)
+        return out
+
+    def predict_trees(self, X):
+        """Per-tree predictions, shape (n_rows, n_trees)."""
+        Xt = self.transform(X)
+        # Trees compare float32-cast inputs against float64 thresholds
+        Xt = Xt.astype(np.float32).astype(np.float64)
+        n_rows, n_inputs = Xt.shape
+        Xflat = Xt.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_inputs)[:, None]
+        node = np.broadcast_to(self._roots, (n_rows, self.n_trees)).copy()
+        # Leaves point to themselves, so max_depth steps settle every path;
+        # stop early once every (row, tree) pair has reached a leaf
+        for step in range(self.max_depth):
+            go_left = Xflat.take(row_base + self._feature.take(node)) <= self._threshold.take(node)
+            nxt = np.where(go_left, self._left.take(node), self._right.take(node))
+            if step % 4 == 3 and np.array_equal(nxt, node):
+                break
+            node = nxt
+        return self._value.take(node)
+
+    def predict(self, X):
+        return self.predict_trees(X).mean(axis=1)
+
+    def row(self, **values):
+        """Build one raw feature row from keyword values (e.g. subject_id=3)."""
+        return [float(values[c]) for c in self.features]
+
+
+def current_entry(registry_dir=REGISTRY_DIR):
+    """Manifest entry of the registry's current version (no scikit-learn import)."""
+    manifest_path = os.path.join(registry_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return next((v for v in manifest.get("versions", []) if v["version"] == manifest.get("current")), None)
+
+
+def current_compiled_path(registry_dir=REGISTRY_DIR):
+    """Path of the compiled .npz for the registry's current version, if any."""
+    entry = current_entry(registry_dir)
+    if not entry or not entry.get("compiled"):
+        return None
+    path = os.path.join(registry_dir, entry["compiled"])
+    return path if os.path.exists(path) else None
+
+
+_LOADED = {}
+
+def load_current(registry_dir=REGISTRY_DIR):
+    """Load (and cache) the compiled forest for the current model version."""
+    path = current_compiled_path(registry_dir)
+    if path is None:
+        return None
+    if path not in _LOADED:
+        _LOADED.clear()
+        _LOADED[path] = CompiledForest.load(path)
+    return _LOADED[path]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Grade-predictor features, shared by training and inference.
+
+Every feature for a mark is computed from the same student's earlier marks
+in chronological order (exam_date, then mark_id):
+
+    student_overall_avg  mean pct of all earlier marks (fill_mean if none)
+    subj_avg             mean pct of earlier marks in the subject (else overall)
+    attempts_subj        number of earlier marks in the subject
+    days_since           days since the last mark in the subject (60 if none)
+    subject_id, teacher_id
+
+Training rows use the marks before each mark; inference uses the marks on
+or before an as-of date, so both sides see identical definitions. Only
+NumPy is needed, and any number of (student, subject, as-of) keys are
+answered in one vectorized pass over the marks arrays.
+"""
+
+import datetime as dt
+
+import numpy as np
+
+FEATURES = ["student_overall_avg", "subj_avg", "attempts_subj", "days_since", "subject_id", "teacher_id"]
+DEFAULT_DAYS_SINCE = 60.0
+MARK_COLUMNS = ("mark_id", "student_id", "subject_id", "teacher_id", "exam_date",
+                "marks_obtained", "total_marks", "created_at")
+
+_EPOCH = dt.date(1970, 1, 1)
+_DAY_BITS = 32  # composite sort keys: group code in the high bits, day in the low bits
+_DAY_OFFSET = 1 << 31
+
+
+def to_day(value):
+    """date/datetime/ISO string -> days since 1970-01-01 (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = dt.date.fromisoformat(value[:10])
+    if isinstance(value, dt.datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def marks_from_rows(rows):
+    """Mark rows (dicts or tuples in MARK_COLUMNS order) -> dict of column arrays.
+
+    Rows without a usable percentage or exam date are dropped.
+    """
+    if not rows:
+        return empty_marks()
+    if isinstance(rows[0], dict):
+        cols = [[r.get(c) for r in rows] for c in MARK_COLUMNS]
+    else:
+        cols = [list(c) for c in zip(*rows)]
+        cols += [[None] * len(rows)] * (len(MARK_COLUMNS) - len(cols))
+    dates = np.array(cols[4], dtype="datetime64[D]")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = (np.array(cols[5], dtype=np.float64) / np.array(cols[6], dtype=np.float64)) * 100.0
+    keep = ~np.isnan(pct) & ~np.isnat(dates)
+    return {
+        "mark_id": np.array(cols[0], dtype=np.int64)[keep],
+        "student_id": np.array(cols[1], dtype=np.int64)[keep],
+        "subject_id": np.array(cols[2], dtype=np.int64)[keep],
+        "teacher_id": np.array([np.nan if t is None else t for t in cols[3]], dtype=np.float64)[keep],
+        "day": dates[keep].astype(np.int64),
+        "pct": pct[keep],
+        "created_at": np.array(cols[7], dtype=object)[keep],
+    }
+
+
+def empty_marks():
+    ints = np.empty(0, dtype=np.int64)
+    return {"mark_id": ints, "student_id": ints, "subject_id": ints, "teacher_id": np.empty(0),
+            "day": ints, "pct": np.empty(0), "created_at": np.empty(0, dtype=object)}
+
+
+def fetch_marks(db, student_ids=None, since_mark_id=None):
+    """Load marks from the database as column arrays (one query)."""
+    where, params = ["m.total_marks IS NOT NULL", "m.marks_obtained IS NOT NULL"], []
+    if since_mark_id is not None:
+        where.append("m.mark_id > %s")
+        params.append(int(since_mark_id))
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        if not student_ids:
+            return empty_marks()
+        where.append(f"m.student_id IN ({', '.join(['%s'] * len(student_ids))})")
+        params.extend(int(s) for s in student_ids)
+    rows = db.execute_query(
+        f"""
+        SELECT m.mark_id, m.student_id, m.subject_id, m.teacher_id, m.exam_date,
+               m.marks_obtained, m.total_marks, m.created_at
+        FROM marks m
+        WHERE {' AND '.join(where)}
+        """, tuple(params) or None
+    ) or []
+    return marks_from_rows(rows)
+
+
+def pair_codes(student_ids, subject_ids):
+    """Single int64 key per (student, subject)."""
+    return (student_ids.astype(np.int64) << _DAY_BITS) | subject_ids.astype(np.int64)
+
+
+def _group_prior(order, groups, pct):
+    """For rows visited in `order`, sum/count of earlier pct in the same group."""
+    g = groups[order]
+    v = pct[order]
+    n = len(order)
+    idx = np.arange(n)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = g[1:] != g[:-1]
+    seg_start = np.maximum.accumulate(np.where(starts, idx, 0))
+    cum = np.concatenate(([0.0], np.cumsum(v)))
+    prior_sum = np.empty(n)
+    prior_cnt = np.empty(n)
+    prior_sum[order] = cum[idx] - cum[seg_start]
+    prior_cnt[order] = idx - seg_start
+    prev = np.full(n, -1, dtype=np.int64)
+    prev[order[~starts]] = order[idx[~starts] - 1]
+    return prior_sum, prior_cnt, prev
+
+
+def _assemble(overall_sum, overall_cnt, subj_sum, subj_cnt, days_since, subject_ids, teacher_ids, fill_mean):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = np.where(overall_cnt > 0, overall_sum / np.maximum(overall_cnt, 1), fill_mean)
+        subj_avg = np.where(subj_cnt > 0, subj_sum / np.maximum(subj_cnt, 1), overall)
+    return np.column_stack([overall, subj_avg, subj_cnt, days_since,
+                            subject_ids.astype(np.float64), teacher_ids.astype(np.float64)])
+
+
+def training_features(marks, fill_mean=None):
+    """Feature matrix (n, len(FEATURES)) aligned with the rows of `marks`."""
+    n = len(marks["pct"])
+    if n == 0:
+        return np.empty((0, len(FEATURES)))
+    if fill_mean is None:
+        fill_mean = float(marks["pct"].mean())
+    student, subject, day, mark_id = marks["student_id"], marks["subject_id"], marks["day"], marks["mark_id"]
+    by_student = np.lexsort((mark_id, day, student))
+    overall_sum, overall_cnt, _ = _group_prior(by_student, student, marks["pct"])
+    pairs = pair_codes(student, subject)
+    by_subject = np.lexsort((mark_id, day, pairs))
+    subj_sum, subj_cnt, prev = _group_prior(by_subject, pairs, marks["pct"])
+    days_since = np.where(prev >= 0, day - day[np.maximum(prev, 0)], DEFAULT_DAYS_SINCE).astype(np.float64)
+    return _assemble(overall_sum, overall_cnt, subj_sum, subj_cnt, days_since,
+                     subject, marks["teacher_id"], fill_mean)
+
+
+def features_for_keys(marks, student_ids, subject_ids, as_of=None, fill_mean=None):
+    """Features for (student, subject) keys as of a date, from marks on or before it.
+
+    as_of is a date (or days since epoch, or an array of either per key);
+    defaults to today. Returns (X, attempts) where attempts is the number
+    of earlier marks in each key's subject (0 means no subject history).
+    The teacher feature is the teacher of the latest mark in the subject.
+    """
+    student_ids = np.atleast_1d(np.asarray(student_ids, dtype=np.int64))
+    subject_ids = np.atleast_1d(np.asarray(subject_ids, dtype=np.int64))
+    student_ids, subject_ids = np.broadcast_arrays(student_ids, subject_ids)
+    if as_of is None:
+        as_of = dt.date.today()
+    if isinstance(as_of, (dt.date, str)):
+        as_of = to_day(as_of)
+    as_of = np.broadcast_to(np.asarray(as_of, dtype=np.int64), student_ids.shape)
+    if not len(marks["pct"]):
+        zeros = np.zeros(student_ids.shape)
+        X = _assemble(zeros, zeros, zeros, zeros, np.full(zeros.shape, DEFAULT_DAYS_SINCE),
+                      subject_ids, zeros, 0.0 if fill_mean is None else fill_mean)
+        return X, zeros.astype(np.int64)
+    if fill_mean is None:
+        fill_mean = float(marks["pct"].mean())
+
+    day = marks["day"]
+    pct = marks["pct"]
+    # Marks sorted by (student, day); counting those <= as_of is a searchsorted
+    s_key = (marks["student_id"] << _DAY_BITS) | (day + _DAY_OFFSET)
+    s_order = np.argsort(s_key, kind="stable")
+    s_sorted = s_key[s_order]
+    s_cum = np.concatenate(([0.0], np.cumsum(pct[s_order])))
+    lo = np.searchsorted(s_sorted, student_ids << _DAY_BITS, side="left")
+    hi = np.searchsorted(s_sorted, (student_ids << _DAY_BITS) | (as_of + _DAY_OFFSET), side="right")
+    overall_sum, overall_cnt = s_cum[hi] - s_cum[lo], (hi - lo).astype(np.float64)
+
+    # Same per (student, subject): pairs get a dense code so the key stays in 64 bits
+    pairs = pair_codes(marks["student_id"], marks["subject_id"])
+    uniq, codes = np.unique(pairs, return_inverse=True)
+    p_key = (codes.astype(np.int64) << _DAY_BITS) | (day + _DAY_OFFSET)
+    p_order = np.lexsort((marks["mark_id"], p_key))
+    p_sorted = p_key[p_order]
+    p_cum = np.concatenate(([0.0], np.cumsum(pct[p_order])))
+    want = pair_codes(student_ids, subject_ids)
+    pos = np.searchsorted(uniq, want)
+    found = (pos < len(uniq)) & (uniq[np.minimum(pos, len(uniq) - 1)] == want)
+    code = np.where(found, pos, -1).astype(np.int64)
+    lo = np.searchsorted(p_sorted, code << _DAY_BITS, side="left")
+    hi = np.searchsorted(p_sorted, (code << _DAY_BITS) | (as_of + _DAY_OFFSET), side="right")
+    hi = np.where(found, hi, lo)
+    subj_sum, subj_cnt = p_cum[hi] - p_cum[lo], (hi - lo).astype(np.float64)
+
+    has = hi > lo
+    last = p_order[np.maximum(hi - 1, 0)]
+    days_since = np.where(has, as_of - day[last], DEFAULT_DAYS_SINCE).astype(np.float64)
+    teacher = np.where(has, marks["teacher_id"][last], 0.0)
+    X = _assemble(overall_sum, overall_cnt, subj_sum, subj_cnt, days_since,
+                  subject_ids, np.nan_to_num(teacher), fill_mean)
+    return X, subj_cnt.astype(np.int64)
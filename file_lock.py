@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Cross-process exclusive lock on a path (an O_EXCL lock file), for files
+several clients or processes rewrite: the model registry manifest and the
+drift monitor's state.
+
+The lock file holds a token unique to its holder. A lock older than
+`stale_after` is taken to belong to a crashed holder and broken, by
+renaming it aside and re-checking its token, so two waiters that both
+find it stale can never remove each other's fresh lock.
+"""
+
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+POLL_S = 0.2
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _break_stale(path, held):
+    """Remove the lock at path if it still holds `held`; False if it turned out to be a newer one"""
+    aside = f"{path}.{uuid.uuid4().hex}.stale"
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+    if _read(aside) == held:
+        os.remove(aside)
+        return True
+    # Another waiter broke it first and took the lock: put theirs back (link never overwrites)
+    try:
+        os.link(aside, path)
+    except OSError as e:
+        print(f"[WARN] Could not restore lock {path}: {e}")
+    os.remove(aside)
+    return False
+
+
+@contextmanager
+def file_lock(path, timeout, stale_after=None):
+    """Hold `path` exclusively; waits up to `timeout` seconds, then raises TimeoutError."""
+    stale_after = timeout if stale_after is None else stale_after
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    token = f"{os.getpid()} {uuid.uuid4().hex}"
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            held = _read(path)
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except OSError:
+                continue
+            if held is not None and age > stale_after:
+                print(f"[WARN] Breaking stale lock {path}")
+                _break_stale(path, held)
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"{path} is locked")
+            time.sleep(POLL_S)
+    try:
+        os.write(fd, token.encode())
+        os.close(fd)
+        yield
+    finally:
+        # Only our own: had we outlived stale_after, a waiter may hold it now
+        if _read(path) == token:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
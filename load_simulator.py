@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-user load simulator.
+
+Drives the real Database methods with virtual users, each with its own
+Database (own connection) in its own thread or process, for a fixed time:
+
+    teachers  open their marks list (get_marks_for_teacher), enter marks
+              (add_mark) and correct them (update_mark)
+    students  view their marks (get_student_marks)
+    admins    view the dashboard (get_system_stats, get_top_students)
+
+Each user waits --think-ms (exponentially distributed) between actions.
+Reports throughput and p50/p95/p99 latency per operation, failed
+operations, and the deadlocks, lock wait timeouts and reconnects counted
+by the users' Database objects.
+
+Marks are written, so the simulator runs against a synthetic dataset
+(loaded with synthetic_data.ensure_dataset) unless --force is given.
+
+Usage:
+    python load_simulator.py --teachers 20 --students 50 --admins 3 --duration 60
+    python load_simulator.py --mode process --teachers 8 --scale 1m --json load.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_DATABASE = "spms_synthetic"
+TEACHER_MIX = (("get_marks_for_teacher", 0.4), ("add_mark", 0.4), ("update_mark", 0.2))
+ADMIN_MIX = (("get_system_stats", 0.5), ("get_top_students", 0.5))
+STUDENT_MIX = (("get_student_marks", 1.0),)
+ROLES = ("teacher", "student", "admin")
+
+
+def _classes(db, teacher_ids):
+    """{teacher_id: (subject_ids, student_ids)} from the marks each teacher already has"""
+    if not teacher_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(teacher_ids))
+    rows = db.execute_query(
+        f"SELECT DISTINCT teacher_id, subject_id, student_id FROM marks WHERE teacher_id IN ({placeholders})",
+        tuple(teacher_ids)) or []
+    classes = {t: (set(), set()) for t in teacher_ids}
+    for r in rows:
+        classes[r['teacher_id']][0].add(r['subject_id'])
+        classes[r['teacher_id']][1].add(r['student_id'])
+    return {t: (sorted(s), sorted(p)) for t, (s, p) in classes.items() if s and p}
+
+
+def plan_users(db, teachers, students, admins, seed):
+    """Virtual users as (role, index, context) tuples, picked deterministically"""
+    rng = np.random.default_rng(seed)
+    teacher_rows = db.execute_query("SELECT DISTINCT teacher_id FROM marks") or []
+    student_rows = db.execute_query("SELECT student_id FROM students WHERE status = 'Active'") or []
+    teacher_pool = [r['teacher_id'] for r in teacher_rows]
+    student_pool = [r['student_id'] for r in student_rows]
+    if teachers and not teacher_pool:
+        raise ValueError("no teachers with marks to simulate")
+    if students and not student_pool:
+        raise ValueError("no active students to simulate")
+    chosen = [teacher_pool[i] for i in rng.choice(len(teacher_pool), teachers, replace=teachers > len(teacher_pool))] \
+        if teachers else []
+    classes = _classes(db, sorted(set(chosen)))
+    users = [("teacher", i, {"teacher_id": t, "subjects": classes[t][0], "students": classes[t][1]})
+             for i, t in enumerate(chosen) if t in classes]
+    users += [("student", i, {"student_id": student_pool[j]})
+              for i, j in enumerate(rng.choice(len(student_pool), students) if students else [])]
+    users += [("admin", i, {}) for i in range(admins)]
+    return users
+
+
+class VirtualUser:
+    """One simulated user: its own Database and a weighted mix of actions"""
+
+    def __init__(self, role, index, context, database, seed, think_ms):
+        from database import Database
+        self.role = role
+        self.context = context
+        self.rng = np.random.default_rng([seed, ROLES.index(role), index])
+        self.think_s = think_ms / 1000.0
+        # Runs on a worker thread or in a pool process: log a failed connect, no dialog
+        self.db = Database(database=database, interactive=False)
+        self.mix = {"teacher": TEACHER_MIX, "student": STUDENT_MIX, "admin": ADMIN_MIX}[role]
+        self.my_marks = []   # mark ids this teacher can correct
+        self.latencies = {}
+        self.failures = {}
+
+    def _action(self):
+        names = [m for m, _ in self.mix]
+        weights = np.array([w for _, w in self.mix])
+        name = names[self.rng.choice(len(names), p=weights / weights.sum())]
+        if name == "update_mark" and not self.my_marks:
+            name = "get_marks_for_teacher"
+        return name
+
+    def _pct_mark(self):
+        total = 100
+        return float(np.clip(round(self.rng.normal(68, 14)), 0, total)), total
+
+    def step(self):
+        name = self._action()
+        db, ctx = self.db, self.context
+        t0 = time.perf_counter()
+        if name == "get_marks_for_teacher":
+            result = db.get_marks_for_teacher(ctx["teacher_id"])
+            ok = result is not None
+            if result:
+                self.my_marks = [r['mark_id'] for r in result[:200]]
+        elif name == "add_mark":
+            obtained, total = self._pct_mark()
+            ok = db.add_mark(int(self.rng.choice(ctx["students"])), int(self.rng.choice(ctx["subjects"])),
+                             ctx["teacher_id"], obtained, total, dt.date.today())
+        elif name == "update_mark":
+            obtained, total = self._pct_mark()
+            ok = db.update_mark(int(self.rng.choice(self.my_marks)), obtained, total, dt.date.today())
+        elif name == "get_student_marks":
+            ok = db.get_student_marks(ctx["student_id"]) is not None
+        elif name == "get_system_stats":
+            ok = bool(db.get_system_stats())
+        else:
+            ok = db.get_top_students(10) is not None
+        elapsed = time.perf_counter() - t0
+        self.latencies.setdefault(name, []).append(elapsed)
+        if not ok:
+            self.failures[name] = self.failures.get(name, 0) + 1
+
+    def connected(self):
+        try:
+            return bool(self.db.connection) and self.db.connection.is_connected()
+        except Exception:
+            return False
+
+    def run(self, deadline):
+        if not self.connected():
+            print(f"[ERROR] {self.role} could not connect; counted as a failed user")
+            return _failed_user(self.role, "connect", self.db.stats)
+        while time.time() < deadline:
+            try:
+                self.step()
+            except Exception as e:
+                self.failures["exception"] = self.failures.get("exception", 0) + 1
+                print(f"[ERROR] {self.role} action failed: {e}")
+            if self.think_s:
+                time.sleep(min(self.rng.exponential(self.think_s), max(deadline - time.time(), 0)))
+        self.db.close()
+        return {"role": self.role, "latencies": self.latencies, "failures": self.failures,
+                "stats": dict(self.db.stats)}
+
+
+def _failed_user(role, reason, stats=None):
+    """Result of a user that never ran, so it still shows up in the summary"""
+    return {"role": role, "latencies": {}, "failures": {reason: 1}, "stats": dict(stats or {}),
+            "failed": True}
+
+
+def _run_user(spec, database, seed, think_ms, deadline):
+    """Build and run one virtual user (thread target and process-pool task)"""
+    role, index, context = spec
+    try:
+        return VirtualUser(role, index, context, database, seed, think_ms).run(deadline)
+    except Exception as e:
+        print(f"[ERROR] {role} user failed: {e}")
+        return _failed_user(role, "exception")
+
+
+def summarize(results, elapsed):
+    latencies, failures = {}, {}
+    stats = {'reconnects': 0, 'deadlocks': 0, 'lock_timeouts': 0}
+    for r in results:
+        for name, values in r["latencies"].items():
+            latencies.setdefault(name, []).extend(values)
+        for name, n in r["failures"].items():
+            failures[name] = failures.get(name, 0) + n
+        for key in stats:
+            stats[key] += r["stats"].get(key, 0)
+    operations = {}
+    for name, values in sorted(latencies.items()):
+        a = np.array(values) * 1000.0
+        operations[name] = {
+            "count": len(values),
+            "ops_per_s": round(len(values) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(a, 50)), 2),
+            "p95_ms": round(float(np.percentile(a, 95)), 2),
+            "p99_ms": round(float(np.percentile(a, 99)), 2),
+            "failed": failures.get(name, 0),
+        }
+    total = sum(o["count"] for o in operations.values())
+    return {"elapsed_s": round(elapsed, 1), "operations": operations, "total_ops": total,
+            "ops_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+            "exceptions": failures.get("exception", 0),
+            "failed_users": sum(1 for r in results if r.get("failed")), **stats}
+
+
+def simulate(database=DEFAULT_DATABASE, teachers=10, students=30, admins=2, duration=30.0,
+             think_ms=50.0, mode="thread", seed=42):
+    from database import Database
+    db = Database(database=database, interactive=False)
+    if not db.connection or not db.connection.is_connected():
+        print(f"[ERROR] Cannot simulate without a connection to '{database}'")
+        return None
+    users = plan_users(db, teachers, students, admins, seed)
+    db.close()
+    print(f"[OK] Simulating {len(users)} users ({mode}s) for {duration:g}s against '{database}'")
+    started = time.time()
+    deadline = started + duration
+    if mode == "process":
+        with ProcessPoolExecutor(max_workers=len(users)) as pool:
+            results = list(pool.map(_run_user, users, [database] * len(users), [seed] * len(users),
+                                    [think_ms] * len(users), [deadline] * len(users)))
+    else:
+        results = [None] * len(users)
+
+        def target(i):
+            results[i] = _run_user(users[i], database, seed, think_ms, deadline)
+
+        threads = [threading.Thread(target=target, args=(i,), daemon=True) for i in range(len(users))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results = [r if r is not None else _failed_user(users[i][0], "exception") for i, r in enumerate(results)]
+    summary = summarize(results, time.time() - started)
+    summary.update({"users": {"teachers": teachers, "students": students, "admins": admins},
+                    "mode": mode, "think_ms": think_ms})
+    print(f"  {'operation':<24}{'count':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'failed':>8}")
+    for name, o in summary["operations"].items():
+        print(f"  {name:<24}{o['count']:>8}{o['ops_per_s']:>9}{o['p50_ms']:>9}{o['p95_ms']:>9}"
+              f"{o['p99_ms']:>9}{o['failed']:>8}")
+    print(f"[OK] {summary['total_ops']} operations in {summary['elapsed_s']}s ({summary['ops_per_s']} ops/s); "
+          f"deadlocks {summary['deadlocks']}, lock timeouts {summary['lock_timeouts']}, "
+          f"reconnects {summary['reconnects']}")
+    if summary["failed_users"]:
+        print(f"[WARN] {summary['failed_users']} of {len(users)} users failed to run")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent teachers, students and admins")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--scale", default="10k", help="synthetic dataset size to load first (marks)")
+    parser.add_argument("--teachers", type=int, default=10)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="mean pause between a user's actions")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="allow writing marks into the app database")
+    parser.add_argument("--json", help="write the summary to this JSON file")
+    args = parser.parse_args()
+
+    from database import DB_NAME
+    if args.database == DB_NAME and not args.force:
+        print(f"[ERROR] The simulator writes marks; refusing to run against '{DB_NAME}' without --force")
+        return
+    if args.database != DB_NAME:
+        from synthetic_data import ensure_dataset, parse_scale
+        ensure_dataset(parse_scale(args.scale), database=args.database, seed=args.seed)
+    summary = simulate(args.database, args.teachers, args.students, args.admins, args.duration,
+                       args.think_ms, args.mode, args.seed)
+    if summary and args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,9 @@ Login window for Student Performance Monitoring System
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from database import db
-import admin
-import teacher
-import student
+from startup_profiler import instrument, span
+with span("import database", cat="import"):
+    from database import db
 import io
 import random
 import string
@@ -23,6 +22,7 @@ try:
 except Exception:
     Tooltip = None
 
+@instrument
 class LoginWindow:
     def __init__(self):
         self.root = tk.Tk()
@@ -436,9 +436,14 @@ class LoginWindow:
             self.root.withdraw()  # Hide login window
             try:
                 # Open appropriate dashboard based on role
+                # Dashboards are imported on demand so the login window opens without them
                 if user['role'] == 'admin':
+                    with span("import admin", cat="import"):
+                        import admin
                     admin.AdminDashboard(user).run()
                 elif user['role'] == 'teacher':
+                    with span("import teacher", cat="import"):
+                        import teacher
                     teacher_profile = db.get_teacher_by_user_id(user['user_id'])
                     if teacher_profile:
                         teacher.TeacherDashboard(user, teacher_profile)
@@ -446,6 +451,8 @@ class LoginWindow:
                         messagebox.showerror("Error", "Teacher profile not found")
                         self.root.deiconify()
                 elif user['role'] == 'student':
+                    with span("import student", cat="import"):
+                        import student
                     student_profile = db.get_student_by_user_id(user['user_id'])
                     if student_profile:
                         student.StudentDashboard(user, student_profile)
@@ -5,8 +5,16 @@ Main entry point for Student Performance Monitoring System
 
 import sys
 import os
-from database import db
-import admin
+import startup_profiler
+
+if "--profile-startup" in sys.argv:
+    # Before the imports below so their cost and the DB connect are traced too
+    startup_profiler.enable()
+
+with startup_profiler.span("import database", cat="import"):
+    from database import db
+with startup_profiler.span("import admin", cat="import"):
+    import admin
 
 def main():
     """Main application function"""
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated marks cube for the dashboard charts.
+
+`marks_cube` holds one row (cell) per combination of academic year,
+semester, month, subject, teacher, student gender, grade level and active
+status, with the mark count, scored-mark count, sum of percentages and
+pass / fail / not-attended counts. `cube_members` lists the students in
+each cell (with their mark count, scored-mark count and sum of
+percentages there), so distinct-student counts and per-student averages
+can be rolled up too. Chart queries read these tables, so they cost one
+row per cell instead of one per mark.
+
+The cube is kept current by Database's mark and student writes: in the
+write's own transaction the affected marks are locked (SELECT ... FOR
+UPDATE) and read before the write, and their cells are adjusted by -1 / +1
+before it commits. rebuild() recomputes everything from `marks` in SQL,
+in one transaction:
+
+    python marks_cube.py            # rebuild (e.g. after a bulk import)
+"""
+
+import datetime as dt
+from collections import defaultdict
+from contextlib import contextmanager
+
+PASS_PCT = 50.0    # below this percentage_to_grade gives an F
+REBUILD_LOCK_TIMEOUT_S = 600    # a second client waits for the first one's rebuild
+
+DIMENSIONS = ('academic_year', 'semester', 'ym', 'subject_id', 'teacher_id',
+              'gender', 'grade_level', 'active')
+MEASURES = ('n_marks', 'n_scored', 'sum_pct', 'n_passed', 'n_failed', 'n_not_attended')
+
+CUBE_DDL = """
+CREATE TABLE IF NOT EXISTS marks_cube (
+    cell_id INT AUTO_INCREMENT PRIMARY KEY,
+    academic_year SMALLINT NOT NULL,
+    semester TINYINT NOT NULL,
+    ym CHAR(7) NOT NULL,
+    subject_id INT NOT NULL,
+    teacher_id INT NOT NULL,
+    gender VARCHAR(10) NOT NULL,
+    grade_level TINYINT NOT NULL,
+    active TINYINT NOT NULL,
+    n_marks INT NOT NULL DEFAULT 0,
+    n_scored INT NOT NULL DEFAULT 0,
+    sum_pct DECIMAL(16,4) NOT NULL DEFAULT 0,
+    n_passed INT NOT NULL DEFAULT 0,
+    n_failed INT NOT NULL DEFAULT 0,
+    n_not_attended INT NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_cube_cell (academic_year, semester, ym, subject_id, teacher_id, gender, grade_level, active),
+    INDEX idx_cube_subject (subject_id),
+    INDEX idx_cube_teacher (teacher_id, subject_id)
+)
+"""
+
+MEMBERS_DDL = """
+CREATE TABLE IF NOT EXISTS cube_members (
+    cell_id INT NOT NULL,
+    student_id INT NOT NULL,
+    n_marks INT NOT NULL,
+    n_scored INT NOT NULL DEFAULT 0,
+    sum_pct DECIMAL(16,4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (cell_id, student_id),
+    INDEX idx_members_student (student_id)
+)
+"""
+
+# The same dimension values in SQL (rebuild) and Python (_cell_key); a missing
+# exam date, gender or grade level gets 0 / '' so every cell key is NOT NULL
+_PCT_SQL = "m.marks_obtained / NULLIF(m.total_marks, 0) * 100"
+_DIMENSION_SQL = {
+    'academic_year': "COALESCE(YEAR(m.exam_date), 0)",
+    'semester': "CASE WHEN m.exam_date IS NULL THEN 0 WHEN MONTH(m.exam_date) <= 6 THEN 1 ELSE 2 END",
+    'ym': "COALESCE(DATE_FORMAT(m.exam_date, '%Y-%m'), '')",
+    'subject_id': "m.subject_id",
+    'teacher_id': "COALESCE(m.teacher_id, 0)",
+    'gender': "COALESCE(st.gender, '')",
+    'grade_level': "COALESCE(st.grade_level, 0)",
+    'active': "COALESCE(st.status = 'Active', 0)",
+}
+
+_FACTS_QUERY = """
+SELECT m.mark_id, m.student_id, m.subject_id, m.teacher_id, m.marks_obtained, m.total_marks,
+       m.exam_date, st.gender, st.grade_level, st.status
+FROM marks m
+JOIN students st ON m.student_id = st.student_id
+WHERE {where}
+"""
+_MEMBER_MEASURES = ('n_marks', 'n_scored', 'sum_pct')
+
+
+def ensure(db):
+    """Create the cube tables if missing; fill them the first time."""
+    db.execute_update(CUBE_DDL)
+    db.execute_update(MEMBERS_DDL)
+    stale = _add_member_measures(db)
+    if stale or _needs_fill(db):
+        # Several clients may connect to an empty cube at once: one rebuilds, the rest find it filled
+        with _rebuild_lock(db) as locked:
+            if locked and (stale or _needs_fill(db)):
+                _rebuild(db)
+
+
+def _needs_fill(db):
+    cells = db.execute_query("SELECT 1 AS x FROM marks_cube LIMIT 1")
+    marks = db.execute_query("SELECT 1 AS x FROM marks LIMIT 1")
+    return not cells and bool(marks)
+
+
+def _add_member_measures(db):
+    """Add cube_members.n_scored / sum_pct to a table created before them; True if added"""
+    present = db.execute_query(
+        "SELECT 1 AS x FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'cube_members' AND COLUMN_NAME = 'sum_pct'",
+        (db.database,))
+    if present is None or present:
+        return False
+    ok = db.execute_update("ALTER TABLE cube_members ADD COLUMN n_scored INT NOT NULL DEFAULT 0, "
+                           "ADD COLUMN sum_pct DECIMAL(16,4) NOT NULL DEFAULT 0")
+    if ok:
+        print("[OK] Added cube_members.n_scored and sum_pct")
+    return ok
+
+
+@contextmanager
+def _rebuild_lock(db):
+    """Server-wide named lock for this schema's cube; yields False if it timed out"""
+    name = f"{db.database}.marks_cube"
+    rows = db.execute_query("SELECT GET_LOCK(%s, %s) AS locked", (name, REBUILD_LOCK_TIMEOUT_S))
+    locked = bool(rows and rows[0]['locked'])
+    if not locked:
+        print("[WARN] Marks cube is being rebuilt elsewhere; timed out waiting for it")
+    try:
+        yield locked
+    finally:
+        if locked:
+            db.execute_query("SELECT RELEASE_LOCK(%s) AS released", (name,))
+
+
+def rebuild(db):
+    """Recompute the cube and its members from `marks` (two INSERT ... SELECTs, one transaction)."""
+    with _rebuild_lock(db) as locked:
+        return locked and _rebuild(db)
+
+
+def _rebuild(db):
+    dims = ", ".join(f"{_DIMENSION_SQL[d]} AS {d}" for d in DIMENSIONS)
+    group = ", ".join(DIMENSIONS)
+    join_cells = " AND ".join(f"c.{d} = {_DIMENSION_SQL[d]}" for d in DIMENSIONS)
+
+    def work(cursor):
+        # Readers keep seeing the old cube until the new one commits
+        cursor.execute("DELETE FROM cube_members")
+        cursor.execute("DELETE FROM marks_cube")
+        cursor.execute(f"""
+            INSERT INTO marks_cube ({group}, {", ".join(MEASURES)})
+            SELECT {dims},
+                   COUNT(*),
+                   COUNT({_PCT_SQL}),
+                   COALESCE(SUM({_PCT_SQL}), 0),
+                   COALESCE(SUM({_PCT_SQL} >= {PASS_PCT}), 0),
+                   COALESCE(SUM({_PCT_SQL} < {PASS_PCT}), 0),
+                   SUM(m.marks_obtained IS NULL)
+            FROM marks m
+            JOIN students st ON m.student_id = st.student_id
+            GROUP BY {group}
+            """)
+        cursor.execute(f"""
+            INSERT INTO cube_members (cell_id, student_id, {", ".join(_MEMBER_MEASURES)})
+            SELECT c.cell_id, m.student_id, COUNT(*), COUNT({_PCT_SQL}), COALESCE(SUM({_PCT_SQL}), 0)
+            FROM marks m
+            JOIN students st ON m.student_id = st.student_id
+            JOIN marks_cube c ON {join_cells}
+            GROUP BY c.cell_id, m.student_id
+            """)
+        return True
+
+    ok = bool(db.run_in_transaction(work))
+    if ok:
+        print("[OK] Rebuilt marks cube")
+    return ok
+
+
+def mark_facts(cursor, where, params=(), lock=False):
+    """Mark rows (with the student's gender, grade level and status) matching `where`.
+
+    Runs on the caller's dictionary cursor. lock=True reads them FOR UPDATE,
+    which also locks their students' rows, so a concurrent write to the same
+    marks waits until this transaction commits.
+    """
+    cursor.execute(_FACTS_QUERY.format(where=where) + (" FOR UPDATE" if lock else ""), params)
+    return cursor.fetchall()
+
+
+def facts_for_marks(cursor, mark_ids, lock=False):
+    mark_ids = list(mark_ids)
+    if not mark_ids:
+        return []
+    return mark_facts(cursor, f"m.mark_id IN ({', '.join(['%s'] * len(mark_ids))})", tuple(mark_ids), lock)
+
+
+def _percentage(row):
+    try:
+        if row['marks_obtained'] is None or not float(row['total_marks'] or 0):
+            return None
+        return float(row['marks_obtained']) / float(row['total_marks']) * 100.0
+    except (TypeError, ValueError):
+        return None
+
+
+def _cell_key(row):
+    exam_date = row['exam_date']
+    if exam_date is not None and not hasattr(exam_date, 'year'):
+        exam_date = dt.date.fromisoformat(str(exam_date)[:10])
+    return (
+        exam_date.year if exam_date else 0,
+        (1 if exam_date.month <= 6 else 2) if exam_date else 0,
+        exam_date.strftime('%Y-%m') if exam_date else '',
+        int(row['subject_id']),
+        int(row['teacher_id'] or 0),
+        row['gender'] or '',
+        int(row['grade_level'] or 0),
+        1 if row['status'] == 'Active' else 0,
+    )
+
+
+def _changed(values):
+    return any(round(v, 6) for v in values)
+
+
+def move(cursor, before, after):
+    """Move marks between cells: `before` rows leave theirs, `after` rows join theirs.
+
+    Runs on the caller's cursor inside its transaction, so the cube commits
+    (or rolls back) with the write. Deltas are netted first, so an edit
+    that stays in its cell costs one cell and one member upsert.
+    """
+    cells = defaultdict(lambda: [0, 0, 0.0, 0, 0, 0])
+    members = defaultdict(lambda: [0, 0, 0.0])
+    for rows, sign in ((before, -1), (after, +1)):
+        for row in rows:
+            key = _cell_key(row)
+            cell = cells[key]
+            member = members[(key, int(row['student_id']))]
+            pct = _percentage(row)
+            cell[0] += sign
+            member[0] += sign
+            if row['marks_obtained'] is None:
+                cell[5] += sign
+            if pct is not None:
+                cell[1] += sign
+                cell[2] += sign * pct
+                cell[3 if pct >= PASS_PCT else 4] += sign
+                member[1] += sign
+                member[2] += sign * pct
+    # Sorted, so concurrent writers lock shared cells in the same order
+    cells = sorted((key, values) for key, values in cells.items() if _changed(values))
+    members = {k: v for k, v in members.items() if _changed(v)}
+    if not cells and not members:
+        return
+
+    columns = ", ".join(DIMENSIONS + MEASURES)
+    placeholders = ", ".join(['%s'] * (len(DIMENSIONS) + len(MEASURES)))
+    updates = ", ".join(f"{m} = {m} + VALUES({m})" for m in MEASURES)
+    upsert = f"INSERT INTO marks_cube ({columns}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE "
+    cell_ids = {}
+    if len(cells) == 1:
+        # LAST_INSERT_ID(cell_id) hands back the id of an existing cell too, saving the lookup
+        key, values = cells[0]
+        cursor.execute(upsert + f"cell_id = LAST_INSERT_ID(cell_id), {updates}", key + tuple(values))
+        cell_ids[key] = cursor.lastrowid
+    elif cells:
+        cursor.executemany(upsert + updates, [key + tuple(values) for key, values in cells])
+    missing = list(dict.fromkeys(key for key, _ in members if key not in cell_ids))
+    if missing:
+        row = "(" + ", ".join(['%s'] * len(DIMENSIONS)) + ")"
+        cursor.execute(
+            f"SELECT cell_id, {', '.join(DIMENSIONS)} FROM marks_cube "
+            f"WHERE ({', '.join(DIMENSIONS)}) IN ({', '.join([row] * len(missing))})",
+            tuple(v for key in missing for v in key))
+        for r in cursor.fetchall():
+            cell_ids[tuple(r[d] for d in DIMENSIONS)] = r['cell_id']
+    if not members:
+        return
+
+    member_rows = [(cell_ids[key], student_id) + tuple(values)
+                   for (key, student_id), values in members.items() if key in cell_ids]
+    cursor.executemany(
+        f"INSERT INTO cube_members (cell_id, student_id, {', '.join(_MEMBER_MEASURES)}) VALUES (%s, %s, %s, %s, %s) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(f'{m} = {m} + VALUES({m})' for m in _MEMBER_MEASURES)}",
+        member_rows)
+    emptied = tuple(dict.fromkeys(cell_ids[key] for (key, _), values in members.items()
+                                  if values[0] < 0 and key in cell_ids))
+    if emptied:
+        placeholders = ", ".join(['%s'] * len(emptied))
+        cursor.execute(f"DELETE FROM cube_members WHERE n_marks <= 0 AND cell_id IN ({placeholders})", emptied)
+        cursor.execute(f"DELETE FROM marks_cube WHERE n_marks <= 0 AND cell_id IN ({placeholders})", emptied)
+
+
+def main():
+    from database import db
+    db.execute_update(CUBE_DDL)
+    db.execute_update(MEMBERS_DDL)
+    _add_member_measures(db)
+    rebuild(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,147 +3,609 @@
 ML model utilities: train and predict student performance percentages.
 """
 
-import os, math, datetime as dt
-import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.pipeline import Pipeline
-from database import db
-
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "grade_predictor.joblib")
-
-def _fetch_marks_df():
-    rows = db.execute_query(
-        """
-        SELECT m.student_id, m.subject_id, m.teacher_id, m.exam_date,
-               m.marks_obtained, m.total_marks
-        FROM marks m
-        WHERE m.total_marks IS NOT NULL AND m.marks_obtained IS NOT NULL
-        ORDER BY m.student_id, m.subject_id, m.exam_date
-        """
-    ) or []
-    if not rows:
-        return pd.DataFrame([])
-    df = pd.DataFrame(rows)
-    df["exam_date"] = pd.to_datetime(df["exam_date"], errors="coerce")
-    df["pct"] = (df["marks_obtained"].astype(float) / df["total_marks"].astype(float)) * 100.0
-    return df.dropna(subset=["pct"])
-
-def _feature_engineer(df: pd.DataFrame) -> pd.DataFrame:
-    if df.empty:
-        return df
-    df = df.sort_values(["student_id", "subject_id", "exam_date"])
-    # Overall student expanding mean (shifted)
-    df["student_overall_avg"] = (
-        df.groupby("student_id")["pct"].apply(lambda s: s.expanding().mean().shift(1)).reset_index(level=0, drop=True)
-    )
-    # Per student-subject expanding mean (shifted)
-    df["subj_avg"] = (
-        df.groupby(["student_id","subject_id"])["pct"].apply(lambda s: s.expanding().mean().shift(1)).reset_index(level=[0,1], drop=True)
-    )
-    # Attempt count and recency
-    df["attempts_subj"] = df.groupby(["student_id","subject_id"]).cumcount()
-    prev_date = df.groupby(["student_id","subject_id"])["exam_date"].shift(1)
-    df["days_since"] = (df["exam_date"] - prev_date).dt.days.fillna(60)
-    # Fills
-    df["student_overall_avg"] = df["student_overall_avg"].fillna(df["pct"].mean())
-    df["subj_avg"] = df["subj_avg"].fillna(df["student_overall_avg"])
-    df["days_since"] = df["days_since"].fillna(60)
-    return df
+import os, json, time, datetime as dt
+from contextlib import contextmanager
+import numpy as np
+from features import FEATURES, fetch_marks, training_features, features_for_keys
+from registry_paths import MODEL_PATH, REGISTRY_DIR, MANIFEST_PATH, LOCK_PATH
+from file_lock import file_lock
+# pandas, joblib and scikit-learn are imported where they are used: the UI
+# predicts through the compiled forest (load_predictor) and never needs them
+
+# Registry locks older than this belong to a crashed trainer
+LOCK_TIMEOUT_S = 600
+
+# In-process cache of loaded bundles, keyed by version; the active one is keyed
+# by the manifest's mtime, so a version registered by another process is picked up
+_MODEL_CACHE = {}
+
+# Set to a directory to persist predictions across restarts (optional)
+PREDICTION_CACHE_DIR = os.environ.get("SPMS_PREDICTION_CACHE_DIR")
+_PREDICTION_CACHE = None
+
+NUM_FEATURES = ["student_overall_avg","subj_avg","attempts_subj","days_since"]
+CAT_FEATURES = ["subject_id","teacher_id"]
+DEFAULT_ESTIMATOR = "rf"
+
+# Incremental refresh (see refresh_model): forests grow by warm-started trees fit
+# on new marks; a full retrain still runs every FULL_RETRAIN_DAYS or once the
+# forest reaches MAX_FOREST_TREES
+WARM_START_ESTIMATORS = ("rf", "shallow_rf")
+MIN_REFRESH_ROWS = 20
+MAX_FOREST_TREES = 400
+FULL_RETRAIN_DAYS = 7
+
+def _fetch_marks(since_mark_id=None, student_ids=None, db=None):
+    if db is None:
+        from database import db
+    return fetch_marks(db, student_ids=student_ids, since_mark_id=since_mark_id)
+
+def _dataset_from_marks(marks, fill_mean=None):
+    """Training frame from mark arrays; features come from the shared features module."""
+    import pandas as pd
+    X = pd.DataFrame(training_features(marks, fill_mean), columns=FEATURES)
+    y = pd.Series(marks["pct"])
+    return X, y, list(FEATURES)
 
 def build_dataset():
-    df = _fetch_marks_df()
-    if df.empty:
+    marks = _fetch_marks()
+    if not len(marks["pct"]):
         return None, None, None
-    df = _feature_engineer(df)
-    df = df.dropna(subset=["student_overall_avg","subj_avg"])  # need history
-    features = ["student_overall_avg","subj_avg","attempts_subj","days_since","subject_id","teacher_id"]
-    X = df[features].copy()
-    y = df["pct"].astype(float)
-    return X, y, features
-
-def train_and_save():
-    X, y, features = build_dataset()
-    if X is None or len(X) < 20:
-        print("[WARN] Not enough data to train")
-        return False
+    return _dataset_from_marks(marks)
+
+def _watermark(marks):
+    """Newest mark a model has seen, stored in its manifest entry."""
+    created = [c for c in marks["created_at"] if c is not None]
+    latest = max(created) if created else None
+    return {
+        "mark_id": int(marks["mark_id"].max()),
+        "created_at": latest.isoformat() if hasattr(latest, "isoformat") else latest,
+    }
+
+def _onehot_preproc():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    return ColumnTransformer([
+        ("num", StandardScaler(), NUM_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_FEATURES),
+    ])
+
+def _rf_pipeline():
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    return Pipeline([
+        ("prep", _onehot_preproc()),
+        ("rf", RandomForestRegressor(n_estimators=200, random_state=42))
+    ])
+
+def _shallow_rf_pipeline():
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    # Fewer, depth-capped trees: much smaller on disk and cheaper per row
+    return Pipeline([
+        ("prep", _onehot_preproc()),
+        ("rf", RandomForestRegressor(n_estimators=40, max_depth=8, min_samples_leaf=5,
+                                     random_state=42))
+    ])
+
+def _ridge_pipeline():
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import Pipeline
+    return Pipeline([
+        ("prep", _onehot_preproc()),
+        ("ridge", Ridge(alpha=1.0))
+    ])
+
+def _hgb_pipeline():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OrdinalEncoder
+    # Native categorical support: ids are ordinal-encoded (unknown -> -1, treated as
+    # missing) and capped at 255 categories to fit the histogram bins
     preproc = ColumnTransformer([
-        ("num", StandardScaler(), ["student_overall_avg","subj_avg","attempts_subj","days_since"]),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), ["subject_id","teacher_id"]),
+        ("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1,
+                               encoded_missing_value=-1, max_categories=255), CAT_FEATURES),
+        ("num", "passthrough", NUM_FEATURES),
     ])
-    model = Pipeline([
+    return Pipeline([
         ("prep", preproc),
-        ("rf", RandomForestRegressor(n_estimators=200, random_state=42))
+        ("hgb", HistGradientBoostingRegressor(categorical_features=[0, 1], random_state=42))
     ])
+
+# Pluggable estimators, selectable per deployment (see bench_models.py)
+ESTIMATORS = {
+    "rf": _rf_pipeline,
+    "shallow_rf": _shallow_rf_pipeline,
+    "ridge": _ridge_pipeline,
+    "hgb": _hgb_pipeline,
+}
+
+def _build_pipeline(estimator=DEFAULT_ESTIMATOR):
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown estimator '{estimator}'. Choose from: {', '.join(ESTIMATORS)}")
+    return ESTIMATORS[estimator]()
+
+def _evaluate(X, y, estimator=DEFAULT_ESTIMATOR):
+    """Holdout MAE/R2 for the manifest; the saved model is refit on all rows."""
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error, r2_score
+    X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = _build_pipeline(estimator).fit(X_tr, y_tr)
+    pred = model.predict(X_te)
+    return {
+        "mae": round(float(mean_absolute_error(y_te, pred)), 4),
+        "r2": round(float(r2_score(y_te, pred)), 4),
+        "holdout_rows": int(len(y_te)),
+    }
+
+def train_and_save(estimator=DEFAULT_ESTIMATOR, dataset_path=None):
+    """Full retrain; dataset_path trains from a dataset_builder .npy instead of the DB."""
+    if dataset_path:
+        import pandas as pd
+        from dataset_builder import load_dataset_file
+        X_arr, y_arr, meta = load_dataset_file(dataset_path)
+        # Wraps the memory-mapped columns; rows are only read as the pipeline needs them
+        X = pd.DataFrame(X_arr, columns=meta["features"], copy=False)
+        y = pd.Series(y_arr, copy=False)
+        features = meta["features"]
+        watermark, fill_mean = meta["watermark"], meta["fill_mean"]
+    else:
+        marks = _fetch_marks()
+        if not len(marks["pct"]):
+            print("[WARN] Not enough data to train")
+            return False
+        X, y, features = _dataset_from_marks(marks)
+        watermark, fill_mean = _watermark(marks), float(marks["pct"].mean())
+    if len(X) < 20:
+        print("[WARN] Not enough data to train")
+        return False
+    metrics = _evaluate(X, y, estimator)
+    model = _build_pipeline(estimator)
     model.fit(X, y)
-    os.makedirs(os.path.join(os.path.dirname(__file__), "models"), exist_ok=True)
-    joblib.dump({"model": model, "features": features}, MODEL_PATH)
-    print(f"[OK] Saved model to {MODEL_PATH}")
+    from drift_monitor import profile_features
+    entry = register_model(model, features, metrics, n_rows=len(X), estimator=estimator, extra={
+        "refresh": "full",
+        # Baseline for drift_monitor: per-feature mean/variance and decile histogram
+        "feature_profile": profile_features(X.to_numpy(), features),
+        "watermark": watermark,
+        "fill_mean": round(fill_mean, 6),
+        "full_retrain_at": dt.datetime.now().isoformat(timespec="seconds"),
+    })
+    print(f"[OK] Registered {estimator} model {entry['version']} (MAE {metrics['mae']}) in {REGISTRY_DIR}")
+    return True
+
+def _full_retrain_due(entry):
+    last = entry.get("full_retrain_at")
+    if not last:
+        return True
+    age = dt.datetime.now() - dt.datetime.fromisoformat(last)
+    return age >= dt.timedelta(days=FULL_RETRAIN_DAYS)
+
+def refresh_model(force_full=False):
+    """Update the current model with marks added since it was trained.
+
+    Only the histories of students with new marks are re-featurized, and a
+    forest grows by warm-started trees fit on the new rows, so the cost
+    follows the amount of new data. Edits or deletions of older marks are
+    not seen by the mark_id watermark; the periodic full retrain (and any
+    estimator that cannot warm-start) picks those up.
+    """
+    manifest = _read_manifest()
+    entry = next((v for v in manifest["versions"] if v["version"] == manifest.get("current")), None)
+    estimator = (entry or {}).get("estimator", DEFAULT_ESTIMATOR)
+    if force_full or entry is None or "watermark" not in entry or _full_retrain_due(entry):
+        return train_and_save(estimator)
+
+    since = entry["watermark"]["mark_id"]
+    new = _fetch_marks(since_mark_id=since)
+    if not len(new["pct"]):
+        print(f"[OK] Model {entry['version']} is up to date (mark_id {since})")
+        return True
+    if len(new["pct"]) < MIN_REFRESH_ROWS:
+        print(f"[OK] {len(new['pct'])} new marks; waiting for {MIN_REFRESH_ROWS} before refreshing")
+        return True
+    if estimator not in WARM_START_ESTIMATORS:
+        print(f"[OK] {estimator} cannot warm-start; running a full retrain")
+        return train_and_save(estimator)
+
+    history = _fetch_marks(student_ids=np.unique(new["student_id"]).tolist())
+    X, y, features = _dataset_from_marks(history, fill_mean=entry.get("fill_mean"))
+    fresh = history["mark_id"] > since
+    X, y = X[fresh], y[fresh]
+    if X.empty:
+        print("[OK] New marks have no usable history yet; nothing to refresh")
+        return True
+
+    import joblib
+    from sklearn.metrics import mean_absolute_error
+    # Private copy: the cached bundle is memory-mapped and shared
+    model = joblib.load(os.path.join(REGISTRY_DIR, entry["file"]))["model"]
+    forest = model.steps[-1][1]
+    extra_trees = max(5, round(forest.n_estimators * len(X) / max(entry.get("n_rows", len(X)), 1)))
+    if forest.n_estimators + extra_trees > MAX_FOREST_TREES:
+        print(f"[OK] Forest would exceed {MAX_FOREST_TREES} trees; running a full retrain")
+        return train_and_save(estimator)
+
+    Xt = model.named_steps["prep"].transform(X)
+    metrics = dict(entry.get("metrics") or {})
+    # Error on the new rows before they are learned: an honest, cheap health check
+    metrics["refresh_mae_before"] = round(float(mean_absolute_error(y, forest.predict(Xt))), 4)
+    forest.set_params(warm_start=True, n_estimators=forest.n_estimators + extra_trees)
+    forest.fit(Xt, y)
+    forest.set_params(warm_start=False)
+
+    new_entry = register_model(model, features, metrics, n_rows=entry.get("n_rows", 0) + len(X),
+                               estimator=estimator, extra={
+        "refresh": "incremental",
+        "base_version": entry["version"],
+        "watermark": _watermark(new),
+        "fill_mean": entry.get("fill_mean"),
+        "feature_profile": entry.get("feature_profile"),
+        "full_retrain_at": entry.get("full_retrain_at"),
+    })
+    print(f"[OK] Refreshed {entry['version']} -> {new_entry['version']} with {len(X)} new rows "
+          f"(+{extra_trees} trees, {forest.n_estimators} total)")
     return True
 
-def load_model():
-    if not os.path.exists(MODEL_PATH):
+# ---- Model registry ----
+
+def _read_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"current": None, "versions": []}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_manifest(manifest):
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    # Atomic swap so readers in other processes never see a half-written manifest
+    os.replace(tmp_path, MANIFEST_PATH)
+
+@contextmanager
+def _registry_lock(timeout=LOCK_TIMEOUT_S):
+    """Exclusive lock on the registry across processes (see file_lock).
+
+    Concurrent trainers (a manual refresh and the drift monitor's retrain)
+    would otherwise read the same manifest, pick the same version and
+    overwrite each other's entry. A lock older than `timeout` is taken to
+    belong to a crashed trainer and is broken.
+    """
+    with file_lock(LOCK_PATH, timeout):
+        yield
+
+def list_models():
+    """Return manifest entries for every registered model version (oldest first)."""
+    return _read_manifest()["versions"]
+
+def register_model(model, features, metrics, n_rows, estimator=DEFAULT_ESTIMATOR, extra=None):
+    """Save a new model version next to the previous ones and make it current."""
+    import joblib
+    # Version allocation, the files and the manifest entry happen under one lock
+    with _registry_lock():
+        manifest = _read_manifest()
+        version = f"v{len(manifest['versions']) + 1:04d}"
+        filename = f"grade_predictor-{version}.joblib"
+        # Uncompressed dump so numpy arrays can be memory-mapped on load
+        joblib.dump({"model": model, "features": features}, os.path.join(REGISTRY_DIR, filename))
+        # Forest models also get a NumPy-only export for fast_predictor
+        compiled = f"grade_predictor-{version}.npz"
+        try:
+            export_compiled({"model": model, "features": features, "version": version},
+                            os.path.join(REGISTRY_DIR, compiled))
+        except ValueError:
+            compiled = None
+        entry = {
+            "version": version,
+            "file": filename,
+            "trained_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "estimator": estimator,
+            "n_rows": int(n_rows),
+            "features": list(features),
+            "metrics": metrics,
+            "compiled": compiled,
+        }
+        entry.update(extra or {})
+        manifest["versions"].append(entry)
+        manifest["current"] = version
+        _write_manifest(manifest)
+    clear_model_cache()
+    return entry
+
+def compile_forest(model_bundle):
+    """Flatten a scaler + one-hot + forest pipeline into (arrays, meta).
+
+    The arrays hold the scaler parameters, one-hot vocabularies and every
+    tree's node arrays padded to a common length (leaves point at
+    themselves), which is what fast_predictor.CompiledForest evaluates.
+    """
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    model = model_bundle["model"]
+    forest = model.steps[-1][1]
+    if not hasattr(forest, "estimators_"):
+        raise ValueError("Only forest pipelines can be compiled")
+    prep = model.named_steps["prep"]
+    arrays, num_cols, cat_cols = {}, [], []
+    for name, transformer, cols in prep.transformers_:
+        if name == "remainder":
+            continue
+        if isinstance(transformer, StandardScaler):
+            num_cols = list(cols)
+            arrays["num_mean"] = np.asarray(transformer.mean_, dtype=np.float64)
+            arrays["num_scale"] = np.asarray(transformer.scale_, dtype=np.float64)
+        elif isinstance(transformer, OneHotEncoder) and transformer.drop is None:
+            cat_cols = list(cols)
+            for i, cats in enumerate(transformer.categories_):
+                arrays[f"vocab_{i}"] = np.asarray(cats, dtype=np.float64)
+        else:
+            raise ValueError(f"Cannot compile transformer '{name}'")
+
+    trees = [est.tree_ for est in forest.estimators_]
+    n_trees, max_nodes = len(trees), max(t.node_count for t in trees)
+    left = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    right = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    feature = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    for i, t in enumerate(trees):
+        k = t.node_count
+        own = np.arange(k)
+        leaf = t.children_left == -1
+        left[i, :k] = np.where(leaf, own, t.children_left)
+        right[i, :k] = np.where(leaf, own, t.children_right)
+        feature[i, :k] = np.where(leaf, 0, t.feature)
+        threshold[i, :k] = t.threshold
+        value[i, :k] = t.value[:, 0, 0]
+    meta = {
+        "features": list(model_bundle.get("features") or (num_cols + cat_cols)),
+        "num_cols": num_cols,
+        "cat_cols": cat_cols,
+        "version": model_bundle.get("version"),
+    }
+    arrays.update(left=left, right=right, feature=feature, threshold=threshold, value=value,
+                  max_depth=np.array(max(t.max_depth for t in trees)))
+    return arrays, meta
+
+def export_compiled(model_bundle, path):
+    """Write compile_forest() output to a compressed .npz for fast_predictor."""
+    arrays, meta = compile_forest(model_bundle)
+    np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+    return path
+
+def set_current_model(version):
+    """Point the registry at an existing version (e.g. to roll back)."""
+    with _registry_lock():
+        manifest = _read_manifest()
+        if not any(v["version"] == version for v in manifest["versions"]):
+            raise ValueError(f"Unknown model version: {version}")
+        manifest["current"] = version
+        _write_manifest(manifest)
+    clear_model_cache()
+
+def clear_model_cache():
+    _MODEL_CACHE.clear()
+
+def _current_key(prefix):
+    """Cache key of the current version, evicting ones cached under an older manifest."""
+    try:
+        stamp = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        stamp = None
+    key = f"{prefix}current@{stamp}"
+    for old in [k for k in _MODEL_CACHE if k.startswith(f"{prefix}current@") and k != key]:
+        del _MODEL_CACHE[old]
+    return key
+
+def _load_bundle(path, entry):
+    import joblib
+    bundle = joblib.load(path, mmap_mode="r")
+    bundle["version"] = entry.get("version")
+    bundle["manifest"] = entry
+    return bundle
+
+def load_model(version=None):
+    """Load a model bundle (current version by default), cached per process.
+
+    The current version is re-resolved whenever the manifest changes on disk.
+    """
+    key = version or _current_key("")
+    if key in _MODEL_CACHE:
+        return _MODEL_CACHE[key]
+    manifest = _read_manifest()
+    if version is None and not manifest["versions"] and not os.path.exists(MODEL_PATH):
         train_and_save()
-    if not os.path.exists(MODEL_PATH):
+        manifest = _read_manifest()
+        key = _current_key("")
+    wanted = version or manifest.get("current")
+    entry = next((v for v in manifest["versions"] if v["version"] == wanted), None)
+    if entry is not None:
+        bundle = _load_bundle(os.path.join(REGISTRY_DIR, entry["file"]), entry)
+    elif version is None and os.path.exists(MODEL_PATH):
+        bundle = _load_bundle(MODEL_PATH, {"version": "legacy"})
+    else:
         return None
-    return joblib.load(MODEL_PATH)
-
-def _latest_stats(student_id, subject_id):
-    rows = db.execute_query(
-        """
-        SELECT m.student_id, m.subject_id, m.teacher_id, m.exam_date,
-               m.marks_obtained, m.total_marks
-        FROM marks m
-        WHERE m.student_id = %s AND m.subject_id = %s AND m.total_marks IS NOT NULL AND m.marks_obtained IS NOT NULL
-        ORDER BY m.exam_date
-        """, (student_id, subject_id)
-    ) or []
-    if not rows:
-        return None, None
-    df = pd.DataFrame(rows)
-    df["exam_date"] = pd.to_datetime(df["exam_date"], errors="coerce")
-    df["pct"] = (df["marks_obtained"].astype(float) / df["total_marks"].astype(float)) * 100.0
-    all_student = db.execute_query(
-        """
-        SELECT m.exam_date, m.marks_obtained, m.total_marks
-        FROM marks m WHERE m.student_id = %s AND m.total_marks IS NOT NULL AND m.marks_obtained IS NOT NULL
-        ORDER BY m.exam_date
-        """, (student_id,)
-    ) or []
-    if not all_student:
-        return df, None
-    s = pd.DataFrame(all_student)
-    s["pct"] = (s["marks_obtained"].astype(float)/s["total_marks"].astype(float))*100.0
-    student_overall = s["pct"].tail(5).mean() if len(s) >= 1 else s["pct"].mean()
-    return df, float(student_overall) if not math.isnan(student_overall) else None
+    _MODEL_CACHE[key] = bundle
+    return bundle
+
+def load_predictor(version=None):
+    """Prediction-only bundle: the compiled forest when the version has one.
+
+    Loading it needs only NumPy, so UI screens can predict without importing
+    pandas, joblib or scikit-learn. Falls back to load_model() for versions
+    without a compiled export (e.g. ridge or hgb). Cached like load_model.
+    """
+    key = f"predictor:{version}" if version else _current_key("predictor:")
+    if key in _MODEL_CACHE:
+        return _MODEL_CACHE[key]
+    manifest = _read_manifest()
+    wanted = version or manifest.get("current")
+    entry = next((v for v in manifest["versions"] if v["version"] == wanted), None)
+    path = os.path.join(REGISTRY_DIR, entry["compiled"]) if entry and entry.get("compiled") else None
+    if path and os.path.exists(path):
+        from fast_predictor import CompiledForest
+        bundle = {"version": entry["version"], "manifest": entry, "features": entry.get("features"),
+                  "compiled_forest": CompiledForest.load(path)}
+    else:
+        bundle = load_model(version)
+    _MODEL_CACHE[key] = bundle
+    return bundle
+
+def _compiled_forest(model_bundle):
+    """CompiledForest for a forest bundle, built once and kept on the bundle.
+
+    Registry versions load their exported .npz; other forest bundles are
+    compiled in memory. Non-forest models get None.
+    """
+    if "compiled_forest" not in model_bundle:
+        compiled = None
+        name = (model_bundle.get("manifest") or {}).get("compiled")
+        try:
+            from fast_predictor import CompiledForest
+            if name and os.path.exists(os.path.join(REGISTRY_DIR, name)):
+                compiled = CompiledForest.load(os.path.join(REGISTRY_DIR, name))
+            else:
+                compiled = CompiledForest(*compile_forest(model_bundle))
+        except ValueError:
+            compiled = None
+        except Exception as e:
+            print(f"[WARN] Compiled model unavailable, using scikit-learn: {e}")
+        model_bundle["compiled_forest"] = compiled
+    return model_bundle["compiled_forest"]
+
+def predict_matrix(model_bundle, X):
+    """Predict raw feature rows (FEATURES order), via the compiled forest when available."""
+    compiled = _compiled_forest(model_bundle)
+    if compiled is not None:
+        return compiled.predict(X)
+    import pandas as pd
+    return model_bundle["model"].predict(pd.DataFrame(X, columns=FEATURES))
+
+def _predict_from_marks(model_bundle, marks, student_ids, subject_ids, as_of=None):
+    """Clipped predictions for many keys in one pass; None where a subject has no history."""
+    fill_mean = (model_bundle.get("manifest") or {}).get("fill_mean")
+    X, attempts = features_for_keys(marks, student_ids, subject_ids, as_of=as_of, fill_mean=fill_mean)
+    preds = [None] * len(attempts)
+    rows = np.flatnonzero(attempts > 0)
+    if len(rows):
+        values = np.clip(predict_matrix(model_bundle, X[rows]), 0.0, 100.0)
+        for i, v in zip(rows, values):
+            preds[i] = float(v)
+    return preds
+
+def predict_band(model_bundle, X, quantiles=(0.1, 0.9)):
+    """Clipped (mean, low, high) arrays for raw feature rows from one per-tree evaluation."""
+    compiled = _compiled_forest(model_bundle)
+    if compiled is not None:
+        per_tree = compiled.predict_trees(X)
+        mean = per_tree.mean(axis=1)
+        low, high = np.quantile(per_tree, quantiles, axis=1)
+    else:
+        mean = predict_matrix(model_bundle, X)
+        low = high = mean
+    return tuple(np.clip(a, 0.0, 100.0) for a in (mean, low, high))
+
+def predict_with_interval(model_bundle, keys, quantiles=(0.1, 0.9), as_of=None, db=None):
+    """Mean prediction plus a quantile band for many (student_id, subject_id) keys.
+
+    All tree outputs come from one stacked (rows x trees) evaluation of the
+    compiled forest, so a whole class costs one marks query and one call.
+    The band is the spread of the trees' predictions, not a calibrated
+    predictive interval. Returns {key: {"mean", "low", "high"}}, with None
+    for keys whose subject has no history; models that are not forests
+    report low == high == mean. `db` overrides the shared Database (e.g. a
+    pooled one in api_server).
+    """
+    keys = [(int(s), int(j)) for s, j in keys]
+    if not model_bundle or not keys:
+        return {}
+    student_ids = np.array([k[0] for k in keys])
+    subject_ids = np.array([k[1] for k in keys])
+    marks = _fetch_marks(student_ids=np.unique(student_ids).tolist(), db=db)
+    fill_mean = (model_bundle.get("manifest") or {}).get("fill_mean")
+    X, attempts = features_for_keys(marks, student_ids, subject_ids, as_of=as_of, fill_mean=fill_mean)
+    result = {k: None for k in keys}
+    rows = np.flatnonzero(attempts > 0)
+    if not len(rows):
+        return result
+    mean, low, high = predict_band(model_bundle, X[rows], quantiles)
+    for i, m, lo, hi in zip(rows, mean, low, high):
+        result[keys[i]] = {"mean": float(m), "low": float(lo), "high": float(hi)}
+    return result
+
+def student_subject_keys(student_ids):
+    """(student_id, subject_id) pairs for every subject each student has marks in."""
+    marks = _fetch_marks(student_ids=[int(s) for s in student_ids])
+    pairs = np.unique(np.column_stack([marks["student_id"], marks["subject_id"]]), axis=0)
+    return [(int(s), int(j)) for s, j in pairs]
 
 def predict_next_percentage(model_bundle, student_id, subject_id):
     if not model_bundle:
         return None
-    model = model_bundle["model"]
-    df, student_overall = _latest_stats(student_id, subject_id)
-    if df is None or df.empty:
-        return None
-    df = df.sort_values("exam_date")
-    subj_avg = df["pct"].tail(3).mean() if len(df) >= 1 else df["pct"].mean()
-    attempts = len(df)
-    last_date = df["exam_date"].iloc[-1]
-    days_since = max((pd.Timestamp.today() - last_date).days, 1) if pd.notnull(last_date) else 60
-    teacher_id = int(df["teacher_id"].iloc[-1]) if "teacher_id" in df.columns else 0
-    student_overall = student_overall if student_overall is not None else subj_avg
-
-    X_row = pd.DataFrame([{
-        "student_overall_avg": float(student_overall),
-        "subj_avg": float(subj_avg),
-        "attempts_subj": int(attempts),
-        "days_since": float(days_since),
-        "subject_id": int(subject_id),
-        "teacher_id": int(teacher_id),
-    }])
-    pred = float(model.predict(X_row)[0])
-    return max(0.0, min(100.0, pred))
+    marks = _fetch_marks(student_ids=[student_id])
+    return _predict_from_marks(model_bundle, marks, [student_id], [subject_id])[0]
+
+def get_prediction_cache():
+    """Shared PredictionCache, invalidated by Database mark writes."""
+    global _PREDICTION_CACHE
+    if _PREDICTION_CACHE is None:
+        from prediction_cache import PredictionCache
+        from database import db
+        disk_path = (os.path.join(PREDICTION_CACHE_DIR, "predictions.sqlite")
+                     if PREDICTION_CACHE_DIR else None)
+        _PREDICTION_CACHE = PredictionCache(disk_path=disk_path)
+        db.add_mark_listener(_PREDICTION_CACHE.invalidate_student)
+    return _PREDICTION_CACHE
+
+def predict_intervals_cached(model_bundle, keys, quantiles=(0.1, 0.9)):
+    """predict_with_interval() through the shared PredictionCache.
+
+    One grouped fingerprint query covers every student; the date is part of
+    the fingerprint because days_since moves every day. Misses are computed
+    together in one predict_with_interval() call. Same return shape:
+    {(student_id, subject_id): {"mean", "low", "high"} or None}.
+    """
+    keys = [(int(s), int(j)) for s, j in keys]
+    if not model_bundle or not keys:
+        return {}
+    from database import db
+    cache = get_prediction_cache()
+    fingerprints = db.get_student_marks_fingerprints(sorted({s for s, _ in keys})) or {}
+    today = dt.date.today().isoformat()
+    model_version = model_bundle.get("version") or "unversioned"
+    version = f"{model_version}|{quantiles[0]:g}-{quantiles[1]:g}"
+    # Rows from past days or other models can never be hit again
+    cache.prune(f"{model_version}|", f"@{today}")
+    result, missing = {}, []
+    for key in keys:
+        fingerprint = fingerprints.get(key[0])
+        band = cache.get(cache.make_key(*key, version, f"{fingerprint}@{today}")) if fingerprint else None
+        if band is None:
+            missing.append(key)
+        else:
+            result[key] = {"mean": band[0], "low": band[1], "high": band[2]}
+    if not missing:
+        return result
+    # All cache misses share one marks query and one stacked forest evaluation
+    try:
+        fresh = predict_with_interval(model_bundle, missing, quantiles)
+    except Exception as e:
+        print(f"[WARN] Prediction failed for {len(missing)} student-subjects: {e}")
+        fresh = {}
+    computed = []
+    for key in missing:
+        r = result[key] = fresh.get(key)
+        fingerprint = fingerprints.get(key[0])
+        if r is not None and fingerprint:
+            computed.append((cache.make_key(*key, version, f"{fingerprint}@{today}"), (r["mean"], r["low"], r["high"])))
+    cache.put_many(computed)
+    return result
+
+def predict_student_subjects(model_bundle, student_id, subject_ids):
+    """Cached predictions for one student: {subject_id: pct or None}."""
+    by_key = predict_intervals_cached(model_bundle, [(student_id, j) for j in subject_ids])
+    return {j: (r["mean"] if r else None) for (_, j), r in by_key.items()}
 
 def percentage_to_grade(pct: float) -> str:
     if pct >= 90: return "A+"
@@ -153,4 +615,16 @@ def percentage_to_grade(pct: float) -> str:
     if pct >= 50: return "D"
     return "F"
 
-
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Train and register the grade predictor")
+    parser.add_argument("--estimator", default=DEFAULT_ESTIMATOR, choices=list(ESTIMATORS))
+    parser.add_argument("--refresh", action="store_true",
+                        help="incremental update with new marks (full retrain when due); for cron")
+    parser.add_argument("--full", action="store_true", help="with --refresh, force a full retrain")
+    parser.add_argument("--dataset", help="train from a dataset_builder.py .npy file")
+    args = parser.parse_args()
+    if args.refresh:
+        refresh_model(force_full=args.full)
+    else:
+        train_and_save(args.estimator, dataset_path=args.dataset)
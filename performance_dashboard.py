@@ -3,15 +3,19 @@
 Student Performance Dashboard - Modern UI matching the design image
 """
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.patches as patches
-from matplotlib.patches import Wedge
-import numpy as np
 from database import db
+from startup_profiler import instrument
+# Charts come from charts.py, which imports matplotlib on first use: importing
+# this module (teacher.py does at startup) should not pay for it
 
+POLL_MS = 50          # how often the Tk loop checks for finished queries
+MAX_GAUGES = 6        # the gauge grid is 2 x 3
+
+@instrument
 class PerformanceDashboard:
     def __init__(self, user_type="teacher", user_profile=None):
         self.user_type = user_type
@@ -21,6 +25,17 @@ class PerformanceDashboard:
         self.root.geometry("1400x900")
         self.root.state('zoomed')  # Maximize window
         
+        # Aggregates are fetched on a worker thread (with its own connection) and
+        # cached per (year, grade level), so revisiting a filter is instant
+        self._summaries = {}
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = set()
+        self._polling = False
+        self._options_loaded = False
+        self._worker = threading.Thread(target=self._query_worker, name="performance-queries", daemon=True)
+        self._worker.start()
+        
         # Configure style
         self.setup_styles()
         
@@ -67,8 +82,8 @@ class PerformanceDashboard:
         actions_frame = ttk.Frame(header_frame)
         actions_frame.pack(side=tk.RIGHT)
         
-        # Add refresh, link, expand, and menu buttons (as placeholders)
-        ttk.Button(actions_frame, text="🔄", width=3).pack(side=tk.LEFT, padx=2)
+        # Refresh reloads the data; link, expand and menu are placeholders
+        ttk.Button(actions_frame, text="🔄", width=3, command=self.refresh).pack(side=tk.LEFT, padx=2)
         ttk.Button(actions_frame, text="🔗", width=3).pack(side=tk.LEFT, padx=2)
         ttk.Button(actions_frame, text="⛶", width=3).pack(side=tk.LEFT, padx=2)
         ttk.Button(actions_frame, text="⋮", width=3).pack(side=tk.LEFT, padx=2)
@@ -96,10 +111,9 @@ class PerformanceDashboard:
         
         ttk.Label(year_frame, text="Select Year", style='Filter.TLabel').pack(anchor=tk.W)
         self.year_var = tk.StringVar(value="All")
-        year_combo = ttk.Combobox(year_frame, textvariable=self.year_var, 
-                                 values=["All", "2024", "2023", "2022"], 
-                                 state="readonly", width=15)
-        year_combo.pack(anchor=tk.W, pady=(5, 0))
+        self.year_combo = ttk.Combobox(year_frame, textvariable=self.year_var, 
+                                       values=["All"], state="readonly", width=15)
+        self.year_combo.pack(anchor=tk.W, pady=(5, 0))
         
         # Grade filter
         grade_frame = ttk.Frame(filters_frame)
@@ -107,14 +121,16 @@ class PerformanceDashboard:
         
         ttk.Label(grade_frame, text="Select Grade", style='Filter.TLabel').pack(anchor=tk.W)
         self.grade_var = tk.StringVar(value="All")
-        grade_combo = ttk.Combobox(grade_frame, textvariable=self.grade_var,
-                                  values=["All", "Grade 1", "Grade 2", "Grade 3", "Grade 4", "Grade 5"],
-                                  state="readonly", width=15)
-        grade_combo.pack(anchor=tk.W, pady=(5, 0))
+        self.grade_combo = ttk.Combobox(grade_frame, textvariable=self.grade_var,
+                                        values=["All"], state="readonly", width=15)
+        self.grade_combo.pack(anchor=tk.W, pady=(5, 0))
         
         # Bind filter changes
-        year_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
-        grade_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
+        self.year_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
+        self.grade_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
+        
+        self.status_label = ttk.Label(filters_frame, text="", style='Filter.TLabel')
+        self.status_label.pack(side=tk.LEFT, padx=(20, 0), anchor=tk.S)
     
     def create_metrics_card(self):
         """Create key metrics card showing total students"""
@@ -138,7 +154,7 @@ class PerformanceDashboard:
         count_frame.pack(side=tk.LEFT)
         
         ttk.Label(count_frame, text="Students", style='Filter.TLabel').pack(anchor=tk.W)
-        self.student_count_label = ttk.Label(count_frame, text="300", 
+        self.student_count_label = ttk.Label(count_frame, text="—", 
                                            style='Metric.TLabel', font=("Arial", 20, "bold"))
         self.student_count_label.pack(anchor=tk.W)
     
@@ -171,201 +187,179 @@ class PerformanceDashboard:
         # Average Subject Score (Gauge Charts)
         self.create_gauge_charts(right_frame)
     
+    def _chart_frame(self, parent, text, **pack):
+        chart_frame = ttk.LabelFrame(parent, text=text, padding="10")
+        chart_frame.pack(fill=tk.BOTH, expand=True, **pack)
+        return chart_frame
+
     def create_donut_chart(self, parent):
         """Create donut chart for students by grade and gender"""
-        chart_frame = ttk.LabelFrame(parent, text="Students by Grade and Gender", padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(8, 6))
-        fig.patch.set_facecolor('white')
-        
-        # Sample data matching the image
-        grades = ['Grade 1', 'Grade 2', 'Grade 3', 'Grade 4', 'Grade 5']
-        sizes = [22.67, 20.33, 21.33, 14.67, 21.0]
-        colors = ['#FFD700', '#FF8C00', '#FF4500', '#FF6347', '#DC143C']
-        
-        # Create donut chart
-        wedges, texts, autotexts = ax.pie(sizes, labels=grades, colors=colors, autopct='%1.1f%%',
-                                         startangle=90, pctdistance=0.85)
-        
-        # Create donut hole
-        centre_circle = plt.Circle((0,0), 0.70, fc='white')
-        ax.add_artist(centre_circle)
-        
-        # Style the chart
-        ax.set_title('Drill down to show the number of students by gender.', 
-                    fontsize=10, pad=20, style='italic')
-        
-        # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        from charts import DonutChart
+        chart_frame = self._chart_frame(parent, "Students by Grade and Gender", pady=(0, 10))
+        self.donut_chart = DonutChart(chart_frame, figsize=(8, 6),
+                                      title='Drill down to show the number of students by gender.',
+                                      colors=['#FFD700', '#FF8C00', '#FF4500', '#FF6347', '#DC143C'],
+                                      hole=0.70, pct_format='{:.1f}%',
+                                      title_kw={'fontsize': 10, 'pad': 20, 'style': 'italic'})
+        self.donut_chart.widget.pack(fill=tk.BOTH, expand=True)
+        self.donut_chart.show_message("Loading…")
     
     def create_exam_results_chart(self, parent):
         """Create grouped bar chart for examination results"""
-        chart_frame = ttk.LabelFrame(parent, text="Examination Results by Branch", padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(8, 6))
-        fig.patch.set_facecolor('white')
-        
-        # Sample data matching the image
-        subjects = ['Phys. Ed', 'Arts', 'English', 'Science', 'Maths']
-        pass_scores = [255, 205, 200, 195, 180]
-        fail_scores = [20, 70, 75, 70, 90]
-        not_attended = [15, 15, 15, 15, 15]
-        
-        x = np.arange(len(subjects))
-        width = 0.25
-        
-        # Create bars
-        bars1 = ax.bar(x - width, pass_scores, width, label='Pass', color='#FFD700')
-        bars2 = ax.bar(x, fail_scores, width, label='Fail', color='#DC143C')
-        bars3 = ax.bar(x + width, not_attended, width, label='Not attended', color='#8B4513')
-        
-        # Style the chart
-        ax.set_xlabel('Subjects')
-        ax.set_ylabel('Count')
-        ax.set_title('Examination Results by Branch')
-        ax.set_xticks(x)
-        ax.set_xticklabels(subjects)
-        ax.legend()
-        ax.set_ylim(0, 280)
-        
-        plt.tight_layout()
-        
-        # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        from charts import BarChart
+        chart_frame = self._chart_frame(parent, "Examination Results by Branch")
+        self.exam_results_chart = BarChart(chart_frame, figsize=(8, 6), title='Examination Results by Branch',
+                                           xlabel='Subjects', ylabel='Count', limits=None,
+                                           series=['Pass', 'Fail', 'Not attended'],
+                                           colors=['#FFD700', '#DC143C', '#8B4513'], rotation=30)
+        self.exam_results_chart.widget.pack(fill=tk.BOTH, expand=True)
+        self.exam_results_chart.show_message("Loading…")
     
     def create_participation_chart(self, parent):
         """Create horizontal bar chart for participation rates"""
-        chart_frame = ttk.LabelFrame(parent, text="Student Participation Rate by Branch", padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(6, 8))
-        fig.patch.set_facecolor('white')
-        
-        # Sample data matching the image
-        subjects = ['English', 'Arts', 'Maths', 'Phy. Ed', 'Science']
-        participation = [89, 87.67, 87.33, 85.33, 82.33]
-        colors = ['#FFD700'] * len(subjects)
-        
-        # Create horizontal bar chart
-        bars = ax.barh(subjects, participation, color=colors)
-        
-        # Style the chart
-        ax.set_xlabel('Participation Rate (%)')
-        ax.set_title('Student Participation Rate by Branch')
-        ax.set_xlim(0, 100)
-        
-        # Add value labels on bars
-        for i, (bar, value) in enumerate(zip(bars, participation)):
-            width = bar.get_width()
-            ax.text(width + 1, bar.get_y() + bar.get_height()/2, 
-                   f'{value}%', ha='left', va='center')
-        
-        plt.tight_layout()
-        
-        # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        from charts import BarChart
+        chart_frame = self._chart_frame(parent, "Student Participation Rate by Branch")
+        self.participation_chart = BarChart(chart_frame, figsize=(6, 8), title='Student Participation Rate by Branch',
+                                            xlabel='Participation Rate (%)', horizontal=True,
+                                            colors=['#FFD700'], value_format='{:g}%')
+        self.participation_chart.widget.pack(fill=tk.BOTH, expand=True)
+        self.participation_chart.show_message("Loading…")
     
     def create_gauge_charts(self, parent):
         """Create gauge charts for average subject scores"""
-        chart_frame = ttk.LabelFrame(parent, text="Avg. Subject Score", padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Create matplotlib figure with subplots
-        fig, axes = plt.subplots(2, 3, figsize=(8, 6))
-        fig.patch.set_facecolor('white')
-        
-        # Sample data matching the image
-        subjects = ['Arts', 'English', 'Maths', 'Phy. Ed', 'Science']
-        scores = [84.37, 84.05, 81.86, 84.76, 79.36]
-        colors = ['#FFD700', '#DC143C', '#FF4500', '#8B4513', '#FF8C00']
-        
-        # Flatten axes for easier iteration
-        axes_flat = axes.flatten()
-        
-        for i, (subject, score, color) in enumerate(zip(subjects, scores, colors)):
-            ax = axes_flat[i]
-            
-            # Create gauge chart
-            self.create_gauge(ax, score, subject, color)
-        
-        # Hide the last subplot
-        axes_flat[5].set_visible(False)
-        
-        plt.tight_layout()
-        
-        # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        from charts import GaugeGrid
+        chart_frame = self._chart_frame(parent, "Avg. Subject Score")
+        self.gauge_chart = GaugeGrid(chart_frame, figsize=(8, 6), rows=2, cols=3,
+                                     colors=['#FFD700', '#DC143C', '#FF4500', '#8B4513', '#FF8C00'],
+                                     value_format='{:.2f}')
+        self.gauge_chart.widget.pack(fill=tk.BOTH, expand=True)
+        self.gauge_chart.show_message("Loading…")
     
-    def create_gauge(self, ax, value, title, color):
-        """Create a single gauge chart"""
-        # Calculate angles
-        theta = np.linspace(0, np.pi, 100)
-        radius = 1
-        
-        # Background circle
-        ax.plot(radius * np.cos(theta), radius * np.sin(theta), 'k-', linewidth=2)
-        
-        # Filled portion
-        filled_theta = np.linspace(0, np.pi * (value / 100), 100)
-        ax.fill_between(radius * np.cos(filled_theta), 0, radius * np.sin(filled_theta), 
-                       color=color, alpha=0.7)
-        
-        # Add score text
-        ax.text(0, 0, f'{value:.2f}', ha='center', va='center', fontsize=10, fontweight='bold')
-        
-        # Add title
-        ax.text(0, -1.3, title, ha='center', va='center', fontsize=8)
-        
-        # Set equal aspect ratio and remove axes
-        ax.set_aspect('equal')
-        ax.set_xlim(-1.5, 1.5)
-        ax.set_ylim(-1.5, 1.5)
-        ax.axis('off')
+    def current_filter(self):
+        """(year, grade_level) from the comboboxes; None means All"""
+        year = self.year_var.get()
+        grade = self.grade_var.get()
+        return (int(year) if year.isdigit() else None,
+                int(grade.split()[-1]) if grade.startswith("Grade ") else None)
     
     def load_dashboard_data(self):
-        """Load dashboard data from database"""
-        try:
-            # Get system statistics
-            stats = db.get_system_stats()
-            
-            # Update student count
-            if stats and 'active_students' in stats:
+        """Show the aggregates for the current filter, fetching them in the background if not cached"""
+        key = self.current_filter()
+        if key in self._summaries:
+            self.apply_summary(self._summaries[key])
+            return
+        self.status_label.config(text="Loading…")
+        self._request(('summary', key))
+        if not getattr(self, '_options_loaded', False):
+            self._options_loaded = True
+            self._request(('options', None))
+    
+    def _request(self, job):
+        if job not in self._pending:
+            self._pending.add(job)
+            self._requests.put(job)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll_results)
+    
+    def _query_worker(self):
+        """Runs the aggregate queries off the Tk thread, on a connection of its own"""
+        conn = None
+        while True:
+            job = self._requests.get()
+            if job is None:
+                break
+            kind, key = job
+            try:
+                if conn is None:
+                    conn = db.open_connection()
+                if kind == 'options':
+                    result = db.get_performance_filter_options(conn=conn)
+                else:
+                    result = db.get_performance_summary(*key, conn=conn)
+                self._results.put((job, result, None))
+            except Exception as e:
+                # Reconnect on the next job
                 try:
-                    self.student_count_label.config(text=str(int(stats['active_students'])))
+                    conn.close()
                 except Exception:
-                    self.student_count_label.config(text=str(stats['active_students']))
-            
-            # In a real implementation, you would:
-            # 1. Filter data based on year and grade selections
-            # 2. Update all charts with real data
-            # 3. Handle data refresh when filters change
-            
-        except Exception as e:
-            print(f"Error loading dashboard data: {e}")
+                    pass
+                conn = None
+                self._results.put((job, None, e))
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    def _poll_results(self):
+        """Tk-side: apply finished queries; keep polling while any are outstanding"""
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard(job)
+            kind, key = job
+            if error is not None:
+                print(f"Error loading dashboard data: {error}")
+                if key == self.current_filter():
+                    self.status_label.config(text="Could not load data")
+                continue
+            if kind == 'options':
+                self.apply_filter_options(*result)
+            else:
+                self._summaries[key] = result
+                # A slower, older filter may finish after the user moved on
+                if key == self.current_filter():
+                    self.apply_summary(result)
+        if self._pending:
+            self.root.after(POLL_MS, self._poll_results)
+        else:
+            self._polling = False
+    
+    def apply_filter_options(self, years, grade_levels):
+        self.year_combo.config(values=["All"] + [str(y) for y in years])
+        self.grade_combo.config(values=["All"] + [f"Grade {g}" for g in grade_levels])
+    
+    def apply_summary(self, summary):
+        """Update the metric and the four charts in place"""
+        self.status_label.config(text="")
+        self.student_count_label.config(text=str(summary['students']))
+        
+        grade_chosen = self.current_filter()[1] is not None
+        groups = summary['by_group']
+        self.donut_chart.update([(g or 'Other') if grade_chosen else (f"Grade {g}" if g is not None else "Unassigned")
+                                 for g, _ in groups],
+                                [count for _, count in groups])
+        
+        subjects = summary['subjects']
+        names = [s['subject_name'] for s in subjects]
+        self.exam_results_chart.update(names, [[s['passed'] for s in subjects],
+                                               [s['failed'] for s in subjects],
+                                               [s['not_attended'] for s in subjects]])
+        total = summary['students']
+        self.participation_chart.update(names, [round(100.0 * s['participants'] / total, 2) if total else 0
+                                                for s in subjects])
+        scored = [s for s in subjects if s['avg_pct'] is not None]
+        # Gauges for the most-sat subjects
+        scored = sorted(scored, key=lambda s: -s['participants'])[:MAX_GAUGES]
+        self.gauge_chart.update([s['subject_name'] for s in scored], [s['avg_pct'] for s in scored])
     
     def on_filter_change(self, event=None):
         """Handle filter changes"""
-        # In a real implementation, this would refresh the dashboard data
-        # based on the selected year and grade filters
-        print(f"Filters changed - Year: {self.year_var.get()}, Grade: {self.grade_var.get()}")
+        self.load_dashboard_data()
+    
+    def refresh(self):
+        """Drop cached aggregates and reload the current filter"""
+        self._summaries.clear()
+        self._options_loaded = False
         self.load_dashboard_data()
     
     def logout(self):
         """Logout and return to login"""
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
+            self._requests.put(None)
             self.root.destroy()
             import login
             login.LoginWindow().run()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Prediction cache for the grade predictor.
+
+Entries are keyed on (student_id, subject_id, model version, marks
+fingerprint) so a cached value is only reused while the model and the
+student's marks are unchanged. Values are (mean, low, high) prediction
+bands. An in-process LRU is always used; an on-disk SQLite cache can be
+added so predictions survive restarts.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, disk_path=None):
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._by_student = {}
+        self._lock = threading.Lock()
+        self._disk = None
+        self._pruned = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            columns = [r[1] for r in self._disk.execute("PRAGMA table_info(predictions)")]
+            if columns and "low" not in columns:
+                # Older cache files held the mean only; it is only a cache, so start over
+                self._disk.execute("DROP TABLE predictions")
+            self._disk.execute(
+                """
+                CREATE TABLE IF NOT EXISTS predictions (
+                    student_id INTEGER NOT NULL,
+                    subject_id INTEGER NOT NULL,
+                    model_version TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    mean REAL,
+                    low REAL,
+                    high REAL,
+                    PRIMARY KEY (student_id, subject_id, model_version, fingerprint)
+                )
+                """
+            )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            print(f"[WARN] Prediction disk cache disabled: {e}")
+            self._disk = None
+
+    @staticmethod
+    def make_key(student_id, subject_id, model_version, fingerprint):
+        return (int(student_id), int(subject_id), str(model_version), str(fingerprint))
+
+    def get(self, key):
+        """Return the cached (mean, low, high), or None on a miss."""
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+            if self._disk is None:
+                return None
+            row = self._disk.execute(
+                "SELECT mean, low, high FROM predictions WHERE student_id = ? AND subject_id = ? "
+                "AND model_version = ? AND fingerprint = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._remember(key, tuple(row))
+            return tuple(row)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """Cache many (key, value) pairs; the disk write is a single transaction."""
+        items = [(key, tuple(value)) for key, value in items]
+        if not items:
+            return
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._disk is not None:
+                try:
+                    with self._disk:
+                        self._disk.executemany(
+                            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [key + value for key, value in items]
+                        )
+                except sqlite3.Error as e:
+                    print(f"[WARN] Prediction disk cache write failed: {e}")
+
+    def prune(self, version_prefix, fingerprint_suffix):
+        """Delete disk rows of other model versions or other fingerprint suffixes.
+
+        Otherwise rows are only removed by a mark write, so past days and
+        retired models would pile up. Runs once per distinct argument pair.
+        """
+        with self._lock:
+            if self._disk is None or self._pruned == (version_prefix, fingerprint_suffix):
+                return
+            self._pruned = (version_prefix, fingerprint_suffix)
+            try:
+                with self._disk:
+                    self._disk.execute(
+                        "DELETE FROM predictions WHERE substr(model_version, 1, ?) != ? "
+                        "OR substr(fingerprint, ?) != ?",
+                        (len(version_prefix), version_prefix, -len(fingerprint_suffix), fingerprint_suffix)
+                    )
+            except sqlite3.Error as e:
+                print(f"[WARN] Prediction disk cache pruning failed: {e}")
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        self._by_student.setdefault(key[0], set()).add(key)
+        while len(self._lru) > self.max_entries:
+            old_key, _ = self._lru.popitem(last=False)
+            keys = self._by_student.get(old_key[0])
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self._by_student[old_key[0]]
+
+    def invalidate_student(self, student_id):
+        """Drop every cached prediction for a student (called on mark writes)."""
+        if student_id is None:
+            return
+        student_id = int(student_id)
+        with self._lock:
+            for key in self._by_student.pop(student_id, ()):
+                self._lru.pop(key, None)
+            if self._disk is not None:
+                try:
+                    self._disk.execute("DELETE FROM predictions WHERE student_id = ?", (student_id,))
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    print(f"[WARN] Prediction disk cache invalidation failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._by_student.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM predictions")
+                self._disk.commit()
+
+    def __len__(self):
+        return len(self._lru)
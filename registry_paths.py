@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Locations of the model registry, shared by ml_model (training, scikit-learn)
+and fast_predictor (NumPy-only inference). Only imports os.
+"""
+
+import os
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+# Legacy single-file model; still loaded when the registry is empty
+MODEL_PATH = os.path.join(MODELS_DIR, "grade_predictor.joblib")
+# Versioned registry: one joblib (and compiled .npz) per version plus a JSON manifest
+REGISTRY_DIR = os.path.join(MODELS_DIR, "registry")
+MANIFEST_PATH = os.path.join(REGISTRY_DIR, "manifest.json")
+# Held while a version number is allocated and the manifest rewritten
+LOCK_PATH = os.path.join(REGISTRY_DIR, "manifest.lock")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Headless batch report-card generator.
+
+Renders one report card per student (the whole school or a cohort) with
+matplotlib's Agg canvas, no Tk: name and details, average / CGPA / best
+score, the grade distribution donut, average % per subject and the latest
+marks. Students and their marks are prefetched in bulk (one marks query
+per batch of students) on the main process; a process pool renders the
+batches, each worker writing PDF or PNG files straight to disk.
+
+Usage:
+    python report_cards.py                          # every active student, PDF
+    python report_cards.py --grade-level 10 --format png --out cards/
+    python report_cards.py --students 12 15 --year 2024 --workers 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PAGE_SIZE = (8.27, 11.69)    # A4 portrait, inches
+RECENT_MARKS = 12
+MAX_SUBJECTS = 12
+
+
+def _cohort(db, status="Active", grade_level=None, student_ids=None):
+    """Students to report on, ordered by id"""
+    where, params = [], []
+    if status:
+        where.append("status = %s")
+        params.append(status)
+    if grade_level is not None:
+        where.append("grade_level = %s")
+        params.append(int(grade_level))
+    if student_ids:
+        where.append(f"student_id IN ({', '.join(['%s'] * len(student_ids))})")
+        params.extend(int(s) for s in student_ids)
+    query = "SELECT student_id, fullname, email, gender, grade_level, status FROM students"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    return db.execute_query(query + " ORDER BY student_id", tuple(params) or None) or []
+
+
+def _file_name(student, fmt):
+    name = "".join(c if c.isalnum() else "_" for c in str(student.get('fullname') or "")).strip("_")
+    return f"report_{student['student_id']}_{name or 'student'}.{fmt}"
+
+
+def render_card(student, rows, path, year=None):
+    """Draw one student's report card and save it to path (format from the extension)"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.patches import Rectangle
+    from charts import GRADE_COLORS
+    from student_marks import GRADE_ORDER, StudentMarksModel, calculate_gpa
+
+    marks = StudentMarksModel(rows).filter(year)
+    # CGPA is cumulative: every mark counts, whatever the year filter
+    cgpa = calculate_gpa(rows)
+    figure = Figure(figsize=PAGE_SIZE)
+    FigureCanvasAgg(figure)
+    figure.patch.set_facecolor('white')
+    grid = figure.add_gridspec(4, 2, height_ratios=[0.9, 2.4, 2.6, 3.2], hspace=0.45, wspace=0.3,
+                               left=0.08, right=0.95, top=0.95, bottom=0.04)
+
+    # Header: details and summary figures
+    header = figure.add_subplot(grid[0, :])
+    header.axis('off')
+    header.text(0, 0.95, str(student.get('fullname') or ""), fontsize=18, fontweight='bold', va='top')
+    details = [f"Student ID: {student['student_id']}"]
+    if student.get('grade_level'):
+        details.append(f"Grade {student['grade_level']}")
+    if student.get('email'):
+        details.append(str(student['email']))
+    details.append(f"Exam year: {year}" if year not in (None, "", "All") else "All years")
+    header.text(0, 0.55, "   |   ".join(details), fontsize=10, color='#555555', va='top')
+    summary = [("Average", f"{marks.average():.1f}%", '#2E86AB'),
+               ("CGPA", f"{cgpa:.2f}", '#27ae60'),
+               ("Best Score", f"{marks.best():.1f}%", '#f39c12'),
+               ("Total Exams", str(len(marks)), '#e74c3c')]
+    for i, (label, value, color) in enumerate(summary):
+        header.text(0.125 + i * 0.25, 0.12, value, fontsize=16, fontweight='bold', color=color, ha='center')
+        header.text(0.125 + i * 0.25, -0.12, label, fontsize=9, color='#555555', ha='center')
+
+    # Grade distribution donut
+    pie = figure.add_subplot(grid[1, 0])
+    pie.set_title("Grade Distribution", fontsize=11, fontweight='bold')
+    counts = marks.grade_counts()
+    if sum(counts):
+        shown = [(g, c, GRADE_COLORS[i]) for i, (g, c) in enumerate(zip(GRADE_ORDER, counts)) if c]
+        pie.pie([c for _, c, _ in shown], labels=[f"{g} ({c})" for g, c, _ in shown],
+                colors=[color for _, _, color in shown], startangle=90, autopct='%.0f%%',
+                pctdistance=0.78, wedgeprops={'width': 0.45, 'edgecolor': 'white'},
+                textprops={'fontsize': 8})
+        pie.set_aspect('equal')
+    else:
+        pie.axis('off')
+        pie.text(0.5, 0.5, "No data available", ha='center', va='center', transform=pie.transAxes)
+
+    # Grade points legend beside the donut
+    scale = figure.add_subplot(grid[1, 1])
+    scale.axis('off')
+    scale.set_title("Grading Scale", fontsize=11, fontweight='bold')
+    for i, (grade, band) in enumerate(zip(GRADE_ORDER, ["90-100%", "80-89%", "70-79%", "60-69%",
+                                                         "50-59%", "below 50%"])):
+        y = 0.9 - i * 0.16
+        scale.add_patch(Rectangle((0.02, y - 0.05), 0.1, 0.1, facecolor=GRADE_COLORS[i],
+                                  edgecolor='white', transform=scale.transAxes))
+        scale.text(0.16, y, f"{grade:<3} {band}", fontsize=9, va='center', transform=scale.transAxes)
+
+    # Average % per subject
+    bars = figure.add_subplot(grid[2, :])
+    bars.set_title("Average by Subject", fontsize=11, fontweight='bold')
+    averages = marks.subject_averages(limit=MAX_SUBJECTS)
+    if averages:
+        names = [name for name, _ in averages]
+        values = [value for _, value in averages]
+        bars.bar(range(len(values)), values, color='#2E86AB')
+        bars.set_xticks(range(len(values)), names, rotation=30, ha='right', fontsize=8)
+        bars.set_ylim(0, 100)
+        bars.set_ylabel("Average %")
+        bars.grid(True, axis='y', alpha=0.3)
+        for x, value in enumerate(values):
+            bars.text(x, value + 1.5, f"{value:.0f}", ha='center', fontsize=7)
+    else:
+        bars.axis('off')
+        bars.text(0.5, 0.5, "No data available", ha='center', va='center', transform=bars.transAxes)
+
+    # Latest marks
+    table_ax = figure.add_subplot(grid[3, :])
+    table_ax.axis('off')
+    table_ax.set_title("Recent Marks", fontsize=11, fontweight='bold')
+    recent = marks.recent(RECENT_MARKS)
+    if recent:
+        cells = [[str(row.get('subject_name') or ""), str(row.get('exam_date') or "")[:10],
+                  f"{row.get('marks_obtained')}/{row.get('total_marks')}", f"{pct:.1f}%", grade, status]
+                 for row, pct, grade, status in recent]
+        table = table_ax.table(cellText=cells, colLabels=["Subject", "Date", "Marks", "%", "Grade", "Status"],
+                               colWidths=[0.26, 0.14, 0.12, 0.1, 0.1, 0.28],
+                               loc='upper center', cellLoc='left', colLoc='left')
+        table.auto_set_font_size(False)
+        table.set_fontsize(8)
+        table.scale(1, 1.3)
+    else:
+        table_ax.text(0.5, 0.5, "No marks recorded", ha='center', va='center', transform=table_ax.transAxes)
+
+    figure.savefig(path)
+    figure.clear()
+
+
+def render_batch(batch, out_dir, fmt, year=None):
+    """Worker: render [(student, rows), ...]; returns (pages written, failures)"""
+    written, failed = 0, []
+    for student, rows in batch:
+        try:
+            render_card(student, rows, os.path.join(out_dir, _file_name(student, fmt)), year)
+            written += 1
+        except Exception as e:
+            failed.append((student['student_id'], str(e)))
+    return written, failed
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def run(out_dir="report_cards", fmt="pdf", status="Active", grade_level=None, student_ids=None,
+        year=None, workers=None, batch_size=50):
+    """Render report cards for a cohort. Returns the number of pages written."""
+    from database import Database
+    # Not the app's shared db: that one reports connection errors in a dialog, and this runs headless
+    db = Database(interactive=False)
+    try:
+        if not db.connection or not db.connection.is_connected():
+            print("[ERROR] Cannot generate report cards without a database connection")
+            return 0
+        return _render_cohort(db, out_dir, fmt, status, grade_level, student_ids, year, workers, batch_size)
+    finally:
+        db.close()
+
+
+def _render_cohort(db, out_dir, fmt, status, grade_level, student_ids, year, workers, batch_size):
+    os.makedirs(out_dir, exist_ok=True)
+    students = _cohort(db, status, grade_level, student_ids)
+    if not students:
+        print("[WARN] No students match the given filters")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    fetch_time = 0.0
+    written, failed = 0, []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = []
+        for start in range(0, len(students), batch_size):
+            batch = students[start:start + batch_size]
+            t0 = time.perf_counter()
+            marks = db.get_marks_for_students([s['student_id'] for s in batch])
+            fetch_time += time.perf_counter() - t0
+            # Workers get plain rows; they never open a database connection
+            pending.append(pool.submit(render_batch, [(s, marks[s['student_id']]) for s in batch],
+                                       out_dir, fmt, year))
+            if len(pending) >= 2 * workers:  # bound the batches held in memory
+                n, errors = pending.pop(0).result()
+                written += n
+                failed.extend(errors)
+        for future in pending:
+            n, errors = future.result()
+            written += n
+            failed.extend(errors)
+    elapsed = time.perf_counter() - started
+
+    for student_id, error in failed[:10]:
+        print(f"[ERROR] Report card for student {student_id} failed: {error}")
+    rate = written / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] Wrote {written} report cards to {out_dir} in {elapsed:.1f}s "
+          f"({rate:.1f} pages/sec; prefetch {fetch_time:.1f}s)")
+    if failed:
+        print(f"[WARN] {len(failed)} report cards failed")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render student report cards without the GUI")
+    parser.add_argument("--out", default="report_cards", help="output directory")
+    parser.add_argument("--format", choices=("pdf", "png"), default="pdf")
+    parser.add_argument("--status", default="Active", help="student status to include ('' for all)")
+    parser.add_argument("--grade-level", type=int, help="only this grade level (set on the student forms)")
+    parser.add_argument("--students", type=int, nargs="+", help="only these student ids")
+    parser.add_argument("--year", type=int, help="only marks from this exam year")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=50, help="students per prefetch and render task")
+    args = parser.parse_args()
+    run(out_dir=args.out, fmt=args.format, status=args.status, grade_level=args.grade_level,
+        student_ids=args.students, year=args.year, workers=args.workers, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
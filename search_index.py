@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+In-memory search index for the admin student and teacher lists.
+
+The index is built from the rows already loaded into a table (tuples, as
+VirtualTable holds them) and answers a query with ranked row indices:
+
+    1. a searched field starts with the query   ("ali" -> "Alice Smith")
+    2. a word inside a field starts with it     ("smi" -> "Alice Smith")
+    3. the query appears anywhere in a field    ("ice" -> "Alice Smith")
+
+Earlier fields rank first within a tier (name before email), then the
+original row order. Word prefixes come from a sorted word array (binary
+search); substrings come from sorted trigram postings, checked against
+the text, so no query scans every row. Terms shorter than three
+characters match word prefixes only. Several words must all match; rows
+rank by their sum of tiers.
+
+The arrays are built on a background thread as soon as rows are set, so
+the Tk thread never waits for them. Later set_rows() calls with row keys
+are applied incrementally: rows still identical to the built snapshot are
+answered from it, and the few added or edited ones are scanned directly,
+until enough have changed that a fresh snapshot is built (again in the
+background).
+
+Debouncer delays a callback until typing pauses, so a search runs once
+per pause rather than once per keystroke.
+"""
+
+import re
+import threading
+
+import numpy as np
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+_SEP = "\x00"          # between fields in the trigram text; never in a query
+_BASE = 1 << 21         # one code point per trigram digit
+
+TIER_FIELD_PREFIX = 0
+TIER_WORD_PREFIX = 1
+TIER_SUBSTRING = 2
+
+# Rows scanned directly (added or edited since the snapshot) before it is rebuilt
+OVERLAY_MIN = 1000
+OVERLAY_FRACTION = 0.05
+
+
+def _codes(text):
+    """Trigram codes of text, one per position (code points packed into an int64)"""
+    c = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if len(c) < 3:
+        return np.empty(0, dtype=np.int64)
+    return (c[:-2] * _BASE + c[1:-1]) * _BASE + c[2:]
+
+
+class _Snapshot:
+    """Immutable sorted word array and trigram postings over a fixed list of rows"""
+
+    def __init__(self, values, keys):
+        self.values = values      # per row, the tuple of searched field values
+        self.keys = keys
+        self.texts = [tuple(str(v or "").lower() for v in row) for row in values]
+        self._build(len(values[0]) if values else 0)
+
+    def _build(self, width):
+        texts = self.texts
+
+        # Words, sorted, with the row, field and whether the field starts with the word
+        words, word_rows, word_fields, word_lead = [], [], [], []
+        for i, row_texts in enumerate(texts):
+            for field, text in enumerate(row_texts):
+                lead = True
+                for m in _WORD.finditer(text):
+                    words.append(m.group())
+                    word_rows.append(i)
+                    word_fields.append(field)
+                    word_lead.append(lead and m.start() == 0)
+                    lead = False
+        words = np.array(words, dtype=str) if words else np.array([], dtype="<U1")
+        order = np.argsort(words, kind="stable")
+        self.words = words[order]
+        self.word_rows = np.array(word_rows, dtype=np.int64)[order]
+        tiers = np.where(np.array(word_lead, dtype=bool), TIER_FIELD_PREFIX, TIER_WORD_PREFIX)
+        self.word_scores = (tiers * width + np.array(word_fields, dtype=np.int64))[order]
+
+        # Trigram postings: every (trigram, row) once, sorted by trigram
+        joined = _SEP.join(_SEP.join(row_texts) for row_texts in texts)
+        codes = _codes(joined)
+        lengths = np.array([sum(len(t) for t in row_texts) + width for row_texts in texts], dtype=np.int64)
+        position_rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)[:len(codes)]
+        order = np.lexsort((position_rows, codes))
+        codes, position_rows = codes[order], position_rows[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (position_rows[1:] != position_rows[:-1])
+        self.gram_codes = codes[keep]
+        self.gram_rows = position_rows[keep]
+
+    def term_scores(self, term, width):
+        """Matching snapshot rows (unique, ascending) and the rank (tier, then field) of each one's best match"""
+        lo = np.searchsorted(self.words, term, side="left")
+        hi = np.searchsorted(self.words, term + "\U0010ffff", side="left")
+        rows = self.word_rows[lo:hi]
+        scores = self.word_scores[lo:hi]
+        # Substrings (inside words or across them, e.g. "e.s" in an email)
+        if len(term) >= 3 and _SEP not in term:
+            extra = np.setdiff1d(self._candidates(term), rows, assume_unique=True)
+            if len(extra):
+                found, found_scores = [], []
+                for i in extra.tolist():
+                    for field, text in enumerate(self.texts[i]):
+                        if term in text:
+                            found.append(i)
+                            found_scores.append(TIER_SUBSTRING * width + field)
+                            break
+                rows = np.concatenate([rows, np.array(found, dtype=np.int64)])
+                scores = np.concatenate([scores, np.array(found_scores, dtype=np.int64)])
+        return _best_per_row(rows, scores)
+
+    def _candidates(self, term):
+        """Rows containing every trigram of term (a superset of the rows containing term)"""
+        result = None
+        for code in np.unique(_codes(term)):
+            lo = np.searchsorted(self.gram_codes, code, side="left")
+            hi = np.searchsorted(self.gram_codes, code, side="right")
+            rows = self.gram_rows[lo:hi]
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
+
+
+def _best_per_row(rows, scores):
+    order = np.lexsort((scores, rows))
+    rows, scores = rows[order], scores[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    return rows[first], scores[first]
+
+
+def _scan_score(row_texts, term, width):
+    """The rank a snapshot would give one row for term (None for no match), by direct scan"""
+    best = None
+    for field, text in enumerate(row_texts):
+        for k, m in enumerate(_WORD.finditer(text)):
+            if m.group().startswith(term):
+                tier = TIER_FIELD_PREFIX if k == 0 and m.start() == 0 else TIER_WORD_PREFIX
+                score = tier * width + field
+                best = score if best is None else min(best, score)
+        if len(term) >= 3 and _SEP not in term and term in text:
+            score = TIER_SUBSTRING * width + field
+            best = score if best is None else min(best, score)
+    return best
+
+
+class SearchIndex:
+    """Ranked prefix / n-gram index over some columns of a list of rows."""
+
+    def __init__(self, fields, rows=None, keys=None):
+        self.fields = tuple(fields)
+        self._rows = []
+        self._snapshot = None
+        self._keys = []
+        self._remap = np.empty(0, dtype=np.int64)   # snapshot row -> current row, -1 if gone or edited
+        self._overlay = []                          # current rows not covered by the snapshot
+        self._overlay_texts = None                  # their lowercased fields, made on first search
+        self._lock = threading.Lock()
+        self._built = None                          # snapshot finished by the build thread
+        self._building = False
+        if rows is not None:
+            self.set_rows(rows, keys)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _values(self, row):
+        return tuple(row[f] for f in self.fields)
+
+    def set_rows(self, rows, keys=None):
+        """Replace the indexed rows (call from one thread, e.g. Tk's).
+
+        Rows are matched to the current snapshot by key (one per row, e.g.
+        student ids; positions when omitted). Unchanged rows keep using it;
+        once too many rows differ, a new snapshot is built in the background.
+        """
+        self._rows = rows
+        self._keys = list(keys) if keys is not None else list(range(len(rows)))
+        self._reconcile()
+
+    def _reconcile(self):
+        snapshot, rows, keys = self._snapshot, self._rows, self._keys
+        covered = np.zeros(len(rows), dtype=bool)
+        self._remap = np.full(len(snapshot.values) if snapshot else 0, -1, dtype=np.int64)
+        if snapshot is not None:
+            position = {k: i for i, k in enumerate(keys)}
+            for b, (k, values) in enumerate(zip(snapshot.keys, snapshot.values)):
+                i = position.get(k)
+                if i is not None and not covered[i] and self._values(rows[i]) == values:
+                    self._remap[b] = i
+                    covered[i] = True
+        self._overlay = np.flatnonzero(~covered).tolist()
+        self._overlay_texts = None
+        if not self._small(self._overlay):
+            self._start_build()
+
+    def _small(self, overlay):
+        return len(overlay) <= max(OVERLAY_MIN, OVERLAY_FRACTION * len(self._rows))
+
+    def _start_build(self):
+        with self._lock:
+            if self._building:
+                # _install reconciles against the rows of the day and builds again if needed
+                return
+            self._building = True
+        values = [self._values(row) for row in self._rows]
+        threading.Thread(target=self._build, args=(values, list(self._keys)),
+                         name="search-index", daemon=True).start()
+
+    def _build(self, values, keys):
+        try:
+            snapshot = _Snapshot(values, keys)
+        except Exception as e:
+            print(f"[WARN] Search index build failed: {e}")
+            snapshot = None
+        with self._lock:
+            self._built = snapshot
+            self._building = False
+
+    def _install(self):
+        """Adopt a snapshot the build thread finished, against the current rows"""
+        with self._lock:
+            built, self._built = self._built, None
+        if built is not None:
+            self._snapshot = built
+            self._reconcile()
+
+    @property
+    def ready(self):
+        """False while a build runs and searching now would scan too many rows directly"""
+        self._install()
+        with self._lock:
+            building = self._building
+        return not building or self._small(self._overlay)
+
+    # ---- queries ----
+
+    def search(self, query):
+        """Indices of matching rows, best first ([] for no match, None for an empty query)."""
+        terms = query.lower().split()
+        if not terms:
+            return None
+        self._install()
+        rows = scores = None
+        for term in terms:
+            term_rows, term_scores = self._term_scores(term)
+            if rows is None:
+                rows, scores = term_rows, term_scores
+            else:
+                rows, a, b = np.intersect1d(rows, term_rows, assume_unique=True, return_indices=True)
+                scores = scores[a] + term_scores[b]
+            if not len(rows):
+                return []
+        return rows[np.lexsort((rows, scores))].tolist()
+
+    def _term_scores(self, term):
+        """Matching current rows (unique, ascending) and each one's best rank"""
+        width = len(self.fields)
+        rows = scores = np.empty(0, dtype=np.int64)
+        if self._snapshot is not None:
+            base_rows, base_scores = self._snapshot.term_scores(term, width)
+            current = self._remap[base_rows]
+            live = current >= 0
+            rows, scores = current[live], base_scores[live]
+        if self._overlay_texts is None:
+            self._overlay_texts = [tuple(str(v or "").lower() for v in self._values(self._rows[i]))
+                                   for i in self._overlay]
+        found = [(i, score) for i, texts in zip(self._overlay, self._overlay_texts)
+                 for score in (_scan_score(texts, term, width),) if score is not None]
+        if found:
+            rows = np.concatenate([rows, np.array([i for i, _ in found], dtype=np.int64)])
+            scores = np.concatenate([scores, np.array([sc for _, sc in found], dtype=np.int64)])
+        return _best_per_row(rows, scores)
+
+
+class Debouncer:
+    """Run callback once, `delay_ms` after the last call (Tk `after` based)."""
+
+    def __init__(self, widget, delay_ms, callback):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.callback = callback
+        self._pending = None
+
+    def __call__(self, *args):
+        self.cancel()
+        self._pending = self.widget.after(self.delay_ms, self._fire)
+
+    def cancel(self):
+        if self._pending is not None:
+            try:
+                self.widget.after_cancel(self._pending)
+            except Exception:
+                pass
+            self._pending = None
+
+    def _fire(self):
+        self._pending = None
+        self.callback()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Startup profiler: time-to-interactive spans for the dashboards.
+
+When enabled, spans are recorded for module imports, the database connect,
+each dashboard's __init__, every create_*/load_*/render_* method (panels
+and charts) and the first idle tick of the dashboard's Tk event loop. The
+trace is written as Chrome trace JSON when a dashboard becomes interactive
+and again at exit; open it in chrome://tracing or https://ui.perfetto.dev.
+
+Enable with either:
+    SPMS_PROFILE_STARTUP=1 python login.py            # trace in startup_trace.json
+    SPMS_PROFILE_STARTUP=/tmp/trace.json python login.py
+    python main.py --profile-startup
+
+Disabled (the default), the wrappers cost one flag check per call.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_trace.json")
+INSTRUMENTED_PREFIXES = ("create_", "load_", "render_")
+_CHART_WORDS = ("chart", "pie", "plot", "gauge")
+
+_T0 = time.perf_counter()  # trace time zero: the first import of this module
+_events = []
+_lock = threading.Lock()
+_enabled = False
+_trace_path = DEFAULT_TRACE_PATH
+_atexit_registered = False
+
+
+def enable(path=None):
+    """Start recording; the trace goes to `path` (default startup_trace.json)."""
+    global _enabled, _trace_path, _atexit_registered
+    _enabled = True
+    _trace_path = path or DEFAULT_TRACE_PATH
+    if not _atexit_registered:
+        atexit.register(dump)
+        _atexit_registered = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def _now_us():
+    return (time.perf_counter() - _T0) * 1e6
+
+
+def _record(event):
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", threading.get_ident())
+    with _lock:
+        _events.append(event)
+
+
+@contextmanager
+def span(name, cat="startup", **args):
+    """Record the enclosed block as one complete ("X") trace event."""
+    if not _enabled:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _record({"name": name, "cat": cat, "ph": "X", "ts": start,
+                 "dur": _now_us() - start, "args": args})
+
+
+def instant(name, cat="startup", **args):
+    """Record a point in time (e.g. the first idle tick)."""
+    if _enabled:
+        _record({"name": name, "cat": cat, "ph": "i", "s": "p", "ts": _now_us(), "args": args})
+
+
+def traced(name=None, cat="startup"):
+    """Decorator: record each call of the function as a span."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(label, cat=cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _category(method_name):
+    if method_name.startswith("load_"):
+        return "data"
+    if method_name.startswith("render_") or any(w in method_name for w in _CHART_WORDS):
+        return "chart"
+    return "panel"
+
+
+def instrument(cls):
+    """Class decorator for a dashboard with a Tk `self.root`.
+
+    Wraps __init__ and the create_*/load_*/render_* methods in spans, and
+    after __init__ schedules an idle callback on self.root that records
+    time-to-interactive (start of __init__ to the first idle tick) and
+    writes the trace.
+    """
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and attr.startswith(INSTRUMENTED_PREFIXES):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}", cat=_category(attr))(value))
+
+    init = cls.__init__
+
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs):
+        if not _enabled:
+            return init(self, *args, **kwargs)
+        started = _now_us()
+        with span(f"{cls.__name__}.__init__", cat="dashboard"):
+            init(self, *args, **kwargs)
+        root = getattr(self, "root", None)
+        if root is not None:
+            root.after_idle(lambda: _first_idle(cls.__name__, started))
+
+    cls.__init__ = __init__
+    return cls
+
+
+def _first_idle(dashboard, started):
+    now = _now_us()
+    _record({"name": f"{dashboard} time-to-interactive", "cat": "dashboard", "ph": "X",
+             "ts": started, "dur": now - started, "args": {}})
+    instant(f"{dashboard} first idle tick", cat="dashboard")
+    print(f"[OK] {dashboard} interactive after {(now - started) / 1000:.0f} ms")
+    dump()
+
+
+def dump(path=None):
+    """Write the events recorded so far as Chrome trace JSON; returns the path."""
+    if not _events:
+        return None
+    path = path or _trace_path
+    with _lock:
+        events = list(_events)
+    meta = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+             "args": {"name": "main" if tid == threading.main_thread().ident else f"thread-{tid}"}}
+            for tid in sorted({e["tid"] for e in events})]
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
+    except OSError as e:
+        print(f"[WARN] Could not write startup trace: {e}")
+        return None
+    return path
+
+
+_env = os.environ.get("SPMS_PROFILE_STARTUP", "").strip()
+if _env and _env.lower() not in ("0", "false", "no"):
+    enable(None if _env.lower() in ("1", "true", "yes") else _env)
@@ -6,18 +6,11 @@ Student Dashboard for Student Performance Monitoring System
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database import db
+from startup_profiler import instrument
+from charts import BarChart, DonutChart, LineChart, matplotlib_available, unavailable_label
+from student_marks import GRADE_ORDER, StudentMarksModel, percentage_to_grade, grade_points, calculate_gpa
 
-# Try to import matplotlib, but make it optional
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    import matplotlib
-    matplotlib.use('TkAgg')
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("⚠️ Matplotlib not available. Charts will be disabled.")
-
+@instrument
 class StudentDashboard:
     def __init__(self, user, student_profile):
         self.user = user
@@ -54,6 +47,11 @@ class StudentDashboard:
         # Smooth mouse wheel scrolling (Windows)
         self._canvas.bind_all('<MouseWheel>', lambda e: self._canvas.yview_scroll(int(-1 * (e.delta / 120)), 'units'))
 
+        # Marks are fetched once per session; every panel reads this model and
+        # filters re-slice it in memory
+        self.marks_model = StudentMarksModel.load(db, self.student_profile['student_id'])
+        self.marks_view = self.marks_model
+
         # Create main container with modern styling inside scrollable frame
         self.main_container = ttk.Frame(self._scroll_frame, style='Main.TFrame')
         self.main_container.grid(row=0, column=0, sticky="nsew", padx=15, pady=15)
@@ -135,7 +133,7 @@ class StudentDashboard:
         ttk.Label(year_frame, text="Select Year", style='Filter.TLabel').grid(row=0, column=0, sticky="w")
         self.year_var = tk.StringVar(value="All")
         year_combo = ttk.Combobox(year_frame, textvariable=self.year_var, 
-                                 values=["All", "2024", "2023", "2022"], 
+                                 values=["All"] + [str(y) for y in self.marks_model.available_years()], 
                                  state="readonly", width=15)
         year_combo.grid(row=1, column=0, sticky="w", pady=(5, 0))
         
@@ -209,6 +207,7 @@ class StudentDashboard:
         grades_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(0, 10))
         grades_frame.grid_columnconfigure(0, weight=1)
         grades_frame.grid_rowconfigure(0, weight=1)
+        self.grades_frame = grades_frame
         self.create_grades_summary(grades_frame)
         
         # Performance Statistics section (full width)
@@ -216,254 +215,93 @@ class StudentDashboard:
         stats_frame.grid(row=3, column=0, columnspan=2, sticky="ew")
         stats_frame.grid_columnconfigure(0, weight=1)
         stats_frame.grid_rowconfigure(0, weight=1)
+        self.stats_frame = stats_frame
         self.create_performance_stats(stats_frame)
 
-    def create_grade_distribution_pie(self, parent):
-        """Create grade distribution pie chart using real marks"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-
-            parent.grid_columnconfigure(0, weight=1)
-            parent.grid_rowconfigure(0, weight=1)
-
-            chart_frame = ttk.LabelFrame(parent, text="My Grade Distribution", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-
-            fig, ax = plt.subplots(figsize=(6.5, 3.8))
-            fig.patch.set_facecolor('white')
-
-            marks = db.get_student_marks(self.student_profile['student_id'])
-
-            if marks:
-                percentages = [
-                    (float(m['marks_obtained']) / float(m['total_marks'])) * 100 if m['total_marks'] else 0.0
-                    for m in marks
-                ]
-                grades = [self.calculate_grade(p) for p in percentages]
-                order = ['A+', 'A', 'B', 'C', 'D', 'F']
-                counts = [grades.count(g) for g in order]
-                labels = [f"{g} ({c})" for g, c in zip(order, counts)]
-                colors = ['#2ecc71', '#27ae60', '#3498db', '#f1c40f', '#e67e22', '#e74c3c']
-
-                # Avoid all-zero data
-                if sum(counts) > 0:
-                    wedges, texts, autotexts = ax.pie(counts, labels=labels, autopct='%1.0f%%',
-                                                      startangle=90, colors=colors, pctdistance=0.8)
-                    centre_circle = plt.Circle((0,0), 0.55, fc='white')
-                    ax.add_artist(centre_circle)
-                    ax.set_title('Grade Distribution', fontsize=12, pad=10)
-                else:
-                    ax.text(0.5, 0.5, 'No data', ha='center', va='center', transform=ax.transAxes)
-            else:
-                ax.text(0.5, 0.5, 'No data available', ha='center', va='center', transform=ax.transAxes)
-
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+    def _chart_frame(self, parent, text):
+        parent.grid_columnconfigure(0, weight=1)
+        parent.grid_rowconfigure(0, weight=1)
+        chart_frame = ttk.LabelFrame(parent, text=text, padding="10")
+        chart_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        chart_frame.grid_columnconfigure(0, weight=1)
+        chart_frame.grid_rowconfigure(0, weight=1)
+        return chart_frame
 
-        except ImportError:
-            ttk.Label(parent, text="Matplotlib not available for charts", 
-                     font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
+    def create_grade_distribution_pie(self, parent):
+        """Create grade distribution donut chart using real marks"""
+        if not matplotlib_available():
+            unavailable_label(parent).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = self._chart_frame(parent, "My Grade Distribution")
+        self.grade_pie = DonutChart(chart_frame, figsize=(6.5, 3.8), title='Grade Distribution',
+                                    show_counts=True, title_kw={'fontsize': 12, 'pad': 10})
+        self.grade_pie.widget.grid(row=0, column=0, sticky="nsew")
+        self.update_grade_distribution_pie()
+
+    def update_grade_distribution_pie(self):
+        if not self.marks_view:
+            self.grade_pie.show_message('No data available')
+            return
+        self.grade_pie.update(GRADE_ORDER, self.marks_view.grade_counts())
 
     def create_subject_boxplot(self, parent):
         """Create subject-wise bar chart (attempts per subject)"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-
-            parent.grid_columnconfigure(0, weight=1)
-            parent.grid_rowconfigure(0, weight=1)
-
-            chart_frame = ttk.LabelFrame(parent, text="Attempts per Subject (Bar)", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-
-            fig, ax = plt.subplots(figsize=(6.5, 3.8))
-            fig.patch.set_facecolor('white')
+        if not matplotlib_available():
+            unavailable_label(parent).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = self._chart_frame(parent, "Attempts per Subject (Bar)")
+        self.attempts_chart = BarChart(chart_frame, figsize=(6.5, 3.8), title='Attempts per Subject',
+                                       ylabel='Attempts', limits=None, value_format='{:.0f}', rotation=20,
+                                       title_kw={'fontsize': 12})
+        self.attempts_chart.widget.grid(row=0, column=0, sticky="nsew")
+        self.update_subject_boxplot()
+
+    def update_subject_boxplot(self):
+        items = self.marks_view.subject_attempts(limit=10)
+        self.attempts_chart.update([k for k, _ in items], [v for _, v in items])
 
-            marks = db.get_student_marks(self.student_profile['student_id'])
-
-            if marks:
-                # Count attempts per subject
-                counts = {}
-                for m in marks:
-                    subj = str(m['subject_name'])
-                    counts[subj] = counts.get(subj, 0) + 1
-
-                items = sorted(counts.items(), key=lambda kv: kv[0])[:10]
-                labels = [k for k, _ in items]
-                values = [v for _, v in items]
-
-                if values:
-                    colors = ['#2E86AB', '#27ae60', '#f39c12', '#e74c3c', '#9b59b6']
-                    xs = np.arange(len(labels))
-                    bars = ax.bar(xs, values, color=[colors[i % len(colors)] for i in range(len(labels))])
-                    ax.set_ylabel('Attempts')
-                    ax.set_title('Attempts per Subject', fontsize=12)
-                    ax.set_xticks(xs)
-                    ax.set_xticklabels(labels, rotation=20, ha='right')
-                    for b, v in zip(bars, values):
-                        ax.text(b.get_x() + b.get_width()/2, b.get_height()+0.05, f"{int(v)}", ha='center', va='bottom', fontsize=9)
-                    fig.subplots_adjust(bottom=0.25, left=0.07, right=0.98, top=0.90)
-                else:
-                    ax.text(0.5, 0.5, 'No data', ha='center', va='center', transform=ax.transAxes)
-            else:
-                ax.text(0.5, 0.5, 'No data available', ha='center', va='center', transform=ax.transAxes)
-
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-
-        except ImportError:
-            ttk.Label(parent, text="Matplotlib not available for charts", 
-                     font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
-    
     def create_performance_chart(self, parent):
         """Create performance over time chart with modern styling"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-            
-            # Configure parent frame
-            parent.grid_columnconfigure(0, weight=1)
-            parent.grid_rowconfigure(0, weight=1)
-            
-            chart_frame = ttk.LabelFrame(parent, text="My Performance Over Time", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-            
-            fig, ax = plt.subplots(figsize=(7.0, 3.8))
-            fig.patch.set_facecolor('white')
-            
-            # Get student's marks
-            marks = db.get_student_marks(self.student_profile['student_id'])
-            
-            if marks:
-                # Prepare data
-                # Normalize dates to short strings
-                def _fmt_date(d):
-                    return d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else str(d)
-                dates = [_fmt_date(mark['exam_date']) for mark in marks]
-                percentages = [
-                    (float(mark['marks_obtained']) / float(mark['total_marks'])) * 100 if mark['total_marks'] else 0.0
-                    for mark in marks
-                ]
-                subjects = [mark['subject_name'] for mark in marks]
-                
-                # Create line plot
-                ax.plot(range(len(dates)), percentages, marker='o', linewidth=3, markersize=8, color='#2E86AB')
-                ax.set_title('My Performance Over Time', fontsize=14, fontweight='bold')
-                ax.set_ylabel('Percentage (%)', fontsize=12)
-                ax.set_xlabel('Exams', fontsize=12)
-                ax.grid(True, alpha=0.3)
-                
-                # Set x-axis labels
-                ax.set_xticks(range(len(dates)))
-                # Limit labels to avoid overlap and use tighter rotation
-                labels = [f"{s}\n{d}" for s, d in zip(subjects, dates)]
-                ax.set_xticklabels(labels, rotation=25, ha='right', fontsize=9)
-                ax.set_ylim(0, 100)
-                ax.margins(x=0.02, y=0.1)
-                fig.subplots_adjust(bottom=0.32, left=0.08, right=0.98, top=0.90)
-                
-                # Add average line
-                avg_percentage = sum(percentages) / len(percentages)
-                ax.axhline(y=avg_percentage, color='red', linestyle='--', alpha=0.7, label=f'Average: {avg_percentage:.1f}%')
-                ax.legend()
-                
-                plt.tight_layout()
-            else:
-                ax.text(0.5, 0.5, 'No performance data available', 
-                       ha='center', va='center', transform=ax.transAxes, fontsize=12)
-                ax.set_title('My Performance Over Time', fontsize=14, fontweight='bold')
-            
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-            
-        except ImportError:
-            ttk.Label(parent, text="Matplotlib not available for charts", 
-                     font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
-    
+        if not matplotlib_available():
+            unavailable_label(parent).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = self._chart_frame(parent, "My Performance Over Time")
+        self.performance_chart = LineChart(chart_frame, figsize=(7.0, 3.8), title='My Performance Over Time',
+                                           xlabel='Exams', ylabel='Percentage (%)',
+                                           title_kw={'fontsize': 14, 'fontweight': 'bold'})
+        self.performance_chart.widget.grid(row=0, column=0, sticky="nsew")
+        self.update_performance_chart()
+
+    def update_performance_chart(self):
+        marks = self.marks_view
+        if not marks:
+            self.performance_chart.show_message('No performance data available')
+            return
+        # Normalize dates to short strings
+        def _fmt_date(d):
+            return d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else str(d)
+        labels = [f"{s}\n{_fmt_date(m['exam_date'])}" for s, m in zip(marks.subject_names, marks.rows)]
+        self.performance_chart.update(marks.percentages, labels, reference=marks.average())
+
     def create_subject_chart(self, parent):
         """Create subject performance chart with modern styling"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-            
-            # Configure parent frame
-            parent.grid_columnconfigure(0, weight=1)
-            parent.grid_rowconfigure(0, weight=1)
-            
-            chart_frame = ttk.LabelFrame(parent, text="My Average Performance by Subject", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-            
-            fig, ax = plt.subplots(figsize=(7.0, 4.1))
-            fig.patch.set_facecolor('white')
-            
-            # Get student's marks
-            marks = db.get_student_marks(self.student_profile['student_id'])
-            
-            if marks:
-                # Group by subject and compute averages
-                subject_marks = {}
-                for mark in marks:
-                    subject = str(mark['subject_name'])
-                    percentage = (
-                        (float(mark['marks_obtained']) / float(mark['total_marks'])) * 100
-                        if mark['total_marks'] else 0.0
-                    )
-                    subject_marks.setdefault(subject, []).append(percentage)
-
-                items = [
-                    (subj, sum(vals) / len(vals)) for subj, vals in subject_marks.items()
-                ]
-                # Sort by average desc and limit to top 10 to reduce clutter
-                items.sort(key=lambda x: x[1], reverse=True)
-                items = items[:10]
-                # Unpack reversed so highest appears at top in barh
-                subjects = [s for s, _ in items][::-1]
-                avg_percentages = [v for _, v in items][::-1]
-
-                # Create horizontal bar chart
-                colors = ['#2E86AB', '#27ae60', '#f39c12', '#e74c3c', '#9b59b6']
-                bars = ax.barh(subjects, avg_percentages, color=colors * ((len(subjects)//len(colors))+1))
-                ax.set_title('My Average Performance by Subject', fontsize=14, fontweight='bold')
-                ax.set_xlabel('Average Percentage (%)', fontsize=12)
-                ax.set_xlim(0, 100)
-                ax.margins(y=0.05)
-                fig.subplots_adjust(left=0.32, right=0.95, top=0.92, bottom=0.12)
-                
-                # Add value labels on bars
-                for i, (bar, value) in enumerate(zip(bars, avg_percentages)):
-                    width = bar.get_width()
-                    ax.text(min(width + 1, 98), bar.get_y() + bar.get_height()/2, 
-                           f'{value:.1f}%', ha='left', va='center', fontweight='bold', fontsize=9)
-                
-                plt.tight_layout()
-            else:
-                ax.text(0.5, 0.5, 'No performance data available', 
-                       ha='center', va='center', transform=ax.transAxes, fontsize=12)
-                ax.set_title('My Average Performance by Subject', fontsize=14, fontweight='bold')
-            
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-            
-        except ImportError:
-            ttk.Label(parent, text="Matplotlib not available for charts", 
-                     font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
+        if not matplotlib_available():
+            unavailable_label(parent).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = self._chart_frame(parent, "My Average Performance by Subject")
+        self.subject_chart = BarChart(chart_frame, figsize=(7.0, 4.1), title='My Average Performance by Subject',
+                                      xlabel='Average Percentage (%)', horizontal=True, value_format='{:.1f}%',
+                                      title_kw={'fontsize': 14, 'fontweight': 'bold'})
+        self.subject_chart.widget.grid(row=0, column=0, sticky="nsew")
+        self.update_subject_chart()
+
+    def update_subject_chart(self):
+        # Top 10 subjects by average, reversed so the highest is at the top of the barh
+        items = self.marks_view.subject_averages(limit=10)[::-1]
+        if not items:
+            self.subject_chart.show_message('No performance data available')
+            return
+        self.subject_chart.update([k for k, _ in items], [v for _, v in items])
     
     def create_performance_stats(self, parent):
         """Create modern performance statistics with horizontal cards layout"""
@@ -476,19 +314,14 @@ class StudentDashboard:
         stats_frame.grid_columnconfigure(0, weight=1)
         stats_frame.grid_rowconfigure(0, weight=1)
         
-        # Get student's marks
-        marks = db.get_student_marks(self.student_profile['student_id'])
+        marks = self.marks_view
         
         if marks:
             # Calculate comprehensive statistics
             total_marks = len(marks)
-            percentages = [
-                (float(m['marks_obtained']) / float(m['total_marks'])) * 100 if m['total_marks'] else 0.0
-                for m in marks
-            ]
-            avg_percentage = sum(percentages) / total_marks
-            highest_mark = max(percentages)
-            gpa = self.calculate_gpa(marks)
+            avg_percentage = marks.average()
+            highest_mark = marks.best()
+            gpa = marks.cgpa()
             
             # Create horizontal cards layout
             cards_frame = ttk.Frame(stats_frame, style='Card.TFrame')
@@ -529,34 +362,6 @@ class StudentDashboard:
                                      font=("Arial", 14), background='#ffffff')
             no_data_label.grid(row=0, column=0, sticky="nsew")
     
-    def create_gauge(self, ax, value, title, color, max_val=100):
-        """Create a single gauge chart"""
-        import numpy as np
-        
-        # Calculate angles
-        theta = np.linspace(0, np.pi, 100)
-        radius = 1
-        
-        # Background circle
-        ax.plot(radius * np.cos(theta), radius * np.sin(theta), 'k-', linewidth=2)
-        
-        # Filled portion
-        filled_theta = np.linspace(0, np.pi * (value / max_val), 100)
-        ax.fill_between(radius * np.cos(filled_theta), 0, radius * np.sin(filled_theta), 
-                       color=color, alpha=0.7)
-        
-        # Add value text
-        ax.text(0, 0, f'{value:.1f}', ha='center', va='center', fontsize=10, fontweight='bold')
-        
-        # Add title
-        ax.text(0, -1.3, title, ha='center', va='center', fontsize=8)
-        
-        # Set equal aspect ratio and remove axes
-        ax.set_aspect('equal')
-        ax.set_xlim(-1.5, 1.5)
-        ax.set_ylim(-1.5, 1.5)
-        ax.axis('off')
-    
     def create_grades_summary(self, parent):
         """Create modern grades summary panel with recent grades table"""
         # Configure parent frame
@@ -568,8 +373,7 @@ class StudentDashboard:
         summary_frame.grid_columnconfigure(0, weight=1)
         summary_frame.grid_rowconfigure(0, weight=1)
         
-        # Get student's marks
-        marks = db.get_student_marks(self.student_profile['student_id'])
+        marks = self.marks_view
         
         if marks:
             # Create modern table for recent grades
@@ -602,26 +406,7 @@ class StudentDashboard:
             scrollbar.grid(row=0, column=1, sticky="ns")
             
             # Populate with recent marks
-            recent_marks = marks[:10]  # Show last 10 grades
-            for mark in recent_marks:
-                percentage = (
-                    (float(mark['marks_obtained']) / float(mark['total_marks'])) * 100
-                    if mark['total_marks'] else 0.0
-                )
-                grade = self.calculate_grade(percentage)
-                
-                # Determine status based on grade
-                if grade in ['A+', 'A']:
-                    status = "Excellent"
-                elif grade == 'B':
-                    status = "Good"
-                elif grade == 'C':
-                    status = "Average"
-                elif grade == 'D':
-                    status = "Below Average"
-                else:
-                    status = "Needs Improvement"
-                
+            for mark, percentage, grade, status in marks.recent(10):  # Show last 10 grades
                 self.grades_tree.insert('', 'end', values=(
                     mark['subject_name'],
                     grade,
@@ -636,97 +421,47 @@ class StudentDashboard:
             no_data_label.grid(row=0, column=0, sticky="nsew")
     
     def on_filter_change(self, event=None):
-        """Handle filter changes"""
-        print(f"Filters changed - Year: {self.year_var.get()}, Grade: {self.grade_var.get()}")
-        # In a real implementation, this would refresh the dashboard data
-        # based on the selected year and grade filters
+        """Re-slice the session's marks for the selected year and rebuild the panels"""
+        # The grade filter is the class level; a student's own marks are all in one
+        self.marks_view = self.marks_model.filter(year=self.year_var.get())
+        # Charts keep their figures and update in place; the table and cards are rebuilt
+        if matplotlib_available():
+            self.update_performance_chart()
+            self.update_subject_chart()
+            self.update_grade_distribution_pie()
+            self.update_subject_boxplot()
+        for frame, build in ((self.grades_frame, self.create_grades_summary),
+                             (self.stats_frame, self.create_performance_stats)):
+            for child in frame.winfo_children():
+                child.destroy()
+            build(frame)
         self.load_dashboard_data()
     
     def load_dashboard_data(self):
-        """Load dashboard data from database"""
+        """Refresh header values from the session marks model"""
         try:
-            # Get student's marks
-            marks = db.get_student_marks(self.student_profile['student_id'])
-            
-            # Update CGPA in header
+            # Update CGPA in header (cumulative: always over every mark)
             try:
-                cgpa = self.calculate_gpa(marks)
+                cgpa = self.marks_model.cgpa()
                 self.cgpa_header_label.config(text=f"CGPA: {cgpa:.2f}")
             except Exception:
                 self.cgpa_header_label.config(text="CGPA: --")
             
-            # Update any dynamic content based on filters (placeholder)
-            
         except Exception as e:
             print(f"Error loading dashboard data: {e}")
     
     
     def calculate_grade(self, percentage):
         """Calculate letter grade based on percentage"""
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 80:
-            return 'A'
-        elif percentage >= 70:
-            return 'B'
-        elif percentage >= 60:
-            return 'C'
-        elif percentage >= 50:
-            return 'D'
-        else:
-            return 'F'
+        return percentage_to_grade(percentage)
     
     def calculate_gpa(self, marks):
-        """Calculate CGPA as credits-weighted average of subject grade points.
-        CGPA = Σ(grade_points(subject_avg) × subject_credits) ÷ Σ(subject_credits)
-        Subject average is computed from all attempts/assessments in that subject.
-        """
-        if not marks:
-            return 0.0
-
-        # Group by subject and calculate subject-level average percentage
-        by_subject = {}
-        for m in marks:
-            subject_id = m.get('subject_id')
-            subject_name = str(m.get('subject_name'))
-            key = (subject_id, subject_name)
-            pct = (
-                (float(m.get('marks_obtained', 0)) / float(m.get('total_marks', 1))) * 100
-                if m.get('total_marks') else 0.0
-            )
-            credits = int(m.get('credits') or 3)
-            entry = by_subject.setdefault(key, { 'percentages': [], 'credits': credits })
-            entry['percentages'].append(pct)
-            if credits:
-                entry['credits'] = credits
-
-        total_points = 0.0
-        total_credits = 0
-        for (_, _), info in by_subject.items():
-            if not info['percentages']:
-                continue
-            avg_pct = sum(info['percentages']) / len(info['percentages'])
-            gp = self.get_grade_points(avg_pct)
-            cr = max(int(info.get('credits') or 0), 0)
-            total_points += gp * cr
-            total_credits += cr
-
-        return (total_points / total_credits) if total_credits > 0 else 0.0
+        """Calculate CGPA as credits-weighted average of subject grade points (see student_marks)"""
+        return calculate_gpa(marks)
     
     def get_grade_points(self, percentage):
         """Get grade points based on percentage"""
-        if percentage >= 90:
-            return 4.0
-        elif percentage >= 80:
-            return 3.7
-        elif percentage >= 70:
-            return 3.0
-        elif percentage >= 60:
-            return 2.0
-        elif percentage >= 50:
-            return 1.0
-        else:
-            return 0.0
+        return grade_points(percentage)
     
     
     def logout(self):
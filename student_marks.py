@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-session marks model for the student dashboard.
+
+The student's marks are fetched once; percentages, letter grades, grade
+points, subject groups and CGPA are computed with NumPy and shared by
+every panel. Filters (currently the exam year) return a re-sliced model
+without going back to the database.
+"""
+
+import numpy as np
+
+GRADE_ORDER = ['A+', 'A', 'B', 'C', 'D', 'F']
+DEFAULT_CREDITS = 3
+
+# Lower bound of each band, ascending; index i of the tables below is band i
+_GRADE_CUTS = np.array([50.0, 60.0, 70.0, 80.0, 90.0])
+_GRADES_ASC = np.array(['F', 'D', 'C', 'B', 'A', 'A+'])
+_POINTS_ASC = np.array([0.0, 1.0, 2.0, 3.0, 3.7, 4.0])
+
+GRADE_STATUS = {
+    'A+': "Excellent",
+    'A': "Excellent",
+    'B': "Good",
+    'C': "Average",
+    'D': "Below Average",
+    'F': "Needs Improvement",
+}
+
+
+def percentage_to_grade(percentage):
+    """Letter grade for a percentage"""
+    return str(_GRADES_ASC[np.searchsorted(_GRADE_CUTS, percentage, side='right')])
+
+
+def grade_points(percentage):
+    """Grade points (4.0 scale) for a percentage"""
+    return float(_POINTS_ASC[np.searchsorted(_GRADE_CUTS, percentage, side='right')])
+
+
+def _percentages(rows):
+    obtained = np.array([float(r.get('marks_obtained') or 0) for r in rows], dtype=np.float64)
+    total = np.array([float(r.get('total_marks') or 0) for r in rows], dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # A mark without a total counts as 0%, as the dashboard always showed it
+        return np.where(total > 0, obtained / np.where(total > 0, total, 1.0) * 100.0, 0.0)
+
+
+def _year(value):
+    if hasattr(value, 'year'):
+        return int(value.year)
+    try:
+        return int(str(value)[:4])
+    except (TypeError, ValueError):
+        return 0
+
+
+class StudentMarksModel:
+    """A student's marks (newest first, as get_student_marks returns them) plus derived arrays."""
+
+    def __init__(self, rows):
+        self.rows = list(rows or [])
+        self.percentages = _percentages(self.rows)
+        self.grade_index = np.searchsorted(_GRADE_CUTS, self.percentages, side='right')
+        self.years = np.array([_year(r.get('exam_date')) for r in self.rows], dtype=np.int64)
+        self.subject_names = np.array([str(r.get('subject_name')) for r in self.rows], dtype=object)
+        self.subject_ids = np.array([r.get('subject_id') or 0 for r in self.rows], dtype=np.int64)
+        self.credits = np.array([int(r.get('credits') or DEFAULT_CREDITS) for r in self.rows], dtype=np.int64)
+        self._subjects = None
+
+    @classmethod
+    def load(cls, db, student_id):
+        """One query for the whole session"""
+        return cls(db.get_student_marks(student_id) or [])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    # ---- filters ----
+
+    def available_years(self):
+        """Exam years present, newest first"""
+        return [int(y) for y in np.unique(self.years[self.years > 0])[::-1]]
+
+    def filter(self, year=None):
+        """Model restricted to one exam year ("All"/None keeps every mark)"""
+        if year in (None, "", "All"):
+            return self
+        return self._subset(self.years == int(year))
+
+    def _subset(self, mask):
+        view = StudentMarksModel.__new__(StudentMarksModel)
+        idx = np.flatnonzero(mask)
+        view.rows = [self.rows[i] for i in idx]
+        for name in ('percentages', 'grade_index', 'years', 'subject_names', 'subject_ids', 'credits'):
+            setattr(view, name, getattr(self, name)[idx])
+        view._subjects = None
+        return view
+
+    # ---- per-mark values ----
+
+    @property
+    def grades(self):
+        return _GRADES_ASC[self.grade_index]
+
+    def average(self):
+        return float(self.percentages.mean()) if len(self) else 0.0
+
+    def best(self):
+        return float(self.percentages.max()) if len(self) else 0.0
+
+    def grade_counts(self):
+        """Mark count per letter grade, in GRADE_ORDER"""
+        counts = np.bincount(self.grade_index, minlength=len(_GRADES_ASC))
+        return [int(c) for c in counts[::-1]]
+
+    def recent(self, n=10):
+        """Latest n marks as (row, percentage, grade, status)"""
+        grades = self.grades
+        return [(self.rows[i], float(self.percentages[i]), str(grades[i]), GRADE_STATUS[str(grades[i])])
+                for i in range(min(n, len(self)))]
+
+    # ---- per-subject values ----
+
+    def subjects(self):
+        """Per-subject groups keyed by (subject_id, subject_name): attempts, average %, credits"""
+        if self._subjects is None:
+            self._subjects = {}
+            if len(self):
+                # subject_name is joined from subject_id, so the id alone identifies the group
+                uniq, first, inverse = np.unique(self.subject_ids, return_index=True, return_inverse=True)
+                counts = np.bincount(inverse, minlength=len(uniq))
+                sums = np.bincount(inverse, self.percentages, minlength=len(uniq))
+                for g, i in enumerate(first):
+                    self._subjects[(int(uniq[g]), str(self.subject_names[i]))] = {
+                        'attempts': int(counts[g]),
+                        'average': float(sums[g] / counts[g]),
+                        'credits': max(int(self.credits[i]), 0),
+                    }
+        return self._subjects
+
+    def subject_attempts(self, limit=10):
+        """(subject_name, attempts) sorted by name"""
+        items = sorted(((name, s['attempts']) for (_, name), s in self.subjects().items()), key=lambda kv: kv[0])
+        return items[:limit]
+
+    def subject_averages(self, limit=10):
+        """(subject_name, average %) best first"""
+        items = sorted(((name, s['average']) for (_, name), s in self.subjects().items()),
+                       key=lambda kv: kv[1], reverse=True)
+        return items[:limit]
+
+    def cgpa(self):
+        """Credits-weighted average of subject grade points.
+
+        CGPA = sum(grade_points(subject_avg) x credits) / sum(credits)
+        """
+        subjects = list(self.subjects().values())
+        if not subjects:
+            return 0.0
+        averages = np.array([s['average'] for s in subjects])
+        credits = np.array([s['credits'] for s in subjects], dtype=np.float64)
+        points = _POINTS_ASC[np.searchsorted(_GRADE_CUTS, averages, side='right')]
+        return float((points * credits).sum() / credits.sum()) if credits.sum() > 0 else 0.0
+
+
+def calculate_gpa(marks):
+    """CGPA for a list of mark rows (see StudentMarksModel.cgpa)"""
+    return StudentMarksModel(marks).cgpa()
@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for load and performance testing.
+
+Builds a school of any size, from 1k up to 10M marks, in its own database
+(default `spms_synthetic`, never the app's unless forced) and bulk-loads
+it. Everything follows from (seed, marks, subjects, years, end_year), so a
+benchmark run at a given scale always sees the same rows.
+
+What it looks like:
+    - about MARKS_PER_STUDENT marks per student, one teacher per student and
+      subject (classes), STUDENTS_PER_TEACHER students per teacher
+    - students take ENROLLED_SUBJECTS subjects, core subjects more often
+    - exams fall in the usual exam periods (Oct, Dec, Mar, May, Jun, ...)
+      on weekdays over the last `years` academic years
+    - percentage = student ability + subject difficulty + teacher effect +
+      the student's yearly trend + noise; totals out of 100, 50 or 20; about
+      1% of marks are "not attended" (NULL)
+
+Loading uses multi-row INSERTs (executemany) or LOAD DATA LOCAL INFILE,
+with explicit ids, in chunks of STUDENT_CHUNK students; afterwards the
+marks cube is rebuilt. synthetic_meta records what was loaded, so
+ensure_dataset() only regenerates when the parameters change. An --append
+run records every batch the schema now holds; such a schema never matches
+a single parameter set, so ensure_dataset() reloads it.
+
+Usage:
+    python synthetic_data.py --scale 100k --seed 7
+    python synthetic_data.py --marks 2.5m --method load-data
+    python synthetic_data.py --scale 1k --append          # add to what is there
+"""
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_DATABASE = "spms_synthetic"
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+MARKS_PER_STUDENT = 40
+STUDENTS_PER_TEACHER = 25
+ENROLLED_SUBJECTS = 8
+STUDENT_CHUNK = 10_000          # part of the seed: changing it changes the marks
+INSERT_BATCH = 5_000            # rows per multi-row INSERT
+DEFAULT_PASSWORD = "password123"
+
+# (month, weight) of the exam periods in an academic year starting in September
+EXAM_PERIODS = [(10, 0.12), (12, 0.22), (2, 0.08), (3, 0.16), (5, 0.17), (6, 0.25)]
+TOTALS = [(100, 0.7), (50, 0.2), (20, 0.1)]
+ABSENT_RATE = 0.01
+GRADE_LEVELS = (9, 10, 11, 12)
+
+FIRST_NAMES = ["Adam", "Amina", "Ben", "Chloe", "Daniel", "Fatima", "Grace", "Hassan", "Ines", "Jack",
+               "Karim", "Lea", "Lucas", "Maya", "Mohamed", "Nora", "Omar", "Sara", "Tom", "Yasmine",
+               "Ali", "Emma", "Hugo", "Lina", "Noah", "Rania", "Samir", "Zoe", "Youssef", "Camille"]
+LAST_NAMES = ["Ahmed", "Benali", "Brown", "Dubois", "Garcia", "Haddad", "Johnson", "Khan", "Lambert",
+              "Martin", "Mansour", "Moreau", "Nguyen", "Petit", "Rahman", "Robert", "Saidi", "Smith",
+              "Taylor", "Wilson", "Bernard", "Chen", "Diallo", "Fournier", "Kaci", "Lopez"]
+CITIES = ["Algiers", "Oran", "Constantine", "Annaba", "Blida", "Setif", "Tlemcen", "Bejaia"]
+QUALIFICATIONS = ["BSc", "MSc", "PhD", "MEd"]
+# Subjects everyone takes more often than electives
+CORE_CODES = {"MATH102", "ENG102", "PHY102", "ARB101", "CHEM101"}
+
+# Core tables, for an empty database (the app's own schema file creates them otherwise)
+CORE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        role ENUM('admin', 'teacher', 'student') NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS teachers (
+        teacher_id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        fullname VARCHAR(100) NOT NULL,
+        email VARCHAR(100),
+        phone VARCHAR(20),
+        department VARCHAR(100),
+        qualification VARCHAR(100),
+        status ENUM('Active', 'Inactive') DEFAULT 'Active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        student_id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        fullname VARCHAR(100) NOT NULL,
+        email VARCHAR(100),
+        phone VARCHAR(20),
+        date_of_birth DATE,
+        gender ENUM('Male', 'Female', 'Other'),
+        address TEXT,
+        status ENUM('Active', 'Inactive') DEFAULT 'Active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subjects (
+        subject_id INT AUTO_INCREMENT PRIMARY KEY,
+        subject_name VARCHAR(100) NOT NULL,
+        subject_code VARCHAR(20) NOT NULL UNIQUE,
+        credits INT DEFAULT 3,
+        description TEXT,
+        teacher_id INT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS marks (
+        mark_id INT AUTO_INCREMENT PRIMARY KEY,
+        student_id INT NOT NULL,
+        subject_id INT NOT NULL,
+        teacher_id INT NOT NULL,
+        marks_obtained DECIMAL(6,2),
+        total_marks DECIMAL(6,2) NOT NULL DEFAULT 100,
+        exam_date DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_marks_student (student_id, exam_date),
+        INDEX idx_marks_teacher (teacher_id),
+        INDEX idx_marks_subject (subject_id),
+        FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE,
+        FOREIGN KEY (subject_id) REFERENCES subjects(subject_id) ON DELETE CASCADE,
+        FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE CASCADE
+    )
+    """,
+]
+
+META_DDL = """
+CREATE TABLE IF NOT EXISTS synthetic_meta (
+    id TINYINT PRIMARY KEY,
+    params_key CHAR(40) NOT NULL,
+    params TEXT NOT NULL,
+    students INT NOT NULL,
+    teachers INT NOT NULL,
+    marks BIGINT NOT NULL,
+    loaded_at DATETIME NOT NULL
+)
+"""
+
+STUDENT_COLUMNS = ("student_id", "user_id", "fullname", "email", "phone", "date_of_birth", "gender",
+                   "address", "status", "grade_level")
+TEACHER_COLUMNS = ("teacher_id", "user_id", "fullname", "email", "phone", "department",
+                   "qualification", "status")
+MARK_COLUMNS = ("mark_id", "student_id", "subject_id", "teacher_id", "marks_obtained", "total_marks",
+                "exam_date", "created_at")
+
+
+def parse_scale(value):
+    """'100k', '1m', '10M' or a plain number -> mark count"""
+    text = str(value).strip().lower().replace("_", "")
+    if text in SCALES:
+        return SCALES[text]
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class SchoolPlan:
+    """The school for one parameter set: people, classes and per-chunk marks.
+
+    subjects is [(subject_id, subject_code, department)] as they exist in the
+    target database; first_ids gives the first free id per table, so the
+    plan can be appended to a database that already holds rows.
+    """
+
+    def __init__(self, n_marks, subjects, seed=42, years=3, end_year=None,
+                 first_ids=None, subjects_per_student=ENROLLED_SUBJECTS):
+        self.n_marks = int(n_marks)
+        self.seed = int(seed)
+        self.years = max(1, int(years))
+        self.end_year = int(end_year or dt.date.today().year)
+        ids = first_ids or {}
+        self.first_user = ids.get("user", 1)
+        self.first_student = ids.get("student", 1)
+        self.first_teacher = ids.get("teacher", 1)
+        self.first_mark = ids.get("mark", 1)
+
+        rng = np.random.default_rng([self.seed, 0])
+        self.subject_ids = np.array([s[0] for s in subjects], dtype=np.int64)
+        self.subject_codes = [s[1] for s in subjects]
+        self.subject_departments = [s[2] for s in subjects]
+        n_subjects = len(self.subject_ids)
+        if not n_subjects:
+            raise ValueError("no subjects to generate marks for")
+
+        self.n_students = max(1, math.ceil(self.n_marks / MARKS_PER_STUDENT))
+        self.n_teachers = max(n_subjects, math.ceil(self.n_students / STUDENTS_PER_TEACHER))
+
+        # Students: ability, yearly trend, profile
+        self.ability = np.clip(rng.normal(68.0, 12.0, self.n_students), 20.0, 98.0)
+        self.trend = rng.normal(0.0, 2.0, self.n_students)
+        self.gender = rng.choice(np.array(["Male", "Female", "Other"]), self.n_students, p=[0.49, 0.49, 0.02])
+        self.grade_level = rng.choice(np.array(GRADE_LEVELS), self.n_students)
+        self.active = rng.random(self.n_students) < 0.92
+        self.first_name = rng.integers(0, len(FIRST_NAMES), self.n_students)
+        self.last_name = rng.integers(0, len(LAST_NAMES), self.n_students)
+        self.birth_offset = rng.integers(0, 365, self.n_students)
+        self.city = rng.integers(0, len(CITIES), self.n_students)
+
+        # Subjects: difficulty and popularity; each student's enrolled set
+        self.difficulty = rng.normal(0.0, 6.0, n_subjects)
+        popularity = np.array([3.0 if code in CORE_CODES else 1.0 for code in self.subject_codes])
+        k = min(subjects_per_student, n_subjects)
+        # Weighted sampling without replacement: top-k of log(u) / weight keys
+        keys = np.log(rng.random((self.n_students, n_subjects))) / popularity
+        self.enrolled = np.argsort(-keys, axis=1)[:, :k]
+
+        # Teachers: one subject each, round robin so every subject has one
+        self.teacher_subject = rng.permutation(np.arange(self.n_teachers) % n_subjects)
+        self.teacher_effect = rng.normal(0.0, 3.0, self.n_teachers)
+        self.teacher_first = rng.integers(0, len(FIRST_NAMES), self.n_teachers)
+        self.teacher_last = rng.integers(0, len(LAST_NAMES), self.n_teachers)
+        self.teacher_qualification = rng.integers(0, len(QUALIFICATIONS), self.n_teachers)
+        by_subject = [np.flatnonzero(self.teacher_subject == s) for s in range(n_subjects)]
+        self.subject_teacher_count = np.array([len(t) for t in by_subject], dtype=np.int64)
+        self.subject_teachers = np.zeros((n_subjects, self.subject_teacher_count.max()), dtype=np.int64)
+        for s, teachers in enumerate(by_subject):
+            self.subject_teachers[s, :len(teachers)] = teachers
+
+        # Exact mark total, spread like Poisson(MARKS_PER_STUDENT) per student
+        self.marks_per_student = rng.multinomial(self.n_marks, np.full(self.n_students, 1.0 / self.n_students))
+
+    # ---- ids ----
+
+    def student_id(self, i):
+        return self.first_student + i
+
+    def teacher_id(self, t):
+        return self.first_teacher + t
+
+    def student_user_id(self, i):
+        return self.first_user + self.n_teachers + i
+
+    def teacher_user_id(self, t):
+        return self.first_user + t
+
+    # ---- rows ----
+
+    def user_rows(self):
+        password = hashlib.sha256(DEFAULT_PASSWORD.encode()).hexdigest()
+        for t in range(self.n_teachers):
+            yield (self.teacher_user_id(t), f"syn_t{self.teacher_id(t)}", password, "teacher")
+        for i in range(self.n_students):
+            yield (self.student_user_id(i), f"syn_s{self.student_id(i)}", password, "student")
+
+    def teacher_rows(self):
+        for t in range(self.n_teachers):
+            first, last = FIRST_NAMES[self.teacher_first[t]], LAST_NAMES[self.teacher_last[t]]
+            tid = self.teacher_id(t)
+            yield (tid, self.teacher_user_id(t), f"{first} {last}", f"{first}.{last}.{tid}@staff.example.edu".lower(),
+                   f"0550{tid % 1000000:06d}", self.subject_departments[self.teacher_subject[t]],
+                   QUALIFICATIONS[self.teacher_qualification[t]], "Active")
+
+    def student_rows(self):
+        for i in range(self.n_students):
+            first, last = FIRST_NAMES[self.first_name[i]], LAST_NAMES[self.last_name[i]]
+            sid = self.student_id(i)
+            grade = int(self.grade_level[i])
+            born = dt.date(self.end_year - grade - 6, 1, 1) + dt.timedelta(days=int(self.birth_offset[i]))
+            yield (sid, self.student_user_id(i), f"{first} {last}", f"{first}.{last}.{sid}@students.example.edu".lower(),
+                   f"0660{sid % 1000000:06d}", born, str(self.gender[i]),
+                   f"{sid % 200 + 1} Rue {LAST_NAMES[(sid * 7) % len(LAST_NAMES)]}, {CITIES[self.city[i]]}",
+                   "Active" if self.active[i] else "Inactive", grade)
+
+    def subject_primary_teachers(self):
+        """(teacher_id, subject_id) for subjects.teacher_id: the subject's first teacher"""
+        return [(self.teacher_id(int(self.subject_teachers[s, 0])), int(self.subject_ids[s]))
+                for s in range(len(self.subject_ids))]
+
+    def mark_chunks(self):
+        """Yield MARK_COLUMNS tuples, STUDENT_CHUNK students at a time (deterministic per chunk)"""
+        next_mark = self.first_mark
+        start_year = self.end_year - self.years  # academic years start_year .. end_year-1
+        periods = np.array([m for m, _ in EXAM_PERIODS])
+        weights = np.array([w for _, w in EXAM_PERIODS])
+        totals = np.array([t for t, _ in TOTALS], dtype=np.float64)
+        total_weights = np.array([w for _, w in TOTALS])
+        for chunk, lo in enumerate(range(0, self.n_students, STUDENT_CHUNK)):
+            hi = min(lo + STUDENT_CHUNK, self.n_students)
+            rng = np.random.default_rng([self.seed, 1, chunk])
+            counts = self.marks_per_student[lo:hi]
+            n = int(counts.sum())
+            if not n:
+                continue
+            student = np.repeat(np.arange(lo, hi), counts)
+            subject = self.enrolled[student, rng.integers(0, self.enrolled.shape[1], n)]
+            # A student keeps one teacher per subject (their class)
+            teacher = self.subject_teachers[subject, student % self.subject_teacher_count[subject]]
+
+            # Exam dates: academic year, exam period, weekday within the month
+            year_index = rng.integers(0, self.years, n)
+            month = periods[rng.choice(len(periods), n, p=weights)]
+            year = start_year + year_index + (month < 9)
+            month_start = ((year - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (month - 1)).astype("datetime64[D]")
+            dates = month_start + rng.integers(0, 28, n)
+            for _ in range(12):  # redraw weekend days (Monday = (days + 3) % 7 == 0)
+                weekend = (dates.astype(np.int64) + 3) % 7 >= 5
+                if not weekend.any():
+                    break
+                dates[weekend] = month_start[weekend] + rng.integers(0, 28, int(weekend.sum()))
+            weekday = (dates.astype(np.int64) + 3) % 7
+            dates = dates + np.where(weekday >= 5, 7 - weekday, 0)
+            created = dates.astype("datetime64[s]") + rng.integers(1, 8, n) * 86400 + rng.integers(8 * 3600, 17 * 3600, n)
+
+            years_in = year_index + (month < 9) * 0.5
+            pct = (self.ability[student] + self.difficulty[subject] + self.teacher_effect[teacher]
+                   + self.trend[student] * (years_in - self.years / 2.0) + rng.normal(0.0, 9.0, n))
+            pct = np.clip(pct, 0.0, 100.0)
+            total = totals[rng.choice(len(totals), n, p=total_weights)]
+            obtained = np.round(pct / 100.0 * total)
+            absent = rng.random(n) < ABSENT_RATE
+
+            order = np.lexsort((student, dates))  # mark ids follow exam dates within a chunk
+            ids = np.arange(next_mark, next_mark + n)
+            next_mark += n
+            student_ids = self.first_student + student[order]
+            subject_ids = self.subject_ids[subject[order]]
+            teacher_ids = self.first_teacher + teacher[order]
+            obtained, total, absent = obtained[order], total[order], absent[order]
+            dates, created = dates[order].tolist(), created[order].tolist()
+            yield [(int(ids[j]), int(student_ids[j]), int(subject_ids[j]), int(teacher_ids[j]),
+                    None if absent[j] else float(obtained[j]), float(total[j]), dates[j], created[j])
+                   for j in range(n)]
+
+
+def _connect(database, local_infile=False):
+    import mysql.connector
+    conn = mysql.connector.connect(host='localhost', user='root', password='', charset='utf8mb4',
+                                   allow_local_infile=local_infile)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARACTER SET utf8mb4 "
+                   "COLLATE utf8mb4_unicode_ci")
+    cursor.execute(f"USE `{database}`")
+    cursor.close()
+    return conn
+
+
+def _scalar(conn, query, params=()):
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def _insert(conn, table, columns, rows):
+    """Multi-row INSERTs of INSERT_BATCH rows, one commit per call"""
+    cursor = conn.cursor()
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    batch, written = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            cursor.executemany(query, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
+        written += len(batch)
+    conn.commit()
+    cursor.close()
+    return written
+
+
+def _load_data(conn, table, columns, rows):
+    """LOAD DATA LOCAL INFILE from a temporary tab-separated file"""
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    written = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for row in rows:
+                f.write("\t".join("\\N" if v is None else str(v).replace("\t", " ") for v in row))
+                f.write("\n")
+                written += 1
+        cursor = conn.cursor()
+        cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                       f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})", (path,))
+        conn.commit()
+        cursor.close()
+    finally:
+        os.remove(path)
+    return written
+
+
+def _prepare(database):
+    """Core tables, then a Database on the target schema (seeds subjects, filter columns, cube)"""
+    conn = _connect(database)
+    cursor = conn.cursor()
+    for ddl in CORE_DDL:
+        cursor.execute(ddl)
+    cursor.execute(META_DDL)
+    cursor.close()
+    conn.close()
+    from database import Database
+    db = Database(database=database, interactive=False)
+    if not db.connection or not db.connection.is_connected():
+        raise RuntimeError(f"cannot connect to '{database}'")
+    return db
+
+
+def _reset(conn):
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ("cube_members", "marks_cube", "marks", "students", "teachers", "synthetic_meta"):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("DELETE FROM users WHERE role <> 'admin'")
+    cursor.execute("UPDATE subjects SET teacher_id = NULL")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cursor.close()
+
+
+def _loaded_meta(conn):
+    """(params, students, teachers, marks) of the synthetic_meta row, or None"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT params, students, teachers, marks FROM synthetic_meta WHERE id = 1")
+    row = cursor.fetchone()
+    cursor.close()
+    return (json.loads(row[0]), int(row[1]), int(row[2]), int(row[3])) if row else None
+
+
+def generate(n_marks, database=DEFAULT_DATABASE, seed=42, years=3, end_year=None, method="insert",
+             reset=True, force=False):
+    """Generate and load a school with n_marks marks. Returns a summary dict.
+
+    With reset=False the rows are added to what is there, and synthetic_meta
+    lists all the batches loaded so far (see loaded_params).
+    """
+    from database import DB_NAME
+    import marks_cube
+    if database == DB_NAME and not force:
+        raise ValueError(f"refusing to load synthetic data into the app database '{database}' (use force)")
+    started = time.perf_counter()
+    db = _prepare(database)
+    conn = _connect(database, local_infile=(method == "load-data"))
+    load = _load_data if method == "load-data" else _insert
+    try:
+        if reset:
+            _reset(conn)
+        previous = None if reset else _loaded_meta(conn)
+        cursor = conn.cursor()
+        cursor.execute("SET unique_checks = 0")
+        cursor.execute("SET foreign_key_checks = 0")
+        cursor.close()
+        subjects = db.execute_query("SELECT subject_id, subject_code, subject_name FROM subjects "
+                                    "ORDER BY subject_id") or []
+        first_ids = {
+            "user": (_scalar(conn, "SELECT MAX(user_id) FROM users") or 0) + 1,
+            "student": (_scalar(conn, "SELECT MAX(student_id) FROM students") or 0) + 1,
+            "teacher": (_scalar(conn, "SELECT MAX(teacher_id) FROM teachers") or 0) + 1,
+            "mark": (_scalar(conn, "SELECT MAX(mark_id) FROM marks") or 0) + 1,
+        }
+        plan = SchoolPlan(n_marks, [(s['subject_id'], s['subject_code'], s['subject_name']) for s in subjects],
+                          seed=seed, years=years, end_year=end_year, first_ids=first_ids)
+
+        load(conn, "users", ("user_id", "username", "password", "role"), plan.user_rows())
+        load(conn, "teachers", TEACHER_COLUMNS, plan.teacher_rows())
+        load(conn, "students", STUDENT_COLUMNS, plan.student_rows())
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE subjects SET teacher_id = %s WHERE subject_id = %s", plan.subject_primary_teachers())
+        conn.commit()
+        cursor.close()
+        print(f"[OK] Loaded {plan.n_teachers} teachers and {plan.n_students} students "
+              f"({time.perf_counter() - started:.1f}s)")
+
+        written = 0
+        for rows in plan.mark_chunks():
+            written += load(conn, "marks", MARK_COLUMNS, rows)
+            rate = written / max(time.perf_counter() - started, 1e-9)
+            print(f"[OK] {written}/{plan.n_marks} marks ({rate:,.0f} rows/s)")
+
+        params = {"marks": plan.n_marks, "seed": plan.seed, "years": plan.years, "end_year": plan.end_year,
+                  "subjects": len(subjects)}
+        contents, totals = params, (plan.n_students, plan.n_teachers, written)
+        if not reset:
+            # Record everything the schema holds now, not just this batch
+            if previous:
+                before, *counts = previous
+                batches = before.get("batches") or [before]
+                totals = tuple(a + b for a, b in zip(counts, totals))
+            else:
+                # Rows loaded some other way, if any, are not described by a batch
+                batches = [{"untracked": True}] if first_ids["mark"] > 1 or first_ids["student"] > 1 else []
+            contents = {"batches": batches + [params]}
+        cursor = conn.cursor()
+        cursor.execute("REPLACE INTO synthetic_meta VALUES (1, %s, %s, %s, %s, %s, %s)",
+                       (params_key(contents), json.dumps(contents, sort_keys=True), *totals,
+                        dt.datetime.now().replace(microsecond=0)))
+        cursor.execute("ANALYZE TABLE marks, students, teachers")
+        cursor.fetchall()
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    marks_cube.rebuild(db)
+    db.close()
+    elapsed = time.perf_counter() - started
+    print(f"[OK] Synthetic dataset '{database}' ready: {written} marks in {elapsed:.1f}s "
+          f"({written / max(elapsed, 1e-9):,.0f} marks/s)")
+    return {"database": database, "students": plan.n_students, "teachers": plan.n_teachers,
+            "marks": written, "seconds": round(elapsed, 2), **params}
+
+
+def loaded_params(database=DEFAULT_DATABASE):
+    """Parameters of the dataset currently in `database`, or None.
+
+    After an --append load this is {"batches": [params, ...]}, one entry per load.
+    """
+    try:
+        conn = _connect(database)
+    except Exception:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(META_DDL)
+        cursor.execute("SELECT params FROM synthetic_meta WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+        return json.loads(row[0]) if row else None
+    finally:
+        conn.close()
+
+
+def ensure_dataset(n_marks, database=DEFAULT_DATABASE, seed=42, years=3, end_year=None, method="insert"):
+    """Load the dataset unless `database` already holds exactly this one (for benchmarks)"""
+    current = loaded_params(database)
+    wanted = {"marks": int(n_marks), "seed": int(seed), "years": int(years),
+              "end_year": int(end_year or dt.date.today().year)}
+    # An appended schema holds more than one batch, so it is never "exactly this one"
+    if current and "batches" not in current and all(current.get(k) == v for k, v in wanted.items()):
+        print(f"[OK] Synthetic dataset '{database}' already loaded ({n_marks} marks, seed {seed})")
+        return current
+    return generate(n_marks, database=database, seed=seed, years=years, end_year=end_year, method=method)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic school for load and performance tests")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", default="10k", help=f"one of {', '.join(SCALES)} (marks)")
+    size.add_argument("--marks", help="exact number of marks, e.g. 250000 or 2.5m")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=3, help="academic years of exams")
+    parser.add_argument("--end-year", type=int, help="last exam year (default: this year)")
+    parser.add_argument("--method", choices=("insert", "load-data"), default="insert")
+    parser.add_argument("--append", action="store_true", help="keep existing rows instead of resetting")
+    parser.add_argument("--force", action="store_true", help="allow loading into the app database")
+    args = parser.parse_args()
+    n_marks = parse_scale(args.marks or args.scale)
+    generate(n_marks, database=args.database, seed=args.seed, years=args.years, end_year=args.end_year,
+             method=args.method, reset=not args.append, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,41 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from database import db
 import datetime
+import queue
+import threading
 from performance_dashboard import PerformanceDashboard
+from startup_profiler import instrument
+from virtual_table import VirtualTable
 
+# How often the marks tab checks the write journal while entries are pending
+JOURNAL_POLL_MS = 1000
+# How often the Tk loop checks whether the add-mark form's lists have loaded
+CHOICES_POLL_MS = 100
+
+@instrument
 class TeacherDashboard:
     def __init__(self, user, teacher_profile):
         self.user = user
         self.teacher_profile = teacher_profile
+        # Feed new marks into the grade predictor's drift summaries
+        try:
+            from drift_monitor import attach_drift_monitor
+            attach_drift_monitor(db)
+        except Exception as e:
+            print(f"[WARN] Drift monitor disabled: {e}")
+        # Mark writes go through the local journal, so entry never waits on (or is lost to) MySQL
+        try:
+            from write_journal import get_journal
+            self.journal = get_journal(db)
+        except Exception as e:
+            print(f"[WARN] Write journal disabled, marks are written directly: {e}")
+            self.journal = None
+        self._journal_polling = False
+        self._mark_rows = []
+        self._form_choices = {}
+        self._choices_results = queue.Queue()
+        self._choices_thread = None
+        self._on_form_choices = None   # refreshes an open add-mark form
         self.root = tk.Tk()
         self.root.title("Teacher Dashboard - Student Performance Monitoring System")
         self.root.geometry("1400x900")
@@ -62,6 +91,9 @@ class TeacherDashboard:
         
         # Load initial data
         self.load_dashboard_data()
+        # Entries left over from an earlier session are replayed now
+        self._watch_journal()
+        self._prefetch_form_choices()
     
     def create_header(self):
         """Create header with title and logout button using grid layout"""
@@ -190,79 +222,50 @@ class TeacherDashboard:
     
     def create_donut_chart(self, parent):
         """Create donut chart for students (gender distribution) using DB"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-            
-            chart_frame = ttk.LabelFrame(parent, text="Students by Gender", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew")
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-            
-            fig, ax = plt.subplots(figsize=(6, 5))
-            fig.patch.set_facecolor('white')
-            
-            # Real data (gender distribution of teacher's students)
-            gd = db.get_teacher_students_gender_counts(self.teacher_profile['teacher_id'])
-            labels = ['Male', 'Female', 'Other']
-            sizes = [gd.get('Male', 0), gd.get('Female', 0), gd.get('Other', 0)]
-            colors = ['#3498db', '#e74c3c', '#95a5a6']
-
-            wedges, texts, autotexts = ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
-                                             startangle=90, pctdistance=0.85)
-            
-            centre_circle = plt.Circle((0,0), 0.70, fc='white')
-            ax.add_artist(centre_circle)
-            
-            ax.set_title('Gender split of your students', 
-                        fontsize=10, pad=20, style='italic')
-            
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-            
-        except ImportError:
+        from charts import DonutChart, matplotlib_available
+        if not matplotlib_available():
             ttk.Label(parent, text="Matplotlib not available for charts", 
                      font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = ttk.LabelFrame(parent, text="Students by Gender", padding="10")
+        chart_frame.grid(row=0, column=0, sticky="nsew")
+        chart_frame.grid_columnconfigure(0, weight=1)
+        chart_frame.grid_rowconfigure(0, weight=1)
+
+        self.gender_chart = DonutChart(chart_frame, figsize=(6, 5), title='Gender split of your students',
+                                       colors=['#3498db', '#e74c3c', '#95a5a6'], hole=0.70,
+                                       pct_format='{:.1f}%',
+                                       title_kw={'fontsize': 10, 'pad': 20, 'style': 'italic'})
+        self.gender_chart.widget.grid(row=0, column=0, sticky="nsew")
+
+    def update_donut_chart(self):
+        # Real data (gender distribution of teacher's students)
+        gd = db.get_teacher_students_gender_counts(self.teacher_profile['teacher_id'])
+        labels = ['Male', 'Female', 'Other']
+        self.gender_chart.update(labels, [gd.get(label, 0) for label in labels])
     
     def create_bar_chart(self, parent):
         """Create bar chart of average percentage by subject using DB"""
-        try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-            
-            chart_frame = ttk.LabelFrame(parent, text="Average Percentage by Subject", padding="10")
-            chart_frame.grid(row=0, column=0, sticky="nsew")
-            chart_frame.grid_columnconfigure(0, weight=1)
-            chart_frame.grid_rowconfigure(0, weight=1)
-            
-            fig, ax = plt.subplots(figsize=(6, 5))
-            fig.patch.set_facecolor('white')
-            
-            # Real data
-            rows = db.get_teacher_subject_average_percentages(self.teacher_profile['teacher_id'])
-            subjects = [r['subject_name'] for r in rows] or ['No Data']
-            averages = [round(float(r.get('avg_pct') or 0), 1) for r in rows] or [0.0]
-            x = np.arange(len(subjects))
-            bars = ax.bar(x, averages, color='#3498db')
-            ax.set_xlabel('Subjects')
-            ax.set_ylabel('Average %')
-            ax.set_title('Your subjects - average percentage')
-            ax.set_xticks(x)
-            ax.set_xticklabels(subjects, rotation=0)
-            ax.set_ylim(0, 100)
-            
-            plt.tight_layout()
-            
-            canvas = FigureCanvasTkAgg(fig, chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-            
-        except ImportError:
+        from charts import BarChart, matplotlib_available
+        if not matplotlib_available():
             ttk.Label(parent, text="Matplotlib not available for charts", 
                      font=("Arial", 12)).grid(row=0, column=0, sticky="nsew")
+            return
+        chart_frame = ttk.LabelFrame(parent, text="Average Percentage by Subject", padding="10")
+        chart_frame.grid(row=0, column=0, sticky="nsew")
+        chart_frame.grid_columnconfigure(0, weight=1)
+        chart_frame.grid_rowconfigure(0, weight=1)
+
+        self.subject_avg_chart = BarChart(chart_frame, figsize=(6, 5), title='Your subjects - average percentage',
+                                          xlabel='Subjects', ylabel='Average %', colors=['#3498db'])
+        self.subject_avg_chart.widget.grid(row=0, column=0, sticky="nsew")
+
+    def update_bar_chart(self):
+        # Real data
+        rows = db.get_teacher_subject_average_percentages(self.teacher_profile['teacher_id'])
+        subjects = [r['subject_name'] for r in rows] or ['No Data']
+        averages = [round(float(r.get('avg_pct') or 0), 1) for r in rows] or [0.0]
+        self.subject_avg_chart.update(subjects, averages)
     
     def create_students_tab(self):
         """Create students tab using grid layout"""
@@ -279,21 +282,10 @@ class TeacherDashboard:
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
         
-        # Create Treeview
+        # Virtualized table: only the visible rows are Treeview items
         columns = ('ID', 'Name', 'Email', 'Phone', 'Gender', 'Status')
-        self.students_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
-        
-        # Define headings
-        for col in columns:
-            self.students_tree.heading(col, text=col)
-            self.students_tree.column(col, width=120)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=scrollbar.set)
-        
+        self.students_tree = VirtualTable(table_frame, columns, height=15)
         self.students_tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
         
         # Load sample data
         self.load_students()
@@ -316,6 +308,10 @@ class TeacherDashboard:
         actions_frame.grid_columnconfigure(2, weight=0)
         actions_frame.grid_columnconfigure(3, weight=0)
         
+        # Pending journal entries / offline notice
+        self.journal_label = ttk.Label(actions_frame, text="")
+        self.journal_label.grid(row=0, column=0, padx=5, sticky="w")
+        
         ttk.Button(actions_frame, text="Add Mark", 
                   command=self.add_mark).grid(row=0, column=1, padx=5)
         ttk.Button(actions_frame, text="Edit Mark", 
@@ -329,21 +325,11 @@ class TeacherDashboard:
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
         
-        # Create Treeview
+        # Virtualized table keyed by mark_id; percentage stays numeric so it sorts
         columns = ('Student', 'Subject', 'Exam Type', 'Marks', 'Total', 'Percentage', 'Date')
-        self.marks_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
-        
-        # Define headings
-        for col in columns:
-            self.marks_tree.heading(col, text=col)
-            self.marks_tree.column(col, width=100)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.marks_tree.yview)
-        self.marks_tree.configure(yscrollcommand=scrollbar.set)
-        
+        self.marks_tree = VirtualTable(table_frame, columns, height=15, widths=(100,) * len(columns),
+                                       formatters={5: lambda p: f"{p}%"})
         self.marks_tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
         
         # Load sample data
         self.load_marks()
@@ -356,30 +342,65 @@ class TeacherDashboard:
             self.student_count_label.config(text=str(len(students)))
         except Exception:
             self.student_count_label.config(text="0")
+        # Charts update their existing figures in place
+        if getattr(self, 'gender_chart', None) is not None:
+            self.update_donut_chart()
+        if getattr(self, 'subject_avg_chart', None) is not None:
+            self.update_bar_chart()
     
     def load_students(self):
         """Load students data"""
-        # Clear existing items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
         # Load students taught by this teacher (distinct based on marks)
-        students = db.get_teacher_students(self.teacher_profile['teacher_id'])
-        for student in students:
-            self.students_tree.insert('', 'end', values=(
-                student['student_id'],
-                student['fullname'],
-                student['email'],
-                student['phone'],
-                student['gender'],
-                student['status']
-            ))
+        students = db.get_teacher_students(self.teacher_profile['teacher_id']) or []
+        self.students_tree.set_rows([(
+            student['student_id'],
+            student['fullname'],
+            student['email'],
+            student['phone'],
+            student['gender'],
+            student['status']
+        ) for student in students], keys=[student['student_id'] for student in students])
     
     def load_marks(self):
         """Load marks for this teacher from DB"""
-        for item in self.marks_tree.get_children():
-            self.marks_tree.delete(item)
         rows = db.get_marks_for_teacher(self.teacher_profile['teacher_id'])
+        # Keep showing the last good list (plus pending writes) while the DB is unreachable
+        if rows is not None:
+            self._mark_rows = rows
+        self.render_marks()
+    
+    def _pending_writes(self):
+        if self.journal is None:
+            return []
+        try:
+            return self.journal.pending()
+        except Exception as e:
+            print(f"[WARN] Could not read the write journal: {e}")
+            return []
+    
+    def render_marks(self):
+        """Fill the marks table: loaded rows with pending journal writes applied on top"""
+        rows = [dict(r) for r in self._mark_rows]
+        by_id = {r['mark_id']: r for r in rows}
+        for entry in self._pending_writes():
+            p = entry['params']
+            if entry['op'] == 'add' and p.get('teacher_id') == self.teacher_profile['teacher_id']:
+                rows.append({
+                    'mark_id': f"pending:{entry['key']}",
+                    'student_name': f"{p.get('student_name', p['student_id'])} (pending)",
+                    'subject_name': p.get('subject_name', p['subject_id']),
+                    'marks_obtained': p['marks_obtained'],
+                    'total_marks': p['total_marks'],
+                    'exam_date': p['exam_date'],
+                })
+            elif entry['op'] == 'update' and p['mark_id'] in by_id:
+                r = by_id[p['mark_id']]
+                r.update(marks_obtained=p['marks_obtained'], total_marks=p['total_marks'], exam_date=p['exam_date'])
+                if not str(r['student_name']).endswith(' (pending)'):
+                    r['student_name'] = f"{r['student_name']} (pending)"
+            elif entry['op'] == 'delete' and p['mark_id'] in by_id:
+                rows.remove(by_id.pop(p['mark_id']))
+        table = []
         for r in rows:
             percent = 0
             try:
@@ -388,16 +409,111 @@ class TeacherDashboard:
             except Exception:
                 percent = 0
             date_str = r['exam_date'].strftime('%Y-%m-%d') if hasattr(r['exam_date'], 'strftime') else (r['exam_date'] or '')
-            self.marks_tree.insert('', 'end', iid=str(r['mark_id']), values=(
+            table.append((
                 r['student_name'],
                 r['subject_name'],
                 '',  # exam type not modeled
                 r['marks_obtained'],
                 r['total_marks'],
-                f"{percent}%",
+                percent,
                 date_str,
             ))
+        # Rows are keyed by mark_id so edits and deletes can find them
+        self.marks_tree.set_rows(table, keys=[r['mark_id'] for r in rows])
+        self.update_journal_label()
+    
+    def update_journal_label(self):
+        if self.journal is None:
+            return
+        try:
+            pending = self.journal.pending_count()
+        except Exception:
+            return
+        if not pending:
+            self.journal_label.config(text="")
+        elif self.journal.online is False:
+            self.journal_label.config(text=f"Database unreachable - {pending} change(s) saved locally, will sync")
+        else:
+            self.journal_label.config(text=f"Syncing {pending} change(s)...")
+    
+    def _watch_journal(self):
+        if self.journal is not None and not self._journal_polling:
+            self._journal_polling = True
+            self.root.after(JOURNAL_POLL_MS, self._poll_journal)
+    
+    def _poll_journal(self):
+        """Tk-side: reload once journal entries reach the DB; keep polling while any are pending"""
+        try:
+            applied, rejected = self.journal.dispatch()
+        except Exception as e:
+            print(f"[WARN] Journal dispatch failed: {e}")
+            applied, rejected = [], []
+        if applied or rejected:
+            self.load_marks()
+            self.load_dashboard_data()
+        else:
+            self.update_journal_label()
+        for key, op, params, error in rejected:
+            messagebox.showerror("Error", f"A mark change ({op}) could not be saved: {error}.\n\n"
+                                 f"Details: {params}")
+            self.journal.discard(key)
+        if self.journal.pending_count():
+            self.root.after(JOURNAL_POLL_MS, self._poll_journal)
+        else:
+            self._journal_polling = False
+    
+    def _write_mark(self, submit_journal, write_direct):
+        """Journal the write (instant, survives outages) or, without a journal, write directly"""
+        if self.journal is None:
+            return write_direct()
+        try:
+            submit_journal(self.journal)
+        except Exception as e:
+            print(f"[ERROR] Could not journal mark write: {e}")
+            return write_direct()
+        self._watch_journal()
+        return True
+    
+    def _saved_message(self, done):
+        if self.journal is not None and self.journal.online is False:
+            return "Database unreachable. The change is saved on this computer and will be synced automatically."
+        return done
     
+    def _prefetch_form_choices(self):
+        """Load the add-mark form's student and subject lists on a worker thread"""
+        if self._choices_thread is not None and self._choices_thread.is_alive():
+            return
+        self._choices_thread = threading.Thread(target=self._fetch_form_choices, name="form-choices", daemon=True)
+        self._choices_thread.start()
+        self.root.after(CHOICES_POLL_MS, self._poll_form_choices)
+
+    def _fetch_form_choices(self):
+        # A connection of its own: during an outage this fails quietly instead of
+        # reconnecting the shared one (and its error dialogs) on the Tk thread
+        try:
+            conn = db.open_connection()
+            try:
+                choices = {'students': db.get_all_students(conn),
+                           'subjects': db.get_teacher_subjects(self.teacher_profile['teacher_id'], conn)}
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"[WARN] Could not load students and subjects for the mark form: {e}")
+            choices = None
+        self._choices_results.put(choices)
+
+    def _poll_form_choices(self):
+        try:
+            choices = self._choices_results.get_nowait()
+        except queue.Empty:
+            self.root.after(CHOICES_POLL_MS, self._poll_form_choices)
+            return
+        # Keep the last good lists when the database was unreachable
+        if choices is not None:
+            self._form_choices.update(choices)
+            if self._on_form_choices is not None:
+                self._on_form_choices()
+
     def add_mark(self):
         """Add new mark"""
         form = tk.Toplevel(self.root)
@@ -412,20 +528,34 @@ class TeacherDashboard:
             return 1
 
         # Student selection
-        students = db.get_all_students() or []
-        student_map = { f"{s['student_id']} - {s['fullname']}": s['student_id'] for s in students }
+        student_map = {}
         student_var = tk.StringVar()
-        student_combo = ttk.Combobox(form, textvariable=student_var, values=list(student_map.keys()), width=28, state='readonly')
+        student_combo = ttk.Combobox(form, textvariable=student_var, values=[], width=28, state='readonly')
         row += add_row("Student", student_combo)
 
         # Subject selection (for this teacher) - names only, allow typing
-        subjects = db.get_teacher_subjects(self.teacher_profile['teacher_id'])
         # Map subject name -> id for resolution on submit
-        subject_map = { str(sub['subject_name']): sub['subject_id'] for sub in subjects }
+        subject_map = {}
         subject_var = tk.StringVar()
-        subject_combo = ttk.Combobox(form, textvariable=subject_var, values=list(subject_map.keys()), width=28, state='normal')
+        subject_combo = ttk.Combobox(form, textvariable=subject_var, values=[], width=28, state='normal')
         row += add_row("Subject", subject_combo)
 
+        # Lists come from the background prefetch (never a query on the Tk thread);
+        # a fresh copy is requested now and fills the combos when it arrives
+        def fill_choices():
+            student_map.clear()
+            student_map.update({f"{s['student_id']} - {s['fullname']}": s['student_id']
+                                for s in self._form_choices.get('students') or []})
+            subject_map.clear()
+            subject_map.update({str(sub['subject_name']): sub['subject_id']
+                                for sub in self._form_choices.get('subjects') or []})
+            student_combo.configure(values=list(student_map.keys()))
+            subject_combo.configure(values=list(subject_map.keys()))
+        fill_choices()
+        self._on_form_choices = fill_choices
+        form.bind('<Destroy>', lambda e: setattr(self, '_on_form_choices', None) if e.widget is form else None)
+        self._prefetch_form_choices()
+
         marks_var = tk.StringVar()
         total_var = tk.StringVar()
         today_str = datetime.date.today().strftime('%Y-%m-%d')
@@ -572,18 +702,20 @@ class TeacherDashboard:
                 elif exam_date[4] in ('-', '/') and exam_date[7] in ('-', '/'):
                     # YYYY-MM-DD or YYYY/MM/DD -> normalize hyphens
                     exam_date = exam_date.replace('/', '-')
-            ok = db.add_mark(
-                student_id,
-                subject_id,
-                self.teacher_profile['teacher_id'],
-                marks,
-                total,
-                exam_date,
+            teacher_id = self.teacher_profile['teacher_id']
+            student_name = student_key.split(' - ', 1)[1] if ' - ' in student_key else student_key
+            ok = self._write_mark(
+                lambda journal: journal.submit_add(student_id, subject_id, teacher_id, marks, total, exam_date,
+                                                   labels={'student_name': student_name, 'subject_name': subject_key}),
+                lambda: db.add_mark(student_id, subject_id, teacher_id, marks, total, exam_date),
             )
             if ok:
-                messagebox.showinfo("Success", "Mark added successfully.", parent=form)
-                self.load_marks()
-                self.load_dashboard_data()
+                messagebox.showinfo("Success", self._saved_message("Mark added successfully."), parent=form)
+                if self.journal is None:
+                    self.load_marks()
+                    self.load_dashboard_data()
+                else:
+                    self.render_marks()
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to add mark.", parent=form)
@@ -595,15 +727,16 @@ class TeacherDashboard:
     
     def edit_mark(self):
         """Edit selected mark"""
-        selection = self.marks_tree.selection()
-        if not selection:
+        values = self.marks_tree.selected_row()
+        if not values:
             messagebox.showwarning("Warning", "Please select a mark to edit")
             return
-        iid = selection[0]
-        values = self.marks_tree.item(iid)['values']
-        # We need mark_id; store it in iid when loading. If iid is not numeric, editing can't proceed.
+        if str(self.marks_tree.selected_key()).startswith('pending:'):
+            messagebox.showinfo("Pending", "This mark is still being saved. Edit it once it has synced.")
+            return
+        # mark_id is the row key set in load_marks
         try:
-            mark_id = int(iid)
+            mark_id = int(self.marks_tree.selected_key())
         except Exception:
             messagebox.showerror("Error", "Cannot edit this mark (missing identifier).")
             return
@@ -671,16 +804,19 @@ class TeacherDashboard:
                 elif exam_date[4] in ('-', '/') and exam_date[7] in ('-', '/'):
                     # YYYY-MM-DD or YYYY/MM/DD -> normalize separators
                     exam_date = exam_date.replace('/', '-')
-            if db.update_mark(mark_id, marks, total, exam_date):
-                messagebox.showinfo("Success", "Mark updated successfully.", parent=form)
-                self.load_marks()
+            ok = self._write_mark(
+                lambda journal: journal.submit_update(mark_id, marks, total, exam_date),
+                lambda: db.update_mark(mark_id, marks, total, exam_date),
+            )
+            if ok:
+                messagebox.showinfo("Success", self._saved_message("Mark updated successfully."), parent=form)
+                if self.journal is None:
+                    self.load_marks()
+                    self.load_dashboard_data()
+                else:
+                    self.render_marks()
                 # Reselect updated row for user feedback
-                try:
-                    self.marks_tree.selection_set(str(mark_id))
-                    self.marks_tree.see(str(mark_id))
-                except Exception:
-                    pass
-                self.load_dashboard_data()
+                self.marks_tree.select_key(mark_id)
                 form.destroy()
             else:
                 messagebox.showerror("Error", "Failed to update mark.", parent=form)
@@ -692,21 +828,29 @@ class TeacherDashboard:
     
     def delete_mark(self):
         """Delete selected mark"""
-        selection = self.marks_tree.selection()
-        if not selection:
+        if not self.marks_tree.selected_row():
             messagebox.showwarning("Warning", "Please select a mark to delete")
             return
-        iid = selection[0]
+        if str(self.marks_tree.selected_key()).startswith('pending:'):
+            messagebox.showinfo("Pending", "This mark is still being saved. Delete it once it has synced.")
+            return
         try:
-            mark_id = int(iid)
+            mark_id = int(self.marks_tree.selected_key())
         except Exception:
             messagebox.showerror("Error", "Cannot delete this mark (missing identifier).")
             return
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this mark?"):
-            if db.delete_mark(mark_id):
-                messagebox.showinfo("Success", "Mark deleted successfully")
-                self.load_marks()
-                self.load_dashboard_data()
+            ok = self._write_mark(
+                lambda journal: journal.submit_delete(mark_id),
+                lambda: db.delete_mark(mark_id),
+            )
+            if ok:
+                messagebox.showinfo("Success", self._saved_message("Mark deleted successfully"))
+                if self.journal is None:
+                    self.load_marks()
+                    self.load_dashboard_data()
+                else:
+                    self.render_marks()
             else:
                 messagebox.showerror("Error", "Failed to delete mark")
     
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Virtualized table for large lists (students, teachers, marks).
+
+VirtualTable looks like the ttk.Treeview tables it replaces, but the
+Treeview only ever holds the rows that fit on screen. The full data stays
+in a plain list of row tuples (the backing array); scrolling re-fills the
+visible items from a slice of it. Sorting and filtering reorder a list of
+row indices, so a 50k-row table costs one Treeview item per visible line.
+
+Selection is tracked by backing-row index rather than Treeview item, so
+it survives scrolling, sorting and filtering.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+_DEFAULT_ROW_HEIGHT = 20
+
+
+def _sort_key(value):
+    # None sorts first; numbers before text so mixed columns never raise
+    if value is None or value == "":
+        return (0, 0, "")
+    if isinstance(value, (int, float)):
+        return (1, value, "")
+    return (2, 0, str(value).lower())
+
+
+class VirtualTable:
+    """Windowed Treeview over a list of row tuples.
+
+    on_select(row) is called with the selected row tuple (or None) after
+    a click or keyboard move. Column headings sort by that column; a
+    second click reverses the order.
+    """
+
+    def __init__(self, parent, columns, height=15, widths=None, on_select=None, formatters=None):
+        self.columns = tuple(columns)
+        self.on_select = on_select
+        self.formatters = formatters or {}
+        self.frame = ttk.Frame(parent)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.tree = ttk.Treeview(self.frame, columns=self.columns, show='headings',
+                                 height=height, selectmode='none')
+        for i, col in enumerate(self.columns):
+            self.tree.heading(col, text=col, command=lambda c=i: self.sort_by(c))
+            self.tree.column(col, width=(widths[i] if widths else 120))
+        self.tree.tag_configure('selected', background='#3498db', foreground='white')
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.rows = []          # backing array
+        self.keys = None        # optional id per row (e.g. mark_id)
+        self.view = []          # indices into rows, after filter and sort
+        self.top = 0            # first visible position in view
+        self.visible = height   # rows that fit; recomputed on resize
+        self._selected = None   # backing index
+        self._sort = None       # (column, descending)
+        self._filter = None
+
+        self.tree.bind('<Button-1>', self._on_click)
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_units(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_units(3))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self._scroll_units(-self.visible))
+        self.tree.bind('<Next>', lambda e: self._scroll_units(self.visible))
+
+    # ---- layout passthrough ----
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # ---- data ----
+
+    def set_rows(self, rows, keys=None):
+        """Replace the backing array; keeps the sort, filter and (by key) the selection."""
+        selected_key = self.selected_key()
+        self.rows = [tuple(r) for r in rows]
+        self.keys = list(keys) if keys is not None else None
+        self._selected = None
+        if selected_key is not None and self.keys is not None:
+            self._selected = self._index_of_key(selected_key)
+        self._rebuild_view()
+
+    def set_filter(self, predicate=None):
+        """Show only rows where predicate(row) is true (None shows all)."""
+        self._filter = predicate
+        self._rebuild_view()
+
+    def set_view(self, indices):
+        """Show exactly these backing indices, in this order (e.g. ranked search hits)."""
+        self._filter = None
+        self._sort = None
+        self.view = list(indices)
+        self._reset_scroll()
+
+    def sort_by(self, column, descending=None):
+        if descending is None:
+            descending = bool(self._sort and self._sort[0] == column and not self._sort[1])
+        self._sort = (column, descending)
+        self._apply_sort()
+        self._reset_scroll()
+
+    def _rebuild_view(self):
+        if self._filter is None:
+            self.view = list(range(len(self.rows)))
+        else:
+            self.view = [i for i, row in enumerate(self.rows) if self._filter(row)]
+        self._apply_sort()
+        self._reset_scroll()
+
+    def _apply_sort(self):
+        if self._sort is None:
+            return
+        column, descending = self._sort
+        rows = self.rows
+        self.view.sort(key=lambda i: _sort_key(rows[i][column]), reverse=descending)
+        for i, col in enumerate(self.columns):
+            arrow = (" ▼" if descending else " ▲") if i == column else ""
+            self.tree.heading(col, text=col + arrow)
+
+    def _reset_scroll(self):
+        self.top = 0
+        self.render()
+
+    # ---- selection ----
+
+    def selected_index(self):
+        return self._selected
+
+    def selected_row(self):
+        return self.rows[self._selected] if self._selected is not None else None
+
+    def selected_key(self):
+        if self._selected is None or self.keys is None:
+            return None
+        return self.keys[self._selected]
+
+    def select_key(self, key):
+        """Select the row with this key and scroll it into view."""
+        index = self._index_of_key(key)
+        if index is not None:
+            self._select(index)
+            self.see(index)
+
+    def clear_selection(self):
+        self._select(None)
+
+    def _index_of_key(self, key):
+        try:
+            return self.keys.index(key)
+        except (AttributeError, ValueError):
+            return None
+
+    def _select(self, index, notify=True):
+        self._selected = index
+        self.render()
+        if notify and self.on_select:
+            self.on_select(self.selected_row())
+
+    def see(self, index):
+        try:
+            pos = self.view.index(index)
+        except ValueError:
+            return
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + self.visible:
+            self.top = pos - self.visible + 1
+        self.render()
+
+    # ---- rendering ----
+
+    def _format(self, row):
+        if not self.formatters:
+            return ['' if v is None else v for v in row]
+        return ['' if v is None else self.formatters.get(c, lambda x: x)(v) for c, v in enumerate(row)]
+
+    def render(self):
+        """Refill the visible Treeview items from the current window of the view."""
+        n = len(self.view)
+        self.top = max(0, min(self.top, n - self.visible))
+        window = self.view[self.top:self.top + self.visible]
+        items = self.tree.get_children()
+        # Items are reused: only the count of visible lines is ever created or deleted
+        for iid in items[len(window):]:
+            self.tree.delete(iid)
+        for slot, index in enumerate(window):
+            values = self._format(self.rows[index])
+            tags = ('selected',) if index == self._selected else ()
+            if slot < len(items):
+                self.tree.item(items[slot], values=values, tags=tags)
+            else:
+                self.tree.insert('', 'end', iid=f"slot{slot}", values=values, tags=tags)
+        if n:
+            self.scrollbar.set(self.top / n, min(1.0, (self.top + self.visible) / n))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style().lookup('Treeview', 'rowheight') or _DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            return _DEFAULT_ROW_HEIGHT
+
+    def _on_resize(self, event):
+        # Heading takes about one row; leave it out of the window
+        fits = max(1, event.height // self._row_height() - 1)
+        if fits != self.visible:
+            self.visible = fits
+            self.render()
+
+    # ---- scrolling and input ----
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.view))
+            self.render()
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.visible if args[2] == 'pages' else 1)
+            self._scroll_units(step)
+
+    def _scroll_units(self, step):
+        self.top += step
+        self.render()
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_units(-3 if event.delta > 0 else 3)
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) == 'heading':
+            return None  # let the heading command sort
+        item = self.tree.identify_row(event.y)
+        if item:
+            slot = self.tree.index(item)
+            if self.top + slot < len(self.view):
+                self.tree.focus_set()
+                self._select(self.view[self.top + slot])
+        return "break"
+
+    def _move_selection(self, step):
+        if not self.view:
+            return "break"
+        try:
+            pos = self.view.index(self._selected) + step
+        except ValueError:
+            pos = self.top
+        pos = max(0, min(pos, len(self.view) - 1))
+        self._select(self.view[pos])
+        self.see(self.view[pos])
+        return "break"
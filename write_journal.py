@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Write-ahead journal for mark entry.
+
+Teacher mark writes (add, update, delete) are appended to a local SQLite
+journal and committed to disk before the dashboard returns, so an entry
+is never lost when MySQL is slow or down. A background thread replays the
+journal in order, in batches, on a Database (connection) of its own:
+consecutive new marks go in as one multi-row transaction, and replay
+stops at the first failure so later writes never overtake earlier ones.
+
+Every entry carries a UUID idempotency key. New marks store it in
+marks.idempotency_key, so replaying a batch whose acknowledgement was
+lost (crash, dropped connection) does not insert them twice; updates set
+absolute values and deletes of a missing row do nothing, so both are safe
+to repeat.
+
+While the server is unreachable the thread backs off (1s doubling to 30s)
+without counting attempts. Lock wait timeouts, deadlocks and other
+transient errors are retried the same way for as long as they last. Only
+an entry the server refuses for good (a constraint or data error, e.g. its
+student was deleted) is set aside as rejected after MAX_ATTEMPTS and
+reported to the dashboard.
+
+Usage:
+    python write_journal.py            # list pending and rejected entries
+    python write_journal.py --replay   # replay them now and exit
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_DIR = os.environ.get("SPMS_JOURNAL_DIR", os.path.join(HERE, "journal"))
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+MIN_BACKOFF_S = 1.0
+MAX_BACKOFF_S = 30.0
+
+# Refusals a replay cannot fix; any other failure is retried without limit
+PERMANENT_ERRNOS = {
+    1048,        # ER_BAD_NULL_ERROR
+    1062,        # ER_DUP_ENTRY
+    1216, 1217,  # ER_NO_REFERENCED_ROW, ER_ROW_IS_REFERENCED
+    1264,        # ER_WARN_DATA_OUT_OF_RANGE
+    1292, 1366,  # ER_TRUNCATED_WRONG_VALUE(_FOR_FIELD), e.g. a bad date
+    1406,        # ER_DATA_TOO_LONG
+    1451, 1452,  # ER_ROW_IS_REFERENCED_2, ER_NO_REFERENCED_ROW_2
+    3819,        # ER_CHECK_CONSTRAINT_VIOLATED
+}
+
+JOURNAL_DDL = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    op TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    rejected INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def journal_path(database):
+    return os.path.join(JOURNAL_DIR, f"{database}.sqlite")
+
+
+def _add_row(entry):
+    """Database.add_marks row for an 'add' entry"""
+    p = entry["params"]
+    return (entry["key"], p["student_id"], p["subject_id"], p["teacher_id"],
+            p["marks_obtained"], p["total_marks"], p["exam_date"])
+
+
+def _drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+
+class WriteJournal:
+    """Durable queue of mark writes with a replay thread.
+
+    submit_* return the entry's idempotency key as soon as it is on disk.
+    Tk code calls dispatch() from its own thread to pick up what was
+    applied; mark listeners of `source` (prediction cache, drift monitor)
+    run there, since they use the shared connection.
+    """
+
+    def __init__(self, source, path=None):
+        self.source = source
+        self.database = source.database
+        self.path = path or journal_path(self.database)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = self._open()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._applied = queue.Queue()    # keys of applied entries
+        self._students = queue.Queue()   # students whose marks the replay changed
+        self._rejected = queue.Queue()   # (key, op, params, error)
+        self._db = None
+        self._online = None
+        self._thread = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # WAL keeps appends cheap; FULL makes each commit durable before submit returns
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(JOURNAL_DDL)
+        return conn
+
+    # ---- writing (any thread) ----
+
+    def _append(self, op, params):
+        key = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending_writes (idempotency_key, op, params, created_at) VALUES (?, ?, ?, ?)",
+                (key, op, json.dumps(params, default=str),
+                 dt.datetime.now().replace(microsecond=0).isoformat()))
+        self._wake.set()
+        return key
+
+    def submit_add(self, student_id, subject_id, teacher_id, marks_obtained, total_marks, exam_date, labels=None):
+        """labels (e.g. student_name, subject_name) are kept for display only"""
+        return self._append("add", {
+            **(labels or {}),
+            "student_id": student_id, "subject_id": subject_id, "teacher_id": teacher_id,
+            "marks_obtained": marks_obtained, "total_marks": total_marks, "exam_date": str(exam_date),
+        })
+
+    def submit_update(self, mark_id, marks_obtained, total_marks, exam_date):
+        return self._append("update", {
+            "mark_id": mark_id, "marks_obtained": marks_obtained, "total_marks": total_marks,
+            "exam_date": str(exam_date),
+        })
+
+    def submit_delete(self, mark_id):
+        return self._append("delete", {"mark_id": mark_id})
+
+    # ---- reading ----
+
+    def _entries(self, where, params=(), limit=None):
+        sql = f"SELECT seq, idempotency_key, op, params, attempts, last_error FROM pending_writes WHERE {where} ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{"seq": r[0], "key": r[1], "op": r[2], "params": json.loads(r[3]),
+                 "attempts": r[4], "last_error": r[5]} for r in rows]
+
+    def pending(self):
+        """Entries not yet applied, oldest first"""
+        return self._entries("rejected = 0")
+
+    def rejected(self):
+        return self._entries("rejected = 1")
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_writes WHERE rejected = 0").fetchone()[0]
+
+    @property
+    def online(self):
+        """True/False once the replay thread has tried the server, None before"""
+        return self._online
+
+    def discard(self, key):
+        """Drop a rejected entry the user has seen"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_writes WHERE idempotency_key = ? AND rejected = 1", (key,))
+
+    def dispatch(self):
+        """Tk thread: notify mark listeners for applied entries.
+
+        Returns (applied keys, rejected entries) since the last call.
+        """
+        keys, students, rejected = _drain(self._applied), _drain(self._students), _drain(self._rejected)
+        for student_id in dict.fromkeys(s for s in students if s is not None):
+            self.source._notify_mark_change(student_id)
+        return keys, rejected
+
+    # ---- replay ----
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-journal", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _run(self):
+        backoff = MIN_BACKOFF_S
+        while not self._stop.is_set():
+            # Cleared before reading the journal, so a submit during the replay wakes the next one
+            self._wake.clear()
+            try:
+                done = self.replay_once()
+            except Exception as e:
+                print(f"[ERROR] Journal replay failed: {e}")
+                done = False
+            if done:
+                backoff = MIN_BACKOFF_S
+                self._wake.wait()
+            else:
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_S)
+
+    def _replay_db(self):
+        if self._db is None:
+            from database import Database
+            db = Database(database=self.database, interactive=False)
+            # Collected here, passed on to the source's listeners by dispatch()
+            db.add_mark_listener(self._students.put)
+            self._db = db
+        return self._db
+
+    def _connected(self, db):
+        try:
+            return bool(db.connection) and db.connection.is_connected()
+        except Exception:
+            return False
+
+    def _refused(self, db):
+        """True if the last write failed with an error replaying cannot fix"""
+        return getattr(db, "last_errno", None) in PERMANENT_ERRNOS
+
+    def replay_once(self):
+        """Apply pending entries in order until the journal is empty or a write fails.
+
+        Returns True when nothing is left to replay.
+        """
+        while not self._stop.is_set():
+            batch = self._entries("rejected = 0", limit=BATCH_SIZE)
+            if not batch:
+                return True
+            db = self._replay_db()
+            if not self._connected(db):
+                db._ensure_connected()
+            self._online = self._connected(db)
+            if not self._online:
+                return False
+            applied, failed = self._apply(db, batch)
+            if applied:
+                with self._lock:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("DELETE FROM pending_writes WHERE seq = ?",
+                                           [(e["seq"],) for e in applied])
+                    self._conn.execute("COMMIT")
+                for e in applied:
+                    self._applied.put(e["key"])
+            if failed is not None:
+                self._fail(db, failed)
+                return False
+        return False
+
+    def _apply(self, db, batch):
+        """Apply entries in order; returns (applied entries, first failed entry or None)"""
+        applied = []
+        i = 0
+        while i < len(batch):
+            entry = batch[i]
+            if entry["op"] == "add":
+                # A run of new marks is one multi-row transaction
+                run = [entry]
+                while i + len(run) < len(batch) and batch[i + len(run)]["op"] == "add":
+                    run.append(batch[i + len(run)])
+                if not db.add_marks([_add_row(e) for e in run]):
+                    if len(run) == 1 or not self._refused(db):
+                        return applied, entry
+                    # One entry is refused: find it by applying the run one by one
+                    for e in run:
+                        if not db.add_marks([_add_row(e)]):
+                            return applied, e
+                        applied.append(e)
+                else:
+                    applied.extend(run)
+                i += len(run)
+                continue
+            p = entry["params"]
+            if entry["op"] == "update":
+                ok = db.update_mark(p["mark_id"], p["marks_obtained"], p["total_marks"], p["exam_date"])
+            elif entry["op"] == "delete":
+                ok = db.delete_mark(p["mark_id"])
+            else:
+                print(f"[WARN] Unknown journal op '{entry['op']}'")
+                return applied, dict(entry, unknown=True)
+            if not ok:
+                return applied, entry
+            applied.append(entry)
+            i += 1
+        return applied, None
+
+    def _fail(self, db, entry):
+        """Record a failed write; reject the entry after MAX_ATTEMPTS permanent refusals.
+
+        Only refusals replaying cannot fix count as attempts. A transient
+        failure (lock wait timeout, deadlock, ...) is recorded but never
+        rejects the entry: it stays queued and is retried with backoff.
+        """
+        if not self._connected(db):
+            self._online = False
+            return
+        errno = getattr(db, "last_errno", None)
+        permanent = bool(entry.get("unknown")) or self._refused(db)
+        attempts = entry["attempts"] + 1 if permanent else entry["attempts"]
+        rejected = permanent and attempts >= MAX_ATTEMPTS
+        error = f"MySQL error {errno}" if errno else "write failed"
+        if rejected:
+            error = f"rejected by the database ({error})"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pending_writes SET attempts = ?, last_error = ?, rejected = ? WHERE seq = ?",
+                (attempts, error, int(rejected), entry["seq"]))
+        if rejected:
+            print(f"[ERROR] Journal entry {entry['key']} ({entry['op']}) rejected after {attempts} attempts")
+            self._rejected.put((entry["key"], entry["op"], entry["params"], error))
+        elif permanent:
+            print(f"[WARN] Journal entry {entry['key']} ({entry['op']}) refused ({error}), attempt {attempts}")
+        else:
+            print(f"[WARN] Journal entry {entry['key']} ({entry['op']}) failed ({error}), will retry")
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+
+_JOURNAL = None
+
+
+def get_journal(source=None):
+    """Shared journal for the app database, with its replay thread running"""
+    global _JOURNAL
+    if _JOURNAL is None:
+        if source is None:
+            from database import db as source
+        _JOURNAL = WriteJournal(source).start()
+    return _JOURNAL
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the local mark write journal")
+    parser.add_argument("--database", help="schema whose journal to use (default: the app database)")
+    parser.add_argument("--replay", action="store_true", help="replay pending entries now")
+    args = parser.parse_args()
+
+    from database import Database
+    source = Database(database=args.database)
+    journal = WriteJournal(source)
+    if args.replay:
+        if journal.replay_once():
+            print("[OK] Journal replayed")
+        else:
+            print(f"[WARN] {journal.pending_count()} entries still pending")
+        journal.dispatch()
+    for e in journal.pending():
+        print(f"  pending  #{e['seq']} {e['op']:<7}{json.dumps(e['params'])}  attempts {e['attempts']}")
+    for e in journal.rejected():
+        print(f"  rejected #{e['seq']} {e['op']:<7}{json.dumps(e['params'])}  {e['last_error']}")
+    journal.close()
+    source.close()
+
+
+if __name__ == "__main__":
+    main()